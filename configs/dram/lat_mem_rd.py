@@ -168,21 +168,21 @@ itt = 150 * 1000
 # the actual measurement
 def create_trace(filename, max_addr, burst_size, itt):
     try:
-        proto_out = gzip.open(filename, 'wb')
+        proto_out = protolib.MessageWriter(gzip.open(filename, 'wb'))
     except IOError:
         print("Failed to open ", filename, " for writing")
         exit(-1)
 
     # write the magic number in 4-byte Little Endian, similar to what
     # is done in src/proto/protoio.cc
-    proto_out.write("gem5")
+    proto_out.write(b"gem5")
 
     # add the packet header
     header = packet_pb2.PacketHeader()
     header.obj_id = "lat_mem_rd for range 0:" + str(max_addr)
     # assume the default tick rate (1 ps)
     header.tick_freq = 1000000000000
-    protolib.encodeMessage(proto_out, header)
+    proto_out.encodeMessage(header)
 
     # create a list of every single address to touch
     addrs = list(range(0, max_addr, burst_size))
@@ -201,7 +201,7 @@ def create_trace(filename, max_addr, burst_size, itt):
     for addr in addrs:
         packet.tick = int(tick)
         packet.addr = int(addr)
-        protolib.encodeMessage(proto_out, packet)
+        proto_out.encodeMessage(packet)
         tick = tick + itt
 
     proto_out.close()
@@ -55,8 +55,11 @@ import sys
 import m5
 import m5.ticks as ticks
 
+# m5.objects imports SimObject modules on demand, so look the classes up
+#   by name rather than through its __dict__
 sim_object_classes_by_name = {
-    cls.__name__: cls for cls in list(m5.objects.__dict__.values())
+    cls.__name__: cls for cls in
+        (getattr(m5.objects, name) for name in dir(m5.objects))
     if inspect.isclass(cls) and issubclass(cls, m5.objects.SimObject) }
 
 # Add some parsing functions to Param classes to handle reading in .ini
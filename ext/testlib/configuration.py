@@ -307,6 +307,7 @@ def define_constants(constants):
     constants.gem5_binary_fixture_name = 'gem5'
     constants.xml_filename = 'results.xml'
     constants.pickle_filename = 'results.pickle'
+    constants.durations_filename = 'durations.json'
     constants.pickle_protocol = highest_pickle_protocol
 
     # The root directory which all test names will be based off of.
@@ -554,7 +555,8 @@ def define_common_args(config):
             '-t', '--test-threads',
             action='store',
             default=1,
-            help='Number of threads to spawn to run concurrent tests with.'),
+            help='Number of test suites to run concurrently, each in a'
+                 ' process of its own.'),
         Argument(
             '-v',
             action='count',
@@ -63,6 +63,7 @@ class Fixture(object):
             name = self.__class__.__name__
         self.name = name
         self._is_global = False
+        self._is_shared = False
 
     def skip(self, testitem):
         raise SkipException(self.name, testitem.metadata)
@@ -81,3 +82,14 @@ class Fixture(object):
 
     def is_global(self):
         return self._is_global
+
+    def set_shared(self):
+        '''
+        Mark this fixture as safe to set up once and share between test
+        suites run in separate processes.  The parallel runner sets shared
+        fixtures up before forking the suites which use them.
+        '''
+        self._is_shared = True
+
+    def is_shared(self):
+        return self._is_shared
@@ -268,6 +268,9 @@ def run_schedule(test_schedule, log_handler):
     if configuration.config.test_threads > 1:
         library_runner = runner.LibraryParallelRunner(test_schedule)
         library_runner.set_threads(configuration.config.test_threads)
+        library_runner.set_durations_path(os.path.join(
+                configuration.config.result_path,
+                configuration.constants.durations_filename))
     else:
         library_runner = runner.LibraryRunner(test_schedule)
     library_runner.run()
@@ -38,7 +38,13 @@
 #
 # Authors: Sean Wilson
 
+import json
+import multiprocessing
+import multiprocessing.connection
 import multiprocessing.dummy
+import os
+import threading
+import time
 import traceback
 
 import testlib.helper as helper
@@ -170,15 +176,286 @@ class LibraryRunner(SuiteRunner):
 
 
 class LibraryParallelRunner(RunnerPattern):
+    '''
+    Runs test suites concurrently, each in a process of its own.
+
+    Suites are started longest first, using the durations recorded by
+    previous runs (suites without a recorded duration go first).  Shared
+    fixtures (see :func:`Fixture.set_shared`) are set up once, in this
+    process, before the first suite that depends on them is started, so
+    every suite process inherits them already built.  They are set up in
+    a thread, so that the suites already running keep being drained and
+    reaped meanwhile, but no suite is started until they are built.
+    Suite processes send their log records and results back over a pipe.
+
+    If processes can't be forked on this host, suites are run in threads
+    instead.
+    '''
     def set_threads(self, threads):
         self.threads = threads
 
+    def set_durations_path(self, path):
+        self.durations_path = path
+
     def test(self):
-        pool = multiprocessing.dummy.Pool(self.threads)
-        pool.map(lambda suite : suite.runner(suite).run(), self.testable)
+        if 'fork' in multiprocessing.get_all_start_methods():
+            self._run_processes()
+        else:
+            pool = multiprocessing.dummy.Pool(self.threads)
+            pool.map(lambda suite : suite.runner(suite).run(), self.testable)
         self.testable.result = compute_aggregate_result(
                 iter(self.testable))
 
+    def _run_processes(self):
+        durations = SuiteDurations(getattr(self, 'durations_path', None))
+        schedule = durations.longest_first(self.testable)
+
+        context = multiprocessing.get_context('fork')
+        shared = SharedFixtureBuilder()
+        running = {}
+        # The connection to the thread setting up shared fixtures, if
+        # any, and the suite it sets them up for.
+        setup = None
+        try:
+            while schedule or running or setup:
+                while setup is None and schedule and \
+                        len(running) < self.threads:
+                    suite = schedule.pop(0)
+                    if shared.needs_setup(suite):
+                        setup = (shared.setup_in_thread(suite, context), suite)
+                    elif shared.setup(suite):
+                        self._start_suite(context, suite, running)
+
+                waiting = list(running)
+                if setup is not None:
+                    waiting.append(setup[0])
+                for reader in multiprocessing.connection.wait(waiting):
+                    if setup is not None and reader is setup[0]:
+                        ready = reader.recv()
+                        reader.close()
+                        if ready:
+                            self._start_suite(context, setup[1], running)
+                        setup = None
+                        continue
+
+                    try:
+                        message = reader.recv()
+                    except EOFError:
+                        message = None
+                    if message is not None and \
+                            not isinstance(message, SuiteOutcome):
+                        log.test_log.log(message)
+                        continue
+
+                    suite, process = running.pop(reader)
+                    reader.close()
+                    process.join()
+                    if message is None:
+                        self._handle_lost_suite(suite, process)
+                    else:
+                        message.apply(suite)
+                        durations.record(suite, message.duration)
+        finally:
+            for suite, process in running.values():
+                process.terminate()
+                process.join()
+            shared.teardown()
+            durations.save()
+
+    @staticmethod
+    def _start_suite(context, suite, running):
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(target=_run_suite_process,
+                                  args=(suite, writer))
+        process.start()
+        writer.close()
+        running[reader] = (suite, process)
+
+    def _handle_lost_suite(self, suite, process):
+        suite.runner(suite).handle_error(
+            'Test suite process exited with code %s before reporting '
+            'results.' % process.exitcode)
+        suite.status = Status.Avoided
+
+
+class SuiteOutcome(object):
+    '''
+    The final results and statuses of a test suite and its tests, as sent
+    back by a suite process.  The parent applies these to its own copy of
+    the suite without logging them again, since the suite process has
+    already logged every update.
+    '''
+    def __init__(self, suite, duration):
+        self.duration = duration
+        self.suite = (suite.metadata.result, suite.metadata.status)
+        self.tests = [ (test.metadata.result, test.metadata.status,
+                        getattr(test.metadata, 'time', None))
+                       for test in suite ]
+
+    def apply(self, suite):
+        suite.metadata.result, suite.metadata.status = self.suite
+        for test, (result, status, time) in zip(suite, self.tests):
+            test.metadata.result = result
+            test.metadata.status = status
+            if time is not None:
+                test.metadata.time = time
+
+
+class _PipeHandler(object):
+    '''Log handler for suite processes which forwards every record.'''
+    def __init__(self, connection):
+        self.connection = connection
+
+    def handle(self, record):
+        self.connection.send(record)
+
+    def close(self):
+        pass
+
+
+def _run_suite_process(suite, connection):
+    global _shared_fixtures_built
+    _shared_fixtures_built = True
+    log.test_log.handlers = [_PipeHandler(connection)]
+    start = time.time()
+    try:
+        suite.runner(suite).run()
+    finally:
+        connection.send(SuiteOutcome(suite, time.time() - start))
+        connection.close()
+
+
+class SuiteDurations(object):
+    '''
+    How long each test suite took to run the last time it was run, stored
+    as JSON and keyed by suite UID.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.durations = {}
+        if path is not None:
+            try:
+                with open(path) as f:
+                    self.durations = json.load(f)
+            except (IOError, ValueError):
+                pass
+
+    def longest_first(self, suites):
+        '''
+        :returns: a list of the given suites, longest running first.
+            Suites that have never been run are assumed to be the longest.
+        '''
+        def key(suite):
+            return -self.durations.get(str(suite.uid), float('inf'))
+        return sorted(suites, key=key)
+
+    def record(self, suite, duration):
+        self.durations[str(suite.uid)] = duration
+
+    def save(self):
+        if self.path is None:
+            return
+        helper.mkdir_p(os.path.dirname(self.path))
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.durations, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class SharedFixtureBuilder(object):
+    '''
+    Sets up shared fixtures in the calling process, each only once, as the
+    suites that depend on them are about to run.  Global fixtures are left
+    to the library runner.
+    '''
+    def __init__(self):
+        self.built = {}
+        self.failed = {}
+
+    @staticmethod
+    def _shared_fixtures(suite):
+        fixtures = list(suite.fixtures)
+        for test in suite:
+            fixtures.extend(test.fixtures)
+        for fixture in fixtures:
+            if fixture.is_shared() and not fixture.is_global():
+                yield fixture
+
+    def needs_setup(self, suite):
+        '''
+        :returns: whether one of the shared fixtures suite depends on
+            hasn't been set up yet.
+        '''
+        return any(id(fixture) not in self.built and
+                   id(fixture) not in self.failed
+                   for fixture in self._shared_fixtures(suite))
+
+    def setup_in_thread(self, suite, context):
+        '''
+        Call :func:`setup` for suite in a thread of its own.
+
+        :returns: a connection which receives the result of :func:`setup`
+            once it returns.
+        '''
+        reader, writer = context.Pipe(duplex=False)
+        def target():
+            ready = False
+            try:
+                ready = self.setup(suite)
+            finally:
+                writer.send(ready)
+                writer.close()
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+        return reader
+
+    def setup(self, suite):
+        '''
+        Set up the shared fixtures suite depends on.
+
+        :returns: False if one of them couldn't be set up, in which case
+            the suite has been marked as skipped or errored.
+        '''
+        for fixture in self._shared_fixtures(suite):
+            key = id(fixture)
+            if key in self.built:
+                continue
+            if key not in self.failed:
+                try:
+                    fixture.setup(suite)
+                except SkipException:
+                    self.failed[key] = (Result.Skipped,
+                                        traceback.format_exc())
+                except Exception:
+                    exc = traceback.format_exc()
+                    log.test_log.warn('%s\nException raised while setting '
+                                      'up shared fixture for %s' %
+                                      (exc, suite.uid))
+                    self.failed[key] = (Result.Errored, exc)
+                else:
+                    self.built[key] = (fixture, suite)
+                    continue
+
+            value, trace = self.failed[key]
+            runner = suite.runner(suite)
+            if value == Result.Skipped:
+                runner.handle_skip(trace)
+            else:
+                runner.handle_error(trace)
+            suite.status = Status.Avoided
+            return False
+        return True
+
+    def teardown(self):
+        for fixture, suite in self.built.values():
+            try:
+                fixture.teardown(suite)
+            except Exception:
+                log.test_log.warn('%s\nException raised while tearing down '
+                                  'shared fixture %s' %
+                                  (traceback.format_exc(), fixture.name))
+
 
 class BrokenFixtureException(Exception):
     def __init__(self, fixture, testitem, trace):
@@ -191,13 +468,21 @@ class BrokenFixtureException(Exception):
         )
         super(BrokenFixtureException, self).__init__(self.msg)
 
+# Set in suite processes, whose shared fixtures were set up (and will be
+# torn down) by the parent process.
+_shared_fixtures_built = False
+
 class FixtureBuilder(object):
     def __init__(self, fixtures):
         self.fixtures = fixtures
         self.built_fixtures = []
+        self.shared_fixtures = []
 
     def setup(self, testitem):
         for fixture in self.fixtures:
+            if _shared_fixtures_built and fixture.is_shared():
+                self.shared_fixtures.append(fixture)
+                continue
             # Mark as built before, so if the build fails
             # we still try to tear it down.
             self.built_fixtures.append(fixture)
@@ -215,7 +500,7 @@ class FixtureBuilder(object):
                         traceback.format_exc())
 
     def post_test_procedure(self, testitem):
-        for fixture in self.built_fixtures:
+        for fixture in self.shared_fixtures + self.built_fixtures:
             fixture.post_test_procedure(testitem)
 
     def teardown(self, testitem):
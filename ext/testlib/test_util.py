@@ -67,3 +67,10 @@ class TestFunction(TestCase):
 
     def test(self, *args, **kwargs):
         self.test_function(*args, **kwargs)
+
+class TestFailException(Exception):
+    pass
+
+def fail(message):
+    '''Fail the running test with the given message.'''
+    raise TestFailException(message)
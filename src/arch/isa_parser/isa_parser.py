@@ -37,6 +37,7 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import collections
 import os
 import re
 import sys
@@ -64,17 +65,21 @@ class Template(object):
         self.parser = parser
         self.template = t
 
+        # Protect non-Python-dict substitutions (e.g. if there's a printf
+        # in the templated C++ code).  Templates are substituted once per
+        # instruction, so do this and the label scan only once.
+        self.protected = protectNonSubstPercents(t)
+        self.labels = labelRE.findall(self.protected)
+
     def subst(self, d):
         myDict = None
 
-        # Protect non-Python-dict substitutions (e.g. if there's a printf
-        # in the templated C++ code)
-        template = protectNonSubstPercents(self.template)
+        template = self.protected
 
         # Build a dict ('myDict') to use for the template substitution.
-        # Start with the template namespace.  Make a copy since we're
-        # going to modify it.
-        myDict = self.parser.templateMap.copy()
+        # Start with the template namespace, layering a fresh dict on top
+        # rather than copying it since we're going to modify it.
+        myDict = collections.ChainMap({}, self.parser.templateMap)
 
         if isinstance(d, InstObjParams):
             # If we're dealing with an InstObjParams object, we need
@@ -89,8 +94,7 @@ class Template(object):
             del myDict['operands']
             del myDict['snippets']
 
-            snippetLabels = [l for l in labelRE.findall(template)
-                             if l in d.snippets]
+            snippetLabels = [l for l in self.labels if l in d.snippets]
 
             snippets = dict([(s, self.parser.mungeSnippet(d.snippets[s]))
                              for s in snippetLabels])
@@ -486,6 +490,9 @@ class ISAParser(Grammar):
         super(ISAParser, self).__init__()
         self.output_dir = output_dir
 
+        # Token rules such as t_CPPDIRECTIVE match at the start of lines
+        self.setupLexerFactory(reflags=re.MULTILINE)
+
         self.filename = None # for output file watermarking/scaremongering
 
         # variable to hold templates
@@ -498,6 +505,11 @@ class ISAParser(Grammar):
         self._operandsRE = None
         self._operandsWithExtRE = None
 
+        # Operand regular expression matches, keyed by identifier.  See
+        # scanOperands() for why these are per identifier.
+        self._operandWords = {}
+        self._mungedWords = {}
+
         # This dictionary maps format name strings to Format objects.
         self.formatMap = {}
 
@@ -779,7 +791,7 @@ class ISAParser(Grammar):
     # String literal.  Note that these use only single quotes, and
     # can span multiple lines.
     def t_STRLIT(self, t):
-        r"(?m)'([^'])+'"
+        r"'([^'])+'"
         # strip off quotes
         t.value = t.value[1:-1]
         t.lexer.lineno += t.value.count('\n')
@@ -789,7 +801,7 @@ class ISAParser(Grammar):
     # "Code literal"... like a string literal, but delimiters are
     # '{{' and '}}' so they get formatted nicely under emacs c-mode
     def t_CODELIT(self, t):
-        r"(?m)\{\{([^\}]|}(?!\}))+\}\}"
+        r"\{\{([^\}]|}(?!\}))+\}\}"
         # strip off {{ & }}
         t.value = t.value[2:-2]
         t.lexer.lineno += t.value.count('\n')
@@ -1551,11 +1563,57 @@ StaticInstPtr
         self._operandsWithExtRE = \
             re.compile(operandsWithExtREString, re.MULTILINE)
 
+        self._operandWords = {}
+        self._mungedWords = {}
+
+    def matchOperandWord(self, word):
+        '''Match a whole identifier against the operand regular
+        expression, returning its (full name, base, extension) groups or
+        None if it isn't an operand.'''
+        try:
+            return self._operandWords[word]
+        except KeyError:
+            match = self.operandsRE().fullmatch(word)
+            groups = match.groups() if match else None
+            self._operandWords[word] = groups
+            return groups
+
+    def scanOperands(self, code):
+        '''Find the operands referenced in a code block, ignoring any in
+        strings and comments.  Returns a list of (full name, base name,
+        extension, is_dest) tuples in the order they appear.
+
+        The operand regular expressions can only match whole identifiers,
+        so rather than trying the (very large) alternation at every
+        position, split the code into identifiers and match each distinct
+        one once.'''
+        for regEx in (stringRE, commentRE):
+            code = regEx.sub('', code)
+        operands = []
+        for word in identRE.finditer(code):
+            groups = self.matchOperandWord(word.group())
+            if groups:
+                # if the token following the operand is an assignment,
+                # this is a destination (LHS), else it's a source (RHS)
+                is_dest = (assignRE.match(code, word.end()) != None)
+                operands.append(groups + (is_dest,))
+        return operands
+
+    def mungeOperandWord(self, word):
+        word = word.group()
+        try:
+            return self._mungedWords[word]
+        except KeyError:
+            match = self.operandsWithExtRE().fullmatch(word)
+            munged = match.group(1) if match else word
+            self._mungedWords[word] = munged
+            return munged
+
     def substMungedOpNames(self, code):
         '''Munge operand names in code string to make legal C++
         variable names.  This means getting rid of the type extension
         if any.  Will match base_name attribute of Operand object.)'''
-        return self.operandsWithExtRE().sub(r'\1', code)
+        return identRE.sub(self.mungeOperandWord, code)
 
     def mungeSnippet(self, s):
         '''Fix up code snippets for final substitution in templates.'''
@@ -58,6 +58,11 @@ stringRE = re.compile(r'"([^"\\]|\\.)*"')
 commentRE = re.compile(r'(^)?[^\S\n]*/(?:\*(.*?)\*/[^\S\n]*|/[^\n]*)($)?',
         re.DOTALL | re.MULTILINE)
 
+# Regular expression object to match identifiers.  Operand names (with
+# or without an extension) are always whole identifiers, so code can be
+# searched for operands one identifier at a time.
+identRE = re.compile(r'\w+')
+
 # Regular expression object to match assignment statements (used in
 # findOperands()).  If the code immediately following the first
 # appearance of the operand matches this regex, then the operand
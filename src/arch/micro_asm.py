@@ -31,8 +31,7 @@ import traceback
 # get type names
 from types import *
 
-from ply import lex
-from ply import yacc
+from m5.util.grammar import buildLexer, buildParser
 
 ##########################################################################
 #
@@ -485,8 +484,9 @@ class MicroAssembler(object):
 
     def __init__(self, macro_type, microops,
             rom = None, rom_macroop_type = None):
-        self.lexer = lex.lex()
-        self.parser = yacc.yacc()
+        module = sys.modules[__name__]
+        self.lexer = buildLexer(module)
+        self.parser = buildParser(module)
         self.parser.macro_type = macro_type
         self.parser.macroops = {}
         self.parser.microops = microops
@@ -44,16 +44,20 @@
 #include <unistd.h>
 #include <zlib.h>
 
+#include <algorithm>
 #include <cerrno>
 #include <climits>
 #include <cstdio>
+#include <cstring>
 #include <iostream>
 #include <string>
+#include <vector>
 
 #include "base/trace.hh"
 #include "debug/AddrRanges.hh"
 #include "debug/Checkpoint.hh"
 #include "mem/abstract_mem.hh"
+#include "sim/byteswap.hh"
 #include "sim/serialize.hh"
 
 /**
@@ -68,6 +72,29 @@
 #endif
 #endif
 
+namespace
+{
+
+/**
+ * Magic at the start of a page manifest, see
+ * util/checkpoint_pagestore.py.
+ */
+const char pageManifestMagic[8] = {'g', 'e', 'm', '5', 'p', 'g', 's', 1};
+
+/** Page number of a zero page in a page manifest. */
+const uint64_t zeroPage = ~(uint64_t)0;
+
+uint64_t
+readManifestWord(gzFile manifest, const std::string &filename)
+{
+    uint64_t word;
+    if (gzread(manifest, &word, sizeof(word)) != sizeof(word))
+        fatal("Truncated page manifest '%s'\n", filename);
+    return letoh(word);
+}
+
+} // anonymous namespace
+
 PhysicalMemory::PhysicalMemory(const std::string& _name,
                                const std::vector<AbstractMemory*>& _memories,
                                bool mmap_using_noreserve,
@@ -439,6 +466,19 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
         fatal("Memory range size has changed! Saw %lld, expected %lld\n",
               range_size, range.size());
 
+    // The store may be a page manifest rather than a memory image
+    char magic[sizeof(pageManifestMagic)];
+    if (gzread(compressed_mem, magic, sizeof(magic)) == sizeof(magic) &&
+        memcmp(magic, pageManifestMagic, sizeof(magic)) == 0) {
+        unserializeStorePages(compressed_mem, cp.getCptDir(), filename,
+                              range, pmem);
+        if (gzclose(compressed_mem))
+            fatal("Close failed on physical memory checkpoint file '%s'\n",
+                  filename);
+        return;
+    }
+    gzrewind(compressed_mem);
+
     uint64_t curr_size = 0;
     long* temp_page = new long[chunk_size];
     long* pmem_current;
@@ -467,3 +507,70 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
         fatal("Close failed on physical memory checkpoint file '%s'\n",
               filename);
 }
+
+void
+PhysicalMemory::unserializeStorePages(gzFile manifest,
+                                      const std::string &cpt_dir,
+                                      const std::string &filename,
+                                      AddrRange range, uint8_t* pmem)
+{
+    const uint64_t page_size = readManifestWord(manifest, filename);
+    const uint64_t num_pages = readManifestWord(manifest, filename);
+    const uint64_t path_len = readManifestWord(manifest, filename);
+
+    if (page_size == 0 || num_pages * page_size < range.size())
+        fatal("Page manifest '%s' does not cover the memory range\n",
+              filename);
+
+    std::string pack_path(path_len, '\0');
+    if (gzread(manifest, &pack_path[0], path_len) != (int)path_len)
+        fatal("Truncated page manifest '%s'\n", filename);
+    pack_path = cpt_dir + "/" + pack_path;
+
+    int pack = open(pack_path.c_str(), O_RDONLY);
+    if (pack == -1)
+        fatal("Can't open page store '%s' of page manifest '%s'\n",
+              pack_path, filename);
+
+    DPRINTF(Checkpoint, "Unserializing physical memory %s from page store "
+            "%s\n", filename, pack_path);
+
+    // Read the page numbers in chunks, and only read the pages which are
+    // not all zeros. Like the image path above, this relies on the
+    // backing store being zero initialised, which holds for the
+    // anonymous mappings made by createBackingStore(). A shared backing
+    // store may be an existing shared memory object, so its zero pages
+    // are cleared explicitly.
+    const bool zero_initialised = sharedBackstore.empty();
+    const uint64_t chunk_pages = 16384;
+    std::vector<uint64_t> pages(chunk_pages);
+    uint64_t page = 0;
+    while (page < num_pages && page * page_size < range.size()) {
+        uint64_t count = std::min(chunk_pages, num_pages - page);
+        int bytes = count * sizeof(uint64_t);
+        if (gzread(manifest, pages.data(), bytes) != bytes)
+            fatal("Truncated page manifest '%s'\n", filename);
+
+        for (uint64_t i = 0; i < count; ++i, ++page) {
+            uint64_t number = letoh(pages[i]);
+            uint64_t offset = page * page_size;
+            if (offset >= range.size())
+                continue;
+
+            uint64_t size = std::min(page_size, range.size() - offset);
+            if (number == zeroPage) {
+                if (!zero_initialised)
+                    memset(pmem + offset, 0, size);
+                continue;
+            }
+
+            if (pread(pack, pmem + offset, size, number * page_size) !=
+                (ssize_t)size) {
+                fatal("Can't read page %d of page store '%s'\n", number,
+                      pack_path);
+            }
+        }
+    }
+
+    close(pack);
+}
@@ -38,6 +38,8 @@
 #ifndef __MEM_PHYSICAL_HH__
 #define __MEM_PHYSICAL_HH__
 
+#include <zlib.h>
+
 #include <cstdint>
 #include <string>
 #include <vector>
@@ -272,6 +274,24 @@ class PhysicalMemory : public Serializable
      */
     void unserializeStore(CheckpointIn &cp);
 
+    /**
+     * Unserialize a backing store from a page manifest, which describes
+     * the store as a list of pages in a page store shared by checkpoints
+     * (see util/checkpoint_pagestore.py). Zero pages are skipped, as the
+     * backing store is assumed to be zero initialised unless it is
+     * shared, and the other pages are read from the page store as they
+     * are, without any decompression.
+     *
+     * @param manifest The manifest, positioned after its magic
+     * @param cpt_dir The checkpoint directory
+     * @param filename The name of the manifest, for error messages
+     * @param range The address range of this backing store
+     * @param pmem The host pointer to this backing store
+     */
+    void unserializeStorePages(gzFile manifest, const std::string &cpt_dir,
+                               const std::string &filename, AddrRange range,
+                               uint8_t* pmem);
+
 };
 
 #endif //__MEM_PHYSICAL_HH__
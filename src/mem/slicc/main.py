@@ -67,6 +67,9 @@ def main(args=None):
                       help="Path where html output goes")
     parser.add_option("-F", "--print-files", action='store_true',
                       help="Print files that SLICC will generate")
+    parser.add_option("--print-deps", action='store_true',
+                      help="After writing the C++ files, print the files "
+                      "generated from each source file")
     parser.add_option("--tb", "--traceback", action='store_true',
                       help="print traceback on error")
     parser.add_option("-q", "--quiet",
@@ -107,6 +110,15 @@ def main(args=None):
 
         output("Writing C++ files...")
         slicc.writeCodeFiles(opts.code_path, [])
+        output("Wrote %d files, %d unchanged",
+               len(slicc.code_manifest.written),
+               len(slicc.code_manifest.unchanged))
+
+        if opts.print_deps:
+            for source, generated in sorted(slicc.dependencies().items()):
+                print('%s:' % source)
+                for f in sorted(generated):
+                    print('    %s' % f)
 
 
     output("SLICC is Done.")
@@ -0,0 +1,121 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import json
+import os
+
+class OutputManifest(object):
+    '''Tracks the files SLICC generates in one output directory.
+
+    Files are only written when their contents change, so the files
+    (and their modification times) of symbols whose generated code is
+    unaffected by an edit are left alone and don't get recompiled.  The
+    manifest, stored alongside the generated files, records the hash of
+    every file, the symbol that generated it and the .sm files that
+    declare that symbol and the symbols it uses.'''
+
+    FILENAME = 'slicc-manifest.json'
+    VERSION = 2
+
+    def __init__(self, path):
+        self.path = path
+        self.previous = self.load(path)
+        self.files = {}
+        self.written = []
+        self.unchanged = []
+
+        self.symbol = None
+        self.sources = []
+
+    @classmethod
+    def load(cls, path):
+        '''Read the manifest in path, returning a map of generated file
+        name to its entry, or an empty map if there isn't a usable one.'''
+        try:
+            with open(os.path.join(path, cls.FILENAME)) as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if manifest.get('version') != cls.VERSION:
+            return {}
+        return manifest['files']
+
+    def setSymbol(self, symbol, sources):
+        '''Attribute the files written from now on to symbol, which was
+        declared in the given source files.'''
+        self.symbol = symbol
+        self.sources = sorted(set(os.path.normpath(s) for s in sources))
+
+    def _isCurrent(self, filename, entry, digest):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return False
+        if entry and entry['hash'] == digest and \
+           entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+            return True
+        # No (matching) record of the file, so compare its contents.
+        with open(filename, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest() == digest
+
+    def write(self, name, data):
+        filename = os.path.join(self.path, name)
+        data = data.encode()
+        digest = hashlib.sha1(data).hexdigest()
+        if self._isCurrent(filename, self.previous.get(name), digest):
+            self.unchanged.append(name)
+        else:
+            with open(filename, 'wb') as f:
+                f.write(data)
+            self.written.append(name)
+
+        st = os.stat(filename)
+        self.files[name] = {
+            'hash' : digest,
+            'size' : st.st_size,
+            'mtime' : st.st_mtime_ns,
+            'symbol' : str(self.symbol) if self.symbol is not None else None,
+            'sources' : self.sources,
+        }
+
+    def save(self):
+        filename = os.path.join(self.path, self.FILENAME)
+        with open(filename + '.tmp', 'w') as f:
+            json.dump({ 'version' : self.VERSION, 'files' : self.files }, f,
+                      indent=1, sort_keys=True)
+        os.replace(filename + '.tmp', filename)
+
+def dependencies(files):
+    '''Map each .sm source file to the generated files that depend on it,
+    given a map of generated file name to manifest entry.'''
+    deps = {}
+    for name, entry in files.items():
+        for source in entry['sources']:
+            deps.setdefault(source, set()).add(name)
+    return deps
+
+__all__ = [ 'OutputManifest', 'dependencies' ]
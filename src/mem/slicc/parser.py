@@ -46,8 +46,19 @@ from m5.util.grammar import Grammar, ParseError
 
 import slicc.ast as ast
 import slicc.util as util
+from slicc.manifest import OutputManifest, dependencies
 from slicc.symbols import SymbolTable
 
+class slicc_formatter(code_formatter):
+    '''A code_formatter that writes files through the SLICC output
+    manifest, so unchanged files aren't rewritten.'''
+    def __init__(self, slicc, *args, **kwargs):
+        self.slicc = slicc
+        super(slicc_formatter, self).__init__(*args, **kwargs)
+
+    def write(self, *args):
+        self.slicc.writeFile(os.path.join(*args), str(self))
+
 class SLICC(Grammar):
     def __init__(self, filename, base_dir, verbose=False, traceback=False, **kwargs):
         self.protocol = None
@@ -55,6 +66,8 @@ class SLICC(Grammar):
         self.verbose = verbose
         self.symtab = SymbolTable(self)
         self.base_dir = base_dir
+        self.output = None
+        self.code_manifest = None
 
         try:
             self.decl_list = self.parse_file(filename, **kwargs)
@@ -68,18 +81,42 @@ class SLICC(Grammar):
                              no_warning=not self.verbose)
 
     def codeFormatter(self, *args, **kwargs):
-        code = code_formatter(*args, **kwargs)
+        code = slicc_formatter(self, *args, **kwargs)
         code['protocol'] = self.protocol
         return code
 
     def process(self):
         self.decl_list.generate()
 
+    def writeFile(self, filename, data):
+        path, name = os.path.split(filename)
+        if self.output and os.path.samefile(path, self.output.path):
+            self.output.write(name, data)
+        else:
+            with open(filename, 'w') as f:
+                f.write(data)
+
+    def writeOutput(self, path, write):
+        self.output = OutputManifest(path)
+        try:
+            write(path)
+            self.output.save()
+            return self.output
+        finally:
+            self.output = None
+
     def writeCodeFiles(self, code_path, includes):
-        self.symtab.writeCodeFiles(code_path, includes)
+        self.code_manifest = self.writeOutput(code_path,
+            lambda path: self.symtab.writeCodeFiles(path, includes))
 
     def writeHTMLFiles(self, html_path):
-        self.symtab.writeHTMLFiles(html_path)
+        self.writeOutput(html_path, self.symtab.writeHTMLFiles)
+
+    def dependencies(self):
+        '''Map each source file to the set of generated C++ files that
+        depend on it, as recorded by the last writeCodeFiles().'''
+        assert self.code_manifest is not None
+        return dependencies(self.code_manifest.files)
 
     def files(self):
         f = set(['Types.hh'])
@@ -59,6 +59,9 @@ class Func(Symbol):
         return "%s %s(%s);" % (return_type, self.c_name,
                                ", ".join(self.param_strings))
 
+    def references(self):
+        return [ self.return_type ] + list(self.param_types)
+
     def writeCodeFiles(self, path, includes):
         return
 
@@ -139,6 +139,20 @@ class StateMachine(Symbol):
     def addDebugFlag(self, flag):
         self.debug_flags.add(flag)
 
+    def references(self):
+        symbols = []
+        for symbols_map in (self.states, self.events, self.actions,
+                            self.request_types):
+            symbols.extend(symbols_map.values())
+        symbols.extend(self.transitions)
+        symbols.extend(self.in_ports)
+        symbols.extend(self.functions)
+        symbols.extend(self.objects)
+        # The types, functions and variables (and through them, types)
+        # from other files, e.g., messages and RubySlicc_*.sm externals.
+        symbols.extend(self.symtab.references.get(self, ()))
+        return symbols
+
     def addRequestType(self, request_type):
         assert self.table is None
         self.request_types[request_type.ident] = request_type
@@ -511,7 +525,7 @@ void unset_tbe(${{self.TBEType.c_ident}}*& m_tbe_ptr);
         code(boolvec_include)
         code(base_include)
 
-        for f in self.debug_flags:
+        for f in sorted(self.debug_flags):
             code('#include "debug/${{f}}.hh"')
         code('''
 #include "mem/ruby/network/Network.hh"
@@ -1231,7 +1245,7 @@ $c_ident::functionalReadBuffers(PacketPtr& pkt, WriteMask &mask)
 #include "base/logging.hh"
 
 ''')
-        for f in self.debug_flags:
+        for f in sorted(self.debug_flags):
             code('#include "debug/${{f}}.hh"')
         code('''
 #include "mem/ruby/protocol/${ident}_Controller.hh"
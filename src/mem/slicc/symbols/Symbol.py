@@ -72,6 +72,28 @@ class Symbol(PairContainer):
     def warning(self, message, *args):
         self.location.warning(message, *args)
 
+    def references(self):
+        '''The other symbols the code generated for this symbol depends
+        on, e.g., the types it uses.'''
+        return []
+
+    def sources(self):
+        '''The set of source files this symbol and the symbols it
+        references, directly or indirectly, were declared in.'''
+        sources = set()
+        seen = set()
+        symbols = [ self ]
+        while symbols:
+            symbol = symbols.pop()
+            if id(symbol) in seen:
+                continue
+            seen.add(id(symbol))
+            # Built-in symbols (e.g., void) aren't declared in a file
+            if symbol.location.filename != "init":
+                sources.add(symbol.location.filename)
+            symbols.extend(symbol.references())
+        return sources
+
     def writeHTMLFiles(self, path):
         pass
 
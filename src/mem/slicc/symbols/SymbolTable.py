@@ -39,6 +39,8 @@ class SymbolTable(object):
         self.sym_vec = []
         self.sym_map_vec = [ {} ]
         self.machine_components = {}
+        # The symbols found while generating each state machine
+        self.references = {}
 
         pairs = {}
         pairs["primitive"] = "yes"
@@ -82,10 +84,19 @@ class SymbolTable(object):
                     continue # there could be a name clash with other symbol
                              # so rather than producing an error, keep trying
 
+            self.addReference(symbol)
             return symbol
 
         return None
 
+    def addReference(self, symbol):
+        # Record the symbol as used by the current machine, if any
+        for sym_map in reversed(self.sym_map_vec):
+            machine = sym_map.get("current_machine")
+            if machine is not None:
+                self.references.setdefault(machine, set()).add(symbol)
+                return
+
     def newMachComponentSym(self, symbol):
         # used to cheat-- that is, access components in other machines
         machine = self.find("current_machine", StateMachine)
@@ -131,13 +142,18 @@ class SymbolTable(object):
         for include_path in includes:
             code('#include "${{include_path}}"')
 
+        sources = set()
         for symbol in self.sym_vec:
             if isinstance(symbol, Type) and not symbol.isPrimitive:
                 code('#include "mem/ruby/protocol/${{symbol.c_ident}}.hh"')
+                sources |= symbol.sources()
 
+        output = self.slicc.output
+        output.setSymbol(None, sources)
         code.write(path, "Types.hh")
 
         for symbol in self.sym_vec:
+            output.setSymbol(symbol, symbol.sources())
             symbol.writeCodeFiles(path, includes)
 
     def writeHTMLFiles(self, path):
@@ -167,7 +183,9 @@ class SymbolTable(object):
         code("<HTML></HTML>")
         code.write(path, "empty.html")
 
+        output = self.slicc.output
         for symbol in self.sym_vec:
+            output.setSymbol(symbol, symbol.sources())
             symbol.writeHTMLFiles(path)
 
 __all__ = [ "SymbolTable" ]
@@ -149,6 +149,20 @@ class Type(Symbol):
         self.symtab.registerSym(ident, member)
         return True
 
+    def references(self):
+        return list(self.data_members.values()) + \
+            list(self.methods.values())
+
+    def sources(self):
+        sources = super(Type, self).sources()
+        if self.isMachineType:
+            # Each machine adds its enumerator (and include), but what the
+            # machines reference doesn't matter.
+            from slicc.symbols.StateMachine import StateMachine
+            for machine in self.symtab.getAllType(StateMachine):
+                sources.add(machine.location.filename)
+        return sources
+
     def dataMemberType(self, ident):
         return self.data_members[ident].type
 
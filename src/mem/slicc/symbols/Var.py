@@ -39,6 +39,9 @@ class Var(Symbol):
     def __repr__(self):
         return "[Var id: %s]" % (self.ident)
 
+    def references(self):
+        return [ self.type ]
+
     def writeCodeFiles(self, path, includes):
         pass
 
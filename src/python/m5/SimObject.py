@@ -44,6 +44,7 @@ from functools import wraps
 import inspect
 
 import m5
+from m5 import config_snapshot
 from m5.util import *
 from m5.util.pybind import *
 # Use the pyfdt and not the helper class, because the fdthelper
@@ -108,6 +109,16 @@ allClasses = {}
 # dict to look up SimObjects based on path
 instanceDict = {}
 
+# Generation counter for the configuration hierarchy.  It is bumped
+# every time a parent link is set or cleared so that cached walks of
+# the hierarchy (see SimObject.descendants_list() and SimObject.path())
+# can tell when they have gone stale.
+_hierarchy_generation = 0
+
+def _hierarchy_changed():
+    global _hierarchy_generation
+    _hierarchy_generation += 1
+
 # Did any of the SimObjects lack a header file?
 noCxxHeader = False
 
@@ -693,6 +704,25 @@ class MetaSimObject(type):
     def getCCClass(cls):
         return getattr(m5.internal.params, cls.pybind_class)
 
+    # Return the information getCCParams() needs to fill in the C++
+    # param struct of this class: the pybind struct type, the sorted
+    # (name, is_vector) list of params, and the sorted list of port
+    # names.  The generated create_batch() function of the struct takes
+    # the values in the same order.  Params and ports can only be
+    # declared when the class is defined, so the plan is computed once
+    # per class and shared by all of its instances.
+    def _cc_params_plan(cls):
+        plan = cls.__dict__.get('_cc_params_plan_cache')
+        if plan is None:
+            params = tuple(
+                (name, isinstance(pdesc, VectorParamDesc))
+                for name, pdesc in sorted(cls._params.items()))
+            ports = tuple(sorted(cls._ports.keys()))
+            struct = getattr(m5.internal.params, '%sParams' % cls.type)
+            plan = (struct, params, ports)
+            type.__setattr__(cls, '_cc_params_plan_cache', plan)
+        return plan
+
     # See ParamValue.cxx_predecls for description.
     def cxx_predecls(cls, code):
         code('#include "params/$cls.hh"')
@@ -799,9 +829,48 @@ class MetaSimObject(type):
         for param in params:
             param.pybind_predecls(code)
 
-        code('''namespace py = pybind11;
+        code('namespace py = pybind11;')
+        code()
 
-static void
+        abstract = hasattr(cls, 'abstract') and cls.abstract
+        if not abstract:
+            # The values are passed in the order of _cc_params_plan():
+            # all params, including inherited ones, sorted by name,
+            # followed by the connection counts of all ports sorted by
+            # name.
+            all_params = sorted(cls._params.keys())
+            all_ports = sorted(cls._ports.keys())
+            code('''/**
+ * Create a batch of ${{cls.cxx_class}} objects with a single call from
+ * Python. Each row holds the param values of one object.
+ *
+ * @return A list of (params, object) pairs.
+ */
+static py::list
+createBatch(const std::vector<std::string> &names, const py::list &rows)
+{
+    py::list created;
+    for (size_t i = 0; i < names.size(); i++) {
+        auto *params = new ${cls}Params;
+        py::sequence row = rows[i];
+        params->name = names[i];
+''')
+            code.indent(2)
+            for index, name in enumerate(all_params):
+                code('setParamFromPython(params->${name}, row[${index}]);')
+            for index, name in enumerate(all_ports, len(all_params)):
+                code('setParamFromPython(' \
+                     'params->port_${name}_connection_count, row[${index}]);')
+            code.dedent(2)
+            code('''        auto *obj = params->create();
+        created.append(py::make_tuple(py::cast(params), py::cast(obj)));
+    }
+    return created;
+}
+''')
+            code()
+
+        code('''static void
 module_init(py::module_ &m_internal)
 {
     py::module_ m = m_internal.def_submodule("param_${cls}");
@@ -817,9 +886,10 @@ module_init(py::module_ &m_internal)
                  'm, "${cls}Params")')
 
         code.indent()
-        if not hasattr(cls, 'abstract') or not cls.abstract:
+        if not abstract:
             code('.def(py::init<>())')
             code('.def("create", &${cls}Params::create)')
+            code('.def_static("create_batch", &createBatch)')
 
         param_exports = cls.cxx_param_exports + [
             PyBindProperty(k)
@@ -1287,6 +1357,8 @@ class SimObject(object, metaclass=MetaSimObject):
         self._ccObject = None  # pointer to C++ object
         self._ccParams = None
         self._instantiated = False # really "cloned"
+        self._descendants_cache = None
+        self._path_cache = None
 
         # Clone children specified at class level.  No need for a
         # multidict here since we will be cloning everything.
@@ -1338,6 +1410,30 @@ class SimObject(object, metaclass=MetaSimObject):
             return memo_dict[self]
         return self.__class__(_ancestor = self, **kwargs)
 
+    # Pickle support, used by m5.config_snapshot.  The parameter
+    # multidicts are flattened so that a snapshot holds the effective
+    # values rather than the class-level defaults they inherit from.
+    def __getstate__(self):
+        if self._ccObject:
+            raise RuntimeError("%s: cannot pickle a SimObject after its C++ "
+                               "object has been created" % self.path())
+        state = dict(self.__dict__)
+        state['_values'] = dict(self._values.items())
+        state['_hr_values'] = dict(self._hr_values.items())
+        state['_ccParams'] = None
+        state['_descendants_cache'] = None
+        state['_path_cache'] = None
+        return state
+
+    def __setstate__(self, state):
+        values = state.pop('_values')
+        hr_values = state.pop('_hr_values')
+        self.__dict__.update(state)
+        self._values = multidict(self.__class__._values)
+        self._values.local.update(values)
+        self._hr_values = multidict(self.__class__._hr_values)
+        self._hr_values.local.update(hr_values)
+
     def _get_port_ref(self, attr):
         # Return reference that can be assigned to another port
         # via __setattr__.  There is only ever one reference
@@ -1367,7 +1463,8 @@ class SimObject(object, metaclass=MetaSimObject):
         # forward the reference there.  This is typically used for
         # methods exported to Python (e.g., init(), and startup())
         if self._ccObject and hasattr(self._ccObject, attr):
-            return getattr(self._ccObject, attr)
+            return config_snapshot.method(self, attr,
+                                          getattr(self._ccObject, attr))
 
         err_string = "object '%s' has no attribute '%s'" \
               % (self.__class__.__name__, attr)
@@ -1446,11 +1543,13 @@ class SimObject(object, metaclass=MetaSimObject):
     def clear_parent(self, old_parent):
         assert self._parent is old_parent
         self._parent = None
+        _hierarchy_changed()
 
     # Also implemented by SimObjectVector
     def set_parent(self, parent, name):
         self._parent = parent
         self._name = name
+        _hierarchy_changed()
 
     # Return parent object of this SimObject, not implemented by
     # SimObjectVector because the elements in a SimObjectVector may not share
@@ -1506,23 +1605,39 @@ class SimObject(object, metaclass=MetaSimObject):
                 warn("%s adopting orphan SimObject param '%s'", self, key)
                 self.add_child(key, val)
 
+    # The path and path list of an object are cached on it until a
+    # parent link anywhere in the hierarchy changes, since the path is
+    # asked for over and over again (as a sort key, for the .ini and
+    # JSON configs, for the C++ object name and for stats) while the
+    # hierarchy stays the same.  The strings are interned so that all
+    # of those share a single copy of each path and name.
     def path(self):
+        cache = self._path_cache
+        if cache is None or cache[0] != _hierarchy_generation:
+            cache = (_hierarchy_generation,) + self._make_path()
+            self._path_cache = cache
+        return cache[1]
+
+    def path_list(self):
+        cache = self._path_cache
+        if cache is None or cache[0] != _hierarchy_generation:
+            cache = (_hierarchy_generation,) + self._make_path()
+            self._path_cache = cache
+        return list(cache[2])
+
+    def _make_path(self):
         if not self._parent:
-            return '<orphan %s>' % self.__class__
+            # Don't include the root node in the path list
+            return '<orphan %s>' % self.__class__, ()
         elif isinstance(self._parent, MetaSimObject):
-            return str(self.__class__)
+            return str(self.__class__), (self._name, )
 
         ppath = self._parent.path()
+        plist = tuple(self._parent.path_list())
+        name = sys.intern(self._name)
         if ppath == 'root':
-            return self._name
-        return ppath + "." + self._name
-
-    def path_list(self):
-        if self._parent:
-            return self._parent.path_list() + [ self._name, ]
-        else:
-            # Don't include the root node
-            return []
+            return name, plist + (name, )
+        return sys.intern(ppath + "." + name), plist + (name, )
 
     def __str__(self):
         return self.path()
@@ -1613,9 +1728,10 @@ class SimObject(object, metaclass=MetaSimObject):
                 port.unproxy(self)
 
     def print_ini(self, ini_file):
-        print('[' + self.path() + ']', file=ini_file)    # .ini section header
+        path = self.path()
+        print('[' + path + ']', file=ini_file)    # .ini section header
 
-        instanceDict[self.path()] = self
+        instanceDict[path] = self
 
         if hasattr(self, 'type'):
             print('type=%s' % self.type, file=ini_file)
@@ -1674,25 +1790,46 @@ class SimObject(object, metaclass=MetaSimObject):
 
         return d
 
-    def getCCParams(self):
-        if self._ccParams:
-            return self._ccParams
-
-        cc_params_struct = getattr(m5.internal.params, '%sParams' % self.type)
-        cc_params = cc_params_struct()
-        cc_params.name = str(self)
+    # Return the values getCCParams() fills in the C++ param struct
+    # with, in the order of the plan of the class: the values of all
+    # params followed by the connection counts of all ports.
+    def _getCCParamValues(self):
+        _, params, port_names = self.__class__._cc_params_plan()
 
-        param_names = list(self._params.keys())
-        param_names.sort()
-        for param in param_names:
-            value = self._values.get(param)
+        values = self._values
+        cc_values = []
+        for param, is_vector in params:
+            value = values.get(param)
             if value is None:
                 fatal("%s.%s without default or user set value",
                       self.path(), param)
 
             value = value.getValue()
-            if isinstance(self._params[param], VectorParamDesc):
+            if is_vector:
                 assert isinstance(value, list)
+            cc_values.append(value)
+
+        port_refs = self._port_refs
+        for port_name in port_names:
+            port = port_refs.get(port_name, None)
+            if port != None:
+                port_count = len(port)
+            else:
+                port_count = 0
+            cc_values.append(port_count)
+        return cc_values
+
+    def getCCParams(self):
+        if self._ccParams:
+            return self._ccParams
+
+        cc_params_struct, params, port_names = self.__class__._cc_params_plan()
+        cc_params = cc_params_struct()
+        cc_params.name = str(self)
+
+        cc_values = self._getCCParamValues()
+        for (param, is_vector), value in zip(params, cc_values):
+            if is_vector:
                 vec = getattr(cc_params, param)
                 assert not len(vec)
                 # Some types are exposed as opaque types. They support
@@ -1706,14 +1843,7 @@ class SimObject(object, metaclass=MetaSimObject):
             else:
                 setattr(cc_params, param, value)
 
-        port_names = list(self._ports.keys())
-        port_names.sort()
-        for port_name in port_names:
-            port = self._port_refs.get(port_name, None)
-            if port != None:
-                port_count = len(port)
-            else:
-                port_count = 0
+        for port_name, port_count in zip(port_names, cc_values[len(params):]):
             setattr(cc_params, 'port_' + port_name + '_connection_count',
                     port_count)
         self._ccParams = cc_params
@@ -1747,6 +1877,19 @@ class SimObject(object, metaclass=MetaSimObject):
             for obj in child.descendants():
                 yield obj
 
+    # Return the same objects as descendants(), in the same order, as
+    # a tuple.  The walk is cached on the object and reused until a
+    # parent link anywhere in the hierarchy changes, which lets the
+    # many passes in m5.simulate.instantiate() share a single walk.
+    # Callers that add children while iterating should keep using the
+    # descendants() generator so new objects are visited.
+    def descendants_list(self):
+        cache = self._descendants_cache
+        if cache is None or cache[0] != _hierarchy_generation:
+            cache = (_hierarchy_generation, tuple(self.descendants()))
+            self._descendants_cache = cache
+        return cache[1]
+
     # Call C++ to create C++ object corresponding to this object
     def createCCObject(self):
         self.getCCParams()
@@ -1815,6 +1958,88 @@ class SimObject(object, metaclass=MetaSimObject):
         d = self._apply_config_get_dict()
         return eval(simobj_path, d)
 
+# Return the SimObjects the params of obj refer to, whose C++ objects
+# have to exist before the one of obj is created.
+def _cc_dependencies(obj):
+    for value in obj._values.values():
+        if isSimObject(value):
+            yield value
+        elif isSimObjectVector(value):
+            for v in value:
+                if isSimObject(v):
+                    yield v
+
+# Return the level of each of objs, by id, in the dependency graph of
+# their C++ objects: objects that don't refer to any other object are
+# at level 0, and every other object is one level above the highest
+# object it refers to.
+def _cc_dependency_levels(objs):
+    levels = {}
+    for obj in objs:
+        if id(obj) in levels:
+            continue
+        # Objects are marked with None while their dependencies are
+        # visited.  A dependency that is still marked is part of a
+        # cycle, which getCCObject() reports when it gets to it.
+        levels[id(obj)] = None
+        stack = [ (obj, _cc_dependencies(obj)) ]
+        while stack:
+            node, deps = stack[-1]
+            for dep in deps:
+                if id(dep) not in levels:
+                    levels[id(dep)] = None
+                    stack.append((dep, _cc_dependencies(dep)))
+                    break
+            else:
+                stack.pop()
+                levels[id(node)] = max([ levels[id(dep)] + 1
+                    for dep in _cc_dependencies(node)
+                    if levels[id(dep)] is not None ], default=0)
+    return levels
+
+# Create the C++ objects of objs.  Objects are created level by level
+# in the order of their dependencies, and the objects of the same class
+# in a level are created with a single call to the create_batch()
+# function of their C++ param struct, rather than with a call per
+# param and object.
+def createCCObjects(objs):
+    levels = _cc_dependency_levels(objs)
+
+    # Objects are kept in the order of objs within a batch.
+    batches = {}
+    for obj in objs:
+        key = (levels[id(obj)], obj.__class__)
+        batches.setdefault(key, []).append(obj)
+
+    for (level, cls), batch in sorted(batches.items(),
+                                      key=lambda item: item[0][0]):
+        names = []
+        rows = []
+        pending = []
+        for obj in batch:
+            # Objects can already have been created on demand, as the
+            # value of a param of an object created before them.
+            if obj._ccObject:
+                continue
+            if obj.abstract or obj._ccParams:
+                obj.createCCObject()
+                continue
+            if not obj._parent and not isRoot(obj):
+                raise RuntimeError("Attempt to instantiate orphan node")
+            # As in getCCObject(), mark the object to catch cycles.
+            obj._ccObject = -1
+            names.append(str(obj))
+            rows.append(obj._getCCParamValues())
+            pending.append(obj)
+
+        if not pending:
+            continue
+        cc_params_struct = cls._cc_params_plan()[0]
+        created = cc_params_struct.create_batch(names, rows)
+        for obj, (cc_params, cc_object) in zip(pending, created):
+            obj._ccParams = cc_params
+            obj._ccObject = cc_object
+
 # Function to provide to C++ so it can look up instances based on paths
 def resolveSimObject(name):
     obj = instanceDict[name]
@@ -0,0 +1,411 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Snapshots of an elaborated configuration.
+
+A snapshot is the Python SimObject hierarchy as it stands at the end of
+the elaboration phase of m5.instantiate(): orphan parameters have been
+adopted, proxies resolved and ports bound, but no C++ objects exist yet.
+It also holds a record of what the configuration script did with the
+simulator, so that the run can be reproduced without the script.
+
+With `gem5 --config-snapshot-dir=DIR script.py ARGS`, snapshots are
+cached in DIR under a hash of their inputs: the gem5 build, the script,
+its arguments and its Python path. A snapshot also lists the files of
+the modules the script imported and their hashes. When a run finds a
+snapshot for its inputs whose modules haven't changed, it replays the
+snapshot instead of running the script, so a sweep only elaborates each
+configuration once. The script is assumed to depend on nothing else:
+configurations that depend on environment variables or data files read
+by the script can't be cached.
+
+A snapshot can also be run directly with
+`gem5 --load-config-snapshot=FILE`.
+
+The replay reproduces the calls the script made, in order, with the
+same arguments:
+  - m5.ticks.setGlobalFrequency() and m5.disableAllListeners(),
+  - m5.instantiate() and m5.simulate(),
+  - m5.stats.reset(), m5.stats.dump() and m5.stats.periodicStatDump(),
+  - setMemoryMode() on a System,
+and exits with the exit code of the script. The script's own output
+isn't reproduced. Any other call the script made into the simulator
+(e.g., restoring or taking a checkpoint, switching CPUs, forking or
+calling any other C++ method of a SimObject) can't be replayed, and no
+snapshot is saved for such runs. Neither is one saved for scripts that
+raise an exception.
+
+SimObject classes are stored by reference, so they have to be importable
+when the snapshot is loaded. The Python path of the script is stored in
+the snapshot and restored before loading the hierarchy, which makes the
+classes in the script's helper modules (e.g., common.Caches) available.
+Classes defined in the configuration script itself can't be imported,
+so no snapshot is saved for hierarchies that use them.
+"""
+
+import atexit
+import contextlib
+import gzip
+import hashlib
+import io
+import os
+import pickle
+import sys
+
+from m5.util import fatal, inform, warn
+
+_MAGIC = b"gem5-config-snapshot-v3\n"
+_SUFFIX = ".snap.gz"
+
+# Pickling follows SimObject, parameter and port references
+# recursively, so large hierarchies need a deeper stack than the
+# default recursion limit allows.
+_RECURSION_LIMIT = 100000
+
+class _RecursionLimit(object):
+    def __enter__(self):
+        self._old = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(self._old, _RECURSION_LIMIT))
+
+    def __exit__(self, *args):
+        sys.setrecursionlimit(self._old)
+
+class _Recording(object):
+    """The snapshot of the running script, written when the script exits."""
+
+    def __init__(self, directory, key):
+        self.directory = directory
+        self.key = key
+        # Modules imported before the script started, which belong to
+        # gem5 rather than to the configuration.
+        self.modules = set(sys.modules)
+        # The hierarchy and the calls are pickled with the same pickler,
+        # so that SimObjects passed to the recorded calls refer to the
+        # objects of the pickled hierarchy.
+        self.buffer = io.BytesIO()
+        self.pickler = None
+        # The calls made by the script as (name, args, kwargs) tuples.
+        self.calls = []
+        self.replayable = True
+
+_recording = None
+
+# The calls a replay can reproduce.
+_REPLAYABLE = (
+    "setGlobalFrequency", "disableAllListeners", "instantiate",
+    "simulate", "stats.reset", "stats.dump", "stats.periodicStatDump",
+    "SimObject.setMemoryMode",
+)
+
+def _called_from_m5(depth):
+    """
+    Return whether the function depth frames above the caller is part of
+    m5 itself rather than of the configuration.
+    """
+    name = sys._getframe(depth + 1).f_globals.get("__name__", "")
+    return name == "m5" or name.startswith("m5.")
+
+def _file_digest(filename):
+    with open(filename, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _input_key(script, argv):
+    """
+    Return the hash of the inputs of a configuration script: the gem5
+    build, the script and its arguments, and the Python path.
+    """
+    from m5 import defines
+
+    inputs = (defines.gem5Version, defines.compileDate,
+              os.path.abspath(script), list(argv[1:]),
+              [ os.path.abspath(p) for p in sys.path ])
+    key = hashlib.sha256(_MAGIC + repr(inputs).encode())
+    with open(script, "rb") as f:
+        key.update(f.read())
+    return key.hexdigest()
+
+def _script_modules(before):
+    """
+    Return the sorted (file, hash) list of the modules imported since
+    before, which lists the names in sys.modules at that point.
+    """
+    modules = set()
+    for name, module in list(sys.modules.items()):
+        if name in before:
+            continue
+        # Modules embedded in gem5 are covered by the build in the key.
+        if type(getattr(module, "__loader__", None)).__name__ == \
+                "CodeImporter":
+            continue
+        filename = getattr(module, "__file__", None)
+        if filename and os.path.isfile(filename):
+            filename = os.path.abspath(filename)
+            modules.add((filename, _file_digest(filename)))
+    return sorted(modules)
+
+def _script_class(root):
+    """
+    Return the first class of an object in the hierarchy below root that
+    is defined in the configuration script, or None.
+    """
+    for obj in root.descendants():
+        cls = type(obj)
+        if sys.modules.get(cls.__module__) is None:
+            return cls
+    return None
+
+def lookup(directory, script, argv):
+    """
+    Find the snapshot of a configuration script in a snapshot cache.
+
+    :param directory: The snapshot cache directory.
+    :param script: The path to the configuration script.
+    :param argv: The arguments of the script, starting with the script.
+
+    :returns: The path to the snapshot, or None if there is no snapshot
+    for these inputs or the modules the script imported have changed.
+    """
+    path = os.path.join(directory, _input_key(script, argv) + _SUFFIX)
+    try:
+        with gzip.open(path, "rb") as f:
+            if f.readline() != _MAGIC:
+                return None
+            f.readline()
+            header = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+    for filename, digest in header["modules"]:
+        try:
+            if _file_digest(filename) != digest:
+                return None
+        except OSError:
+            return None
+    return path
+
+@contextlib.contextmanager
+def recording(directory, script, argv):
+    """
+    Record the configuration script run in the context, and save its
+    snapshot in directory when it exits.
+
+    :param directory: The snapshot cache directory, created if needed.
+    Nothing is recorded if it is None.
+    :param script: The path to the configuration script.
+    :param argv: The arguments of the script, starting with the script.
+    """
+    global _recording
+
+    if directory is None:
+        yield
+        return
+
+    _recording = _Recording(directory, _input_key(script, argv))
+    try:
+        yield
+    except SystemExit as e:
+        _finish(e.code)
+        raise
+    except BaseException:
+        _recording = None
+        raise
+    else:
+        _finish(None)
+
+def save(root):
+    """
+    Pickle the elaborated hierarchy below root for the snapshot of the
+    script that is being recorded, if any.
+
+    :param root: The Root SimObject of an elaborated hierarchy.
+
+    :returns: Whether the hierarchy was pickled.
+    """
+    global _recording
+
+    if _recording is None:
+        return False
+
+    cls = _script_class(root)
+    if cls is not None:
+        warn("Not saving a configuration snapshot: %s is defined in the " \
+             "configuration script and can't be loaded from a snapshot, " \
+             "move it to a module to make snapshots of this configuration",
+             cls.__name__)
+        _recording = None
+        return False
+
+    pickler = pickle.Pickler(_recording.buffer,
+                             protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        with _RecursionLimit():
+            pickler.dump(root)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        warn("Not saving a configuration snapshot: %s", e)
+        _recording = None
+        return False
+
+    _recording.pickler = pickler
+    _recording.calls.append(("instantiate", (), {}))
+    return True
+
+def record(name, *args, **kwargs):
+    """
+    Record a call to the simulator made by the script that is being
+    recorded. Calls that m5 makes on its own behalf aren't recorded.
+    """
+    if _recording is None or _called_from_m5(2):
+        return
+    if name not in _REPLAYABLE:
+        _recording.replayable = False
+    _recording.calls.append((name, args, kwargs))
+
+def method(obj, attr, value):
+    """
+    Return the attribute attr of the C++ object of obj, which is value,
+    recording the calls the script makes to it if it is a method.
+    """
+    if _recording is None or not callable(value) or _called_from_m5(2):
+        return value
+
+    def call(*args, **kwargs):
+        record("SimObject." + attr, obj, *args, **kwargs)
+        return value(*args, **kwargs)
+    return call
+
+def _finish(code):
+    """Stop recording and save the snapshot when the script exits."""
+    global _recording
+
+    rec, _recording = _recording, None
+    if rec is None or rec.pickler is None:
+        return
+
+    if not rec.replayable:
+        names = sorted(set(name for name, args, kwargs in rec.calls
+                           if name not in _REPLAYABLE))
+        inform("Not saving a configuration snapshot: the script called " \
+               "%s, which can't be replayed",
+               ", ".join("%s()" % n for n in names))
+        return
+
+    try:
+        with _RecursionLimit():
+            rec.pickler.dump(rec.calls)
+    except (pickle.PicklingError, TypeError, AttributeError,
+            RuntimeError) as e:
+        warn("Not saving a configuration snapshot: %s", e)
+        return
+
+    header = pickle.dumps({
+        "path" : [ os.path.abspath(p) for p in sys.path ],
+        "modules" : _script_modules(rec.modules),
+        "exit" : code,
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+    data = header + rec.buffer.getvalue()
+    atexit.register(_write, rec.directory, rec.key, data)
+
+def _write(directory, key, data):
+    path = os.path.join(directory, key + _SUFFIX)
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so that concurrent runs sharing
+    # a cache directory never see a partially written snapshot.
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+        f.write(_MAGIC)
+        f.write(hashlib.sha256(data).hexdigest().encode() + b"\n")
+        f.write(data)
+    os.replace(tmp_path, path)
+    inform("Saved configuration snapshot %s", path)
+
+def load(path):
+    """
+    Load a snapshot.
+
+    :param path: The path to the snapshot file.
+
+    :returns: The Root SimObject of the restored hierarchy, the calls
+    made by the script that saved it and the exit code of the script.
+    """
+    with gzip.open(path, "rb") as f:
+        if f.readline() != _MAGIC:
+            fatal("%s is not a gem5 configuration snapshot", path)
+        digest = f.readline().strip().decode()
+        data = f.read()
+
+    if hashlib.sha256(data).hexdigest() != digest:
+        fatal("Configuration snapshot %s is corrupt", path)
+
+    f = io.BytesIO(data)
+    header = pickle.load(f)
+    sys.path[0:0] = [ p for p in header["path"] if p not in sys.path ]
+    unpickler = pickle.Unpickler(f)
+    with _RecursionLimit():
+        root = unpickler.load()
+        calls = unpickler.load()
+    return root, calls, header["exit"]
+
+def run(path):
+    """
+    Load a snapshot and replay the calls made by the script that saved
+    it. Exits with the exit code of the script.
+
+    :param path: The path to the snapshot file.
+    """
+    import m5
+
+    root, calls, code = load(path)
+    names = [ name for name, args, kwargs in calls
+              if name not in _REPLAYABLE ]
+    if names:
+        fatal("Configuration snapshot %s can't be replayed: the script " \
+              "called %s", path, ", ".join("%s()" % n for n in names))
+
+    replay = {
+        "setGlobalFrequency" : m5.ticks.setGlobalFrequency,
+        "disableAllListeners" : m5.disableAllListeners,
+        "instantiate" : m5.instantiate,
+        "simulate" : m5.simulate,
+        "stats.reset" : m5.stats.reset,
+        "stats.dump" : m5.stats.dump,
+        "stats.periodicStatDump" : m5.stats.periodicStatDump,
+        "SimObject.setMemoryMode" :
+            lambda obj, *args: obj.setMemoryMode(*args),
+    }
+
+    inform("Loaded configuration snapshot %s", path)
+    exit_event = None
+    for name, args, kwargs in calls:
+        result = replay[name](*args, **kwargs)
+        if name == "simulate":
+            exit_event = result
+
+    if exit_event is not None:
+        print("Exiting @ tick %i because %s" %
+              (m5.curTick(), exit_event.getCause()))
+    if code is not None:
+        sys.exit(code)
@@ -0,0 +1,294 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+A compact columnar binary format for time series of gem5 statistics.
+
+Every statistic value is flattened into a column of 64-bit floats. The
+column names are written once, then each dump appends one record holding
+the tick of the dump and the value of every column. Delta records only
+store the columns that changed since the previous dump, together with a
+bitmap of the changed columns.
+
+File layout (all integers are little endian)::
+
+    magic        8 bytes, b"GEM5COL\\x01"
+    record*      tag (1 byte), payload length (u64), payload
+
+    'N' record   column names: count (u32), then for each name its
+                 UTF-8 length (u16) and bytes. Always the first record.
+    'F' record   full dump: tick (u64), one f64 per column
+    'D' record   delta dump: tick (u64), changed bitmap (ceil(n / 8)
+                 bytes, bit i of byte i // 8 set if column i changed),
+                 then one f64 per changed column in column order
+
+Reading the file back into NumPy arrays requires NumPy; iterating over
+the dumps with `iter_dumps()` does not.
+"""
+
+from array import array
+import struct
+import sys
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b"GEM5COL\x01"
+
+_RECORD_HEADER = struct.Struct("<cQ")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+def _f64_array(values: Sequence[float]) -> array:
+    a = array("d", values)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+class ColumnarStatsWriter():
+    """
+    Writes the columnar stats format to a binary stream.
+    """
+
+    def __init__(self, fp: BinaryIO, names: Sequence[str],
+                 delta: bool = True):
+        """
+        Parameters
+        ----------
+
+        fp: BinaryIO
+            The stream the file is written to.
+
+        names: Sequence[str]
+            The name of every column.
+
+        delta: bool
+            If True, dumps after the first only store the columns that
+            changed since the previous dump.
+        """
+
+        self._fp = fp
+        self._num_columns = len(names)
+        self._delta = delta
+        self._last = None
+
+        payload = [_U32.pack(len(names))]
+        for name in names:
+            encoded = name.encode()
+            payload.append(_U16.pack(len(encoded)))
+            payload.append(encoded)
+
+        self._fp.write(MAGIC)
+        self._write_record(b"N", b"".join(payload))
+
+    def _write_record(self, tag: bytes, payload: bytes) -> None:
+        self._fp.write(_RECORD_HEADER.pack(tag, len(payload)))
+        self._fp.write(payload)
+
+    def write_dump(self, tick: int, values: Sequence[float]) -> None:
+        """
+        Appends one dump to the file.
+
+        Parameters
+        ----------
+
+        tick: int
+            The tick at which the values were sampled.
+
+        values: Sequence[float]
+            One value per column, in column order.
+        """
+
+        if len(values) != self._num_columns:
+            raise ValueError("Expected %d values, got %d" %
+                             (self._num_columns, len(values)))
+
+        last = self._last
+        self._last = values = array("d", values)
+
+        if not self._delta or last is None:
+            self._write_record(b"F",
+                               _U64.pack(tick) + _f64_array(values).tobytes())
+            return
+
+        bitmap = bytearray((self._num_columns + 7) // 8)
+        changed = []
+        for i, (old, new) in enumerate(zip(last, values)):
+            # NaN != NaN, but an unchanged NaN is not a change.
+            if old != new and (old == old or new == new):
+                bitmap[i >> 3] |= 1 << (i & 7)
+                changed.append(new)
+
+        self._write_record(b"D", _U64.pack(tick) + bytes(bitmap) +
+                           _f64_array(changed).tobytes())
+
+    def flush(self) -> None:
+        self._fp.flush()
+
+def _read_records(fp: BinaryIO) -> Iterator[Tuple[bytes, bytes]]:
+    if fp.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a columnar gem5 stats file")
+
+    while True:
+        header = fp.read(_RECORD_HEADER.size)
+        if not header:
+            return
+        if len(header) != _RECORD_HEADER.size:
+            # A truncated trailing record, e.g. from a simulation that is
+            # still running. Ignore it.
+            return
+        tag, length = _RECORD_HEADER.unpack(header)
+        payload = fp.read(length)
+        if len(payload) != length:
+            return
+        yield tag, payload
+
+def _parse_names(payload: bytes) -> List[str]:
+    count, = _U32.unpack_from(payload, 0)
+    offset = _U32.size
+    names = []
+    for _ in range(count):
+        length, = _U16.unpack_from(payload, offset)
+        offset += _U16.size
+        names.append(payload[offset:offset + length].decode())
+        offset += length
+    return names
+
+def _unpack_f64(data: bytes) -> array:
+    a = array("d")
+    a.frombytes(data)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+def iter_dumps(fp: BinaryIO
+               ) -> Iterator[Tuple[List[str], int, array, Optional[bytes]]]:
+    """
+    Iterates over the dumps in a columnar stats stream.
+
+    Yields
+    ------
+    Tuple[List[str], int, array, Optional[bytes]]
+        The column names, the tick of the dump, the value of every column
+        (with unchanged columns filled in from the previous dump) and the
+        changed bitmap for delta dumps (None for full dumps).
+    """
+
+    names = None
+    values = None
+    for tag, payload in _read_records(fp):
+        if tag == b"N":
+            names = _parse_names(payload)
+            values = None
+            continue
+
+        if names is None:
+            raise ValueError("Dump record before the column names")
+
+        tick, = _U64.unpack_from(payload, 0)
+        if tag == b"F":
+            values = _unpack_f64(payload[_U64.size:])
+            yield names, tick, values, None
+        elif tag == b"D":
+            if values is None:
+                raise ValueError("Delta dump without a preceding full dump")
+            bitmap_end = _U64.size + (len(names) + 7) // 8
+            bitmap = payload[_U64.size:bitmap_end]
+            changed = iter(_unpack_f64(payload[bitmap_end:]))
+            values = array("d", values)
+            for byte_idx, byte in enumerate(bitmap):
+                while byte:
+                    low = byte & -byte
+                    values[(byte_idx << 3) + low.bit_length() - 1] = \
+                        next(changed)
+                    byte ^= low
+            yield names, tick, values, bitmap
+        else:
+            raise ValueError("Unknown record type %r" % tag)
+
+class ColumnarStats():
+    """
+    A columnar stats file loaded into NumPy arrays.
+
+    Attributes
+    ----------
+
+    names: List[str]
+        The name of every column.
+
+    ticks: numpy.ndarray
+        The tick of every dump (uint64, one entry per dump).
+
+    values: numpy.ndarray
+        The value of every column at every dump (float64, shape
+        (dumps, columns)).
+
+    changed: numpy.ndarray
+        Whether a column changed at a dump (bool, same shape as values).
+        Every column is marked as changed for full dumps.
+    """
+
+    def __init__(self, filename: str):
+        import numpy as np
+
+        names = []
+        ticks = []
+        rows = []
+        changed = []
+        with open(filename, "rb") as fp:
+            for names, tick, values, bitmap in iter_dumps(fp):
+                ticks.append(tick)
+                rows.append(np.frombuffer(values, dtype=np.float64))
+                if bitmap is None:
+                    changed.append(np.ones(len(names), dtype=bool))
+                else:
+                    changed.append(np.unpackbits(
+                        np.frombuffer(bitmap, dtype=np.uint8),
+                        bitorder="little")[:len(names)].astype(bool))
+
+        self.names = names
+        self._index = {name: i for i, name in enumerate(names)}
+        self.ticks = np.array(ticks, dtype=np.uint64)
+        if rows:
+            self.values = np.vstack(rows)
+            self.changed = np.vstack(changed)
+        else:
+            self.values = np.zeros((0, len(names)), dtype=np.float64)
+            self.changed = np.zeros((0, len(names)), dtype=bool)
+
+    def __getitem__(self, name: str):
+        """
+        Returns the time series of a column across all dumps.
+        """
+        return self.values[:, self._index[name]]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+def load(filename: str) -> ColumnarStats:
+    """
+    Loads a columnar stats file into NumPy arrays.
+    """
+    return ColumnarStats(filename)
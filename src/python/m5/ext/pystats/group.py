@@ -24,14 +24,109 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from bisect import bisect_left
+import fnmatch
 import re
-from typing import Callable, Dict, Iterator, List, Optional, Pattern, Union
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Pattern,
+                    Tuple, Union)
 
 from .jsonserializable import JsonSerializable
 from .statistic import Scalar, Statistic
 from .timeconversion import TimeConversion
 
-class Group(JsonSerializable):
+class PathIndexed():
+    """
+    Mixin for stats containers that supports looking up the statistics
+    below the container by their full dotted path.
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Adding or replacing a child invalidates the path index.
+        if not name.startswith('_'):
+            self.__dict__.pop('_path_index', None)
+        super(PathIndexed, self).__setattr__(name, value)
+
+    def _get_path_index(self) -> "_PathIndex":
+        index = self.__dict__.get('_path_index')
+        if index is None:
+            index = _PathIndex(self)
+            self.__dict__['_path_index'] = index
+        return index
+
+    def find_path(self, path: str) -> Optional[Statistic]:
+        """ Find a statistic by its full dotted path below this object
+
+        ```
+        >>> simstat.system.find_path('cpu0.numCycles')
+        cpu0.numCycles
+        ```
+
+        The lookup uses an index of all the statistics below this object.
+        The index is built on first use and rebuilt when a child is added
+        to or replaced in this object. Changes further down the hierarchy
+        are not tracked.
+
+        :param: path: The dotted path, relative to this object.
+        :returns: The statistic, or None if there is no statistic at path.
+        """
+        return self._get_path_index().stats.get(path)
+
+    def match_paths(self, pattern: Union[str, Pattern],
+                    match: str = "glob") -> List[str]:
+        """ Find the full dotted paths of the statistics below this object
+
+        ```
+        >>> simstat.system.match_paths('cpu*.numCycles')
+        ['cpu0.numCycles', 'cpu1.numCycles']
+        >>> simstat.system.match_paths('l2', match='prefix')
+        ['l2.demandHits::total', 'l2.demandMisses::total', ...]
+        ```
+
+        Results are cached, so repeating a query is cheap.
+
+        :param: pattern: The pattern to match the paths against.
+        :param: match: How to interpret the pattern. "exact" matches the
+                path itself, "prefix" matches the paths starting with the
+                pattern, "glob" matches shell-style wildcards (see fnmatch)
+                and "regex" matches paths in which the regular expression
+                is found (see re.search).
+        :returns: The matching paths, in sorted order.
+        """
+        return list(self._get_path_index().match(pattern, match))
+
+    def find_values(self, pattern: Union[str, Pattern],
+                    match: str = "glob"):
+        """ Return the values of the matching statistics as a NumPy array
+
+        ```
+        >>> simstat.system.find_values('cpu*.numCycles').sum()
+        2000000
+        ```
+
+        :param: pattern: See `match_paths`.
+        :param: match: See `match_paths`.
+        :returns: A numpy.ndarray with the value of every matching
+                  statistic, in the order of `match_paths`. If any of
+                  them is not a scalar (e.g., a vector or distribution),
+                  the array has an object dtype and holds the values of
+                  the vectors as NumPy arrays, which may differ in length.
+        """
+        import numpy
+
+        stats = self._get_path_index().stats
+        matches = [stats[path] for path in self.match_paths(pattern, match)]
+        if all(isinstance(stat, Scalar) for stat in matches):
+            return numpy.array([stat.value for stat in matches])
+
+        values = numpy.empty(len(matches), dtype=object)
+        for i, stat in enumerate(matches):
+            if isinstance(stat, Scalar):
+                values[i] = stat.value
+            else:
+                values[i] = numpy.asarray(stat.value)
+        return values
+
+class Group(JsonSerializable, PathIndexed):
     """
     Used to create the heirarchical stats structure. A Group object contains a
     map of labeled  Groups, Statistics, Lists of Groups, or List of Statistics.
@@ -121,6 +216,61 @@ class Group(JsonSerializable):
             regex = re.compile(regex)
         yield from self.children(lambda _name: regex.search(_name))
 
+class _PathIndex():
+    """
+    An index of all the statistics below a group by full dotted path.
+    """
+
+    def __init__(self, root: PathIndexed):
+        self.stats = {}
+        self._add(root, "")
+        self.paths = sorted(self.stats)
+        self._cache = {}
+
+    def _add(self, obj: Any, prefix: str) -> None:
+        for name, child in obj.__dict__.items():
+            if name.startswith('_'):
+                continue
+            self._add_child(child, prefix + name)
+
+    def _add_child(self, child: Any, path: str) -> None:
+        if isinstance(child, Statistic):
+            self.stats[path] = child
+        elif isinstance(child, Group):
+            self._add(child, path + ".")
+        elif isinstance(child, list):
+            for i, element in enumerate(child):
+                self._add_child(element, "%s.%d" % (path, i))
+
+    def match(self, pattern: Union[str, Pattern],
+              match: str) -> Tuple[str, ...]:
+        key = (pattern, match)
+        result = self._cache.get(key)
+        if result is not None:
+            return result
+
+        if match == "exact":
+            result = (pattern,) if pattern in self.stats else ()
+        elif match == "prefix":
+            start = bisect_left(self.paths, pattern)
+            end = start
+            while end < len(self.paths) and \
+                    self.paths[end].startswith(pattern):
+                end += 1
+            result = tuple(self.paths[start:end])
+        elif match == "glob":
+            regex = re.compile(fnmatch.translate(pattern))
+            result = tuple(p for p in self.paths if regex.match(p))
+        elif match == "regex":
+            if isinstance(pattern, str):
+                pattern = re.compile(pattern)
+            result = tuple(p for p in self.paths if pattern.search(p))
+        else:
+            raise ValueError("Unknown match type '%s'" % match)
+
+        self._cache[key] = result
+        return result
+
 class Vector(Group):
     """
     The Vector class is used to store vector information. However, in gem5
@@ -24,9 +24,11 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from array import array
 from datetime import datetime
+from functools import lru_cache
 import json
-from typing import Dict, List, Union, Any, IO
+from typing import Dict, Iterator, List, Tuple, Union, Any, IO
 
 from .storagetype import StorageType
 
@@ -45,6 +47,21 @@ class JsonSerializable:
     ```
     """
 
+    __slots__ = ()
+
+    def _fields(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterates through the (name, value) pairs to be serialized: the
+        `__slots__` of every class in the MRO, from the base class down,
+        followed by the instance `__dict__`, if any. Private attributes
+        (e.g., cached lookup indices) are not part of the serialized model.
+        """
+        for key in _slot_names(type(self)):
+            yield key, getattr(self, key)
+        for key, value in getattr(self, '__dict__', {}).items():
+            if not key.startswith('_'):
+                yield key, value
+
     def to_json(self) -> Dict:
         """
         Translates the current object into a JSON dictionary.
@@ -56,7 +73,7 @@ class JsonSerializable:
         """
 
         model_dct = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._fields():
             new_value = self.__process_json_value(value)
             model_dct[key] = new_value
         return model_dct
@@ -86,6 +103,8 @@ class JsonSerializable:
             return value.replace(microsecond=0).isoformat()
         elif isinstance(value, list):
             return [self.__process_json_value(v) for v in value]
+        elif isinstance(value, array):
+            return value.tolist()
         elif isinstance(value, StorageType):
             return str(value.name)
 
@@ -164,4 +183,16 @@ class JsonSerializable:
         if 'indent' not in kwargs:
             kwargs['indent'] = 4
 
-        json.dump(obj=self.to_json(), fp=fp, **kwargs)
\ No newline at end of file
+        json.dump(obj=self.to_json(), fp=fp, **kwargs)
+
+@lru_cache(maxsize=None)
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if not name.startswith('_') and name not in names:
+                names.append(name)
+    return tuple(names)
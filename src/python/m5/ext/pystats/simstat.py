@@ -28,11 +28,11 @@ from datetime import datetime
 from typing import Dict, List, Optional, Union
 
 from .jsonserializable import JsonSerializable
-from .group import Group
+from .group import Group, PathIndexed
 from .statistic import Statistic
 from .timeconversion import TimeConversion
 
-class SimStat(JsonSerializable):
+class SimStat(JsonSerializable, PathIndexed):
     """
     Contains all the statistics for a given simulation.
     """
@@ -33,8 +33,12 @@ from .storagetype import StorageType
 class Statistic(ABC, JsonSerializable):
     """
     The abstract base class for all Python statistics.
+
+    Statistics use `__slots__` as a SimStat may hold millions of them.
     """
 
+    __slots__ = ("value", "type", "unit", "description", "datatype")
+
     value: Any
     type: Optional[str]
     unit: Optional[str]
@@ -56,6 +60,8 @@ class Scalar(Statistic):
     A scalar Python statistic type.
     """
 
+    __slots__ = ()
+
     value: Union[float, int]
 
     def __init__(self, value: Any,
@@ -74,6 +80,9 @@ class BaseScalarVector(Statistic):
     """
     An abstract base class for classes containing a vector of Scalar values.
     """
+
+    __slots__ = ()
+
     value: List[Union[int,float]]
 
     def __init__(self, value: List[Union[int,float]],
@@ -117,6 +126,20 @@ class BaseScalarVector(Statistic):
         assert(isinstance(self.value, List))
         return sum(self.value)
 
+    def as_array(self):
+        """
+        Returns the value vector as a NumPy array. The values stay stored as
+        a list, so each call copies them into a new array.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values of all bins.
+        """
+        import numpy
+
+        return numpy.asarray(self.value)
+
 
 class Distribution(BaseScalarVector):
     """
@@ -128,6 +151,9 @@ class Distribution(BaseScalarVector):
     It is assumed each bucket is of equal size.
     """
 
+    __slots__ = ("min", "max", "num_bins", "bin_size", "sum", "underflow",
+                 "overflow", "logs", "sum_squared")
+
     value: List[int]
     min: Union[float, int]
     max: Union[float, int]
@@ -179,6 +205,8 @@ class Accumulator(BaseScalarVector):
     A statistical type representing an accumulator.
     """
 
+    __slots__ = ("count", "min", "max", "sum_squared")
+
     count: int
     min: Union[int, float]
     max: Union[int, float]
@@ -203,4 +231,4 @@ class Accumulator(BaseScalarVector):
         self.count = count
         self.min = min
         self.max = max
-        self.sum_squared = sum_squared
\ No newline at end of file
+        self.sum_squared = sum_squared
@@ -128,6 +128,16 @@ def parse_options():
     option("--dot-dvfs-config", metavar="FILE", default=None,
         help="Create DOT & pdf outputs of the DVFS configuration" + \
              " [Default: %default]")
+    option("--config-snapshot-dir", metavar="DIR", default=None,
+        help="Cache snapshots of elaborated configurations in DIR, and " \
+             "replay the snapshot of the script and its arguments " \
+             "instead of running the script if there is one " \
+             "[Default: %default]")
+    option("--load-config-snapshot", metavar="FILE", default=None,
+        help="Run the configuration snapshot in FILE instead of a script")
+    option("--config-override", metavar="STMT", action='append', default=[],
+        help="Python statement applied to the root of the elaborated " \
+             "configuration (may be given multiple times)")
 
     # Debugging options
     group("Debugging Options")
@@ -146,6 +156,8 @@ def parse_options():
         help="Sets the output file for debug [Default: %default]")
     option("--debug-ignore", metavar="EXPR", action='append', split=':',
         help="Ignore EXPR sim objects")
+    option("--instantiate-profile", action="store_true", default=False,
+        help="Print the time spent in each phase of m5.instantiate()")
     option("--remote-gdb-port", type='int', default=7000,
         help="Remote gdb base port (set to 0 to disable listening)")
 
@@ -300,6 +312,9 @@ def main(*args):
 
     if options.list_sim_objects:
         from . import SimObject
+        from .objects import _loadAll
+        # SimObjects are only registered once their modules are imported.
+        _loadAll()
         done = True
         print("SimObjects:")
         objects = list(SimObject.allClasses.keys())
@@ -349,7 +364,12 @@ def main(*args):
         print()
 
     # check to make sure we can find the listed script
-    if not arguments or not os.path.isfile(arguments[0]):
+    if options.load_config_snapshot:
+        if not os.path.isfile(options.load_config_snapshot):
+            print("Configuration snapshot %s not found" %
+                  options.load_config_snapshot)
+            options.usage(2)
+    elif not arguments or not os.path.isfile(arguments[0]):
         if arguments and not os.path.isfile(arguments[0]):
             print("Script %s not found" % arguments[0])
 
@@ -423,10 +443,27 @@ def main(*args):
         _check_tracing()
         trace.ignore(ignore)
 
+    from . import config_snapshot
+    if options.load_config_snapshot:
+        config_snapshot.run(options.load_config_snapshot)
+        return
+
     sys.argv = arguments
     sys.path = [ os.path.dirname(sys.argv[0]) ] + sys.path
 
     filename = sys.argv[0]
+
+    # Scripts run under pdb or interactively can do anything, so they
+    # are neither replayed nor recorded.
+    snapshot_dir = options.config_snapshot_dir
+    if options.pdb or options.interactive:
+        snapshot_dir = None
+    elif snapshot_dir:
+        snapshot = config_snapshot.lookup(snapshot_dir, filename, sys.argv)
+        if snapshot:
+            config_snapshot.run(snapshot)
+            return
+
     filedata = open(filename, 'r').read()
     filecode = compile(filedata, filename, 'exec')
     scope = { '__file__' : filename,
@@ -452,7 +489,8 @@ def main(*args):
                 t = t.tb_next
                 pdb.interaction(t.tb_frame,t)
     else:
-        exec(filecode, scope)
+        with config_snapshot.recording(snapshot_dir, filename, sys.argv):
+            exec(filecode, scope)
 
     # once the script is done
     if options.interactive:
@@ -24,6 +24,11 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+# The SimObjects in this package are imported from the modules defining
+# them when they're first used, using an index of the names each SimObject
+# module provides which is generated at build time. Set M5_EAGER_OBJECTS
+# to import every SimObject module up front instead.
+
 from m5.internal import params
 from m5.SimObject import *
 
@@ -32,6 +37,61 @@ try:
 except NameError:
     modules = { }
 
-for module in modules.keys():
-    if module.startswith('m5.objects.'):
-        exec("from %s import *" % module)
+try:
+    from m5.objects._index import names as _names
+except ImportError:
+    _names = None
+
+def _isSimObjectModule(modpath):
+    return modpath.startswith('m5.objects.') and \
+        not modpath.startswith('m5.objects._')
+
+def _loadAll():
+    '''Import everything from every SimObject module.'''
+    for module in modules.keys():
+        if _isSimObjectModule(module):
+            exec("from %s import *" % module, globals())
+
+def _setupLazy():
+    import importlib
+    import os
+    import sys
+    import types
+
+    eager = os.environ.get('M5_EAGER_OBJECTS', 'false').lower()
+    if _names is None or eager in ('true', 'yes'):
+        _loadAll()
+        return
+
+    class LazyObjects(types.ModuleType):
+        def __getattr__(self, name):
+            modpath = _names.get(name)
+            # The index covers all SimObject modules, not all of which
+            # are necessarily built in.
+            if modpath is None or \
+                    (_isSimObjectModule(modpath) and modpath not in modules):
+                raise AttributeError("module '%s' has no attribute '%s'" %
+                                     (self.__name__, name))
+            value = getattr(importlib.import_module(modpath), name)
+            setattr(self, name, value)
+            return value
+
+        def __setattr__(self, name, value):
+            # Importing a SimObject module binds it to its name in this
+            # package, which would hide the SimObject it's named after.
+            if name in _names and isinstance(value, types.ModuleType) and \
+                    value.__name__ == '%s.%s' % (self.__name__, name):
+                return
+            super(LazyObjects, self).__setattr__(name, value)
+
+        def __dir__(self):
+            return sorted(set(self.__dict__) | set(__all__))
+
+    # "from m5.objects import *" still imports everything.
+    available = set(name for name in globals() if not name.startswith('_'))
+    available.update(name for name, modpath in _names.items()
+                     if not _isSimObjectModule(modpath) or modpath in modules)
+    globals()['__all__'] = sorted(available)
+    sys.modules[__name__].__class__ = LazyObjects
+
+_setupLazy()
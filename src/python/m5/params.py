@@ -173,6 +173,11 @@ class ParamDesc(object):
     def __getattr__(self, attr):
         if attr == 'ptype':
             from . import SimObject
+            if self.ptype_str not in SimObject.allClasses:
+                # m5.objects imports SimObject modules on demand, so the
+                # one defining this type may not have been imported yet.
+                from . import objects
+                getattr(objects, self.ptype_str, None)
             ptype = SimObject.allClasses[self.ptype_str]
             assert isSimObjectClass(ptype)
             self.ptype = ptype
@@ -42,7 +42,39 @@
 #
 #####################################################################
 
-import copy
+import contextlib
+
+# Results of proxies searching up the hierarchy, shared between all the
+# proxies unproxied while cachedResolution() is in effect.  Maps the cache
+# key of a proxy and an object to the result of searching that object and
+# its ancestors.
+_resolution_cache = None
+
+# The objects proxies are currently being resolved from, innermost last.
+_searching = []
+
+@contextlib.contextmanager
+def cachedResolution():
+    '''
+    Share the results of searches up the hierarchy between proxies while
+    the hierarchy doesn't change, e.g., the many Parent.any proxies for the
+    same type in a large system.
+    '''
+    global _resolution_cache
+    _resolution_cache = {}
+    try:
+        yield
+    finally:
+        _resolution_cache = None
+
+class _CachedSearch(object):
+    __slots__ = ('generation', 'result', 'found', 'chain')
+
+    def __init__(self, generation, result, found, chain):
+        self.generation = generation
+        self.result = result
+        self.found = found
+        self.chain = chain
 
 class BaseProxy(object):
     def __init__(self, search_self, search_up):
@@ -121,14 +153,14 @@ class BaseProxy(object):
             # as visited to avoid a self-reference
             self._visited = True
             obj._visited = True
-            while not done:
-                obj = obj._parent
-                if not obj:
-                    break
-                result, done = self.find(obj)
-
-            self._visited = False
-            base._visited = False
+            _searching.append(obj)
+            try:
+                if not done:
+                    result, obj, done = self._find_up(obj._parent)
+            finally:
+                _searching.pop()
+                self._visited = False
+                base._visited = False
 
         if not done:
             raise AttributeError(
@@ -142,6 +174,71 @@ class BaseProxy(object):
 
         return self._opcheck(result, base)
 
+    def _find_up(self, obj):
+        '''
+        Search obj and then its ancestors.
+
+        :returns: the result, the object it was found in and whether it was
+            found at all.
+        '''
+        key = self._cache_key() if _resolution_cache is not None else None
+        if key is None:
+            while obj:
+                result, done = self.find(obj)
+                if done:
+                    return result, obj, True
+                obj = obj._parent
+            return None, None, False
+
+        from .SimObject import _hierarchy_generation as generation
+        searched = []
+        chain = []
+        result, found = None, None
+        while obj:
+            entry = _resolution_cache.get((key, id(obj)))
+            if entry is not None and entry.generation == generation and \
+                    not any(self._depends_on_visited(o) for o in entry.chain):
+                result, found = entry.result, entry.found
+                chain = entry.chain
+                break
+            searched.append(obj)
+            result, done = self.find(obj)
+            if done:
+                found = obj
+                break
+            obj = obj._parent
+
+        # Failed searches are not cached: they make unproxy() fail anyway.
+        if found is None:
+            return None, None, False
+
+        # The search from each object is only shared if none of the objects
+        # it went through skipped a visited object, which would make it
+        # depend on where this search started.
+        chain = list(chain)
+        for obj in reversed(searched):
+            if self._depends_on_visited(obj):
+                break
+            chain.insert(0, obj)
+            _resolution_cache[key, id(obj)] = _CachedSearch(
+                generation, result, found, tuple(chain))
+
+        return result, found, True
+
+    def _cache_key(self):
+        '''
+        The key to share the searches of this proxy with equivalent ones
+        under, or None if they can't be shared.
+        '''
+        return None
+
+    def _depends_on_visited(self, obj):
+        '''
+        Whether finding this proxy in obj depends on which objects are
+        marked as visited, i.e., on where the search started.
+        '''
+        return True
+
     def getindex(obj, index):
         if index == None:
             return obj
@@ -176,9 +273,7 @@ class AttrProxy(BaseProxy):
         # Return a copy of self rather than modifying self in place
         # since self could be an indirect reference via a variable or
         # parameter
-        new_self = copy.deepcopy(self)
-        new_self._modifiers.append(attr)
-        return new_self
+        return self._modified(attr)
 
     # support indexing on proxies (e.g., Self.cpu[0])
     def __getitem__(self, key):
@@ -186,10 +281,24 @@ class AttrProxy(BaseProxy):
             raise TypeError("Proxy object requires integer index")
         if hasattr(self, '_pdesc'):
             raise AttributeError("Index operation on bound proxy")
-        new_self = copy.deepcopy(self)
-        new_self._modifiers.append(key)
+        return self._modified(key)
+
+    def _modified(self, modifier):
+        new_self = AttrProxy(self._search_self, self._search_up, self._attr)
+        new_self._ops = list(self._ops)
+        new_self._modifiers = self._modifiers + [ modifier ]
         return new_self
 
+    def _cache_key(self):
+        return ('attr', self._attr, tuple(self._modifiers))
+
+    def _depends_on_visited(self, obj):
+        try:
+            val = getattr(obj, self._attr)
+        except:
+            return False
+        return getattr(val, '_visited', False)
+
     def find(self, obj):
         try:
             val = getattr(obj, self._attr)
@@ -236,6 +345,13 @@ class AnyProxy(BaseProxy):
     def find(self, obj):
         return obj.find_any(self._pdesc.ptype)
 
+    def _cache_key(self):
+        return ('any', self._pdesc.ptype)
+
+    def _depends_on_visited(self, obj):
+        # find_any() skips the visited children of obj.
+        return any(o._parent is obj for o in _searching)
+
     def path(self):
         return 'any'
 
@@ -40,6 +40,7 @@
 import atexit
 import os
 import sys
+import time
 
 # import the wrapped C++ functions
 import _m5.drain
@@ -48,12 +49,14 @@ from _m5.stats import updateEvents as updateStatEvents
 
 from . import stats
 from . import SimObject
+from . import config_snapshot
 from . import ticks
 from . import objects
+from . import proxy
 from m5.util.dot_writer import do_dot, do_dvfs_dot
 from m5.util.dot_writer_ruby import do_ruby_dot
 
-from .util import fatal
+from .util import fatal, inform
 from .util import attrdict
 
 # define a MaxTick parameter, unsigned 64 bit
@@ -67,6 +70,31 @@ _memory_modes = {
 
 _drain_manager = _m5.drain.DrainManager.instance()
 
+class _InstantiateProfile(object):
+    """Accumulate wall-clock time spent in each phase of instantiate()."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.phases = []
+        self._last = time.perf_counter()
+
+    def phase(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def report(self, num_objects):
+        if not self.enabled:
+            return
+        total = sum(t for _, t in self.phases)
+        print("instantiate() profile (%d SimObjects):" % num_objects)
+        for name, t in self.phases:
+            pct = 100.0 * t / total if total else 0.0
+            print("  %-24s %10.3f ms %6.1f%%" % (name, t * 1000.0, pct))
+        print("  %-24s %10.3f ms" % ("total", total * 1000.0))
+
 # The final hook to generate .ini files.  Called from the user script
 # once the config is built.
 def instantiate(ckpt_dir=None):
@@ -77,22 +105,46 @@ def instantiate(ckpt_dir=None):
     if not root:
         fatal("Need to instantiate Root() before calling instantiate()")
 
+    profile = _InstantiateProfile(options.instantiate_profile)
+
     # we need to fix the global frequency
     ticks.fixGlobalFrequency()
 
     # Make sure SimObject-valued params are in the configuration
-    # hierarchy so we catch them with future descendants() walks
+    # hierarchy so we catch them with future descendants() walks.
+    # This pass adds children while walking the tree, so it has to use
+    # the live generator rather than the cached walk.
     for obj in root.descendants(): obj.adoptOrphanParams()
+    profile.phase("adoptOrphanParams")
+
+    # Unproxy in sorted order for determinism.  Resolving a proxy can
+    # assign an unparented SimObject, which has to be unproxied in turn,
+    # so this pass also walks the tree with the live generator.
+    with proxy.cachedResolution():
+        for obj in root.descendants(): obj.unproxyParams()
+    profile.phase("unproxyParams")
 
-    # Unproxy in sorted order for determinism
-    for obj in root.descendants(): obj.unproxyParams()
+    # The tree no longer changes, so the remaining passes share a single
+    # walk of the hierarchy.  descendants_list() returns a snapshot of
+    # the walk, and only rebuilds it when called again after the tree
+    # has changed.
+
+    if config_snapshot.save(root):
+        profile.phase("config_snapshot")
+
+    # Overrides apply to the hierarchy of a script as well as to a
+    # snapshot, but aren't part of the snapshot.
+    if options.config_override:
+        root.apply_config(options.config_override)
+        profile.phase("config_override")
 
     if options.dump_config:
         ini_file = open(os.path.join(options.outdir, options.dump_config), 'w')
         # Print ini sections in sorted order for easier diffing
-        for obj in sorted(root.descendants(), key=lambda o: o.path()):
+        for obj in sorted(root.descendants_list(), key=lambda o: o.path()):
             obj.print_ini(ini_file)
         ini_file.close()
+        profile.phase("dump_config")
 
     if options.json_config:
         try:
@@ -104,60 +156,76 @@ def instantiate(ckpt_dir=None):
             json_file.close()
         except ImportError:
             pass
+        profile.phase("json_config")
 
     if options.dot_config:
         do_dot(root, options.outdir, options.dot_config)
         do_ruby_dot(root, options.outdir, options.dot_config)
+        profile.phase("dot_config")
 
     # Initialize the global statistics
     stats.initSimStats()
 
     # Create the C++ sim objects and connect ports
-    for obj in root.descendants(): obj.createCCObject()
-    for obj in root.descendants(): obj.connectPorts()
+    SimObject.createCCObjects(root.descendants_list())
+    profile.phase("createCCObject")
+    for obj in root.descendants_list(): obj.connectPorts()
+    profile.phase("connectPorts")
 
     # Do a second pass to finish initializing the sim objects
-    for obj in root.descendants(): obj.init()
+    for obj in root.descendants_list(): obj.init()
+    profile.phase("init")
 
     # Do a third pass to initialize statistics
     stats._bindStatHierarchy(root)
     root.regStats()
+    profile.phase("regStats")
 
     # Do a fourth pass to initialize probe points
-    for obj in root.descendants(): obj.regProbePoints()
+    for obj in root.descendants_list(): obj.regProbePoints()
+    profile.phase("regProbePoints")
 
     # Do a fifth pass to connect probe listeners
-    for obj in root.descendants(): obj.regProbeListeners()
+    for obj in root.descendants_list(): obj.regProbeListeners()
+    profile.phase("regProbeListeners")
 
     # We want to generate the DVFS diagram for the system. This can only be
     # done once all of the CPP objects have been created and initialised so
     # that we are able to figure out which object belongs to which domain.
     if options.dot_dvfs_config:
         do_dvfs_dot(root, options.outdir, options.dot_dvfs_config)
+        profile.phase("dot_dvfs_config")
 
     # We're done registering statistics.  Enable the stats package now.
     stats.enable()
 
     # Restore checkpoint (if any)
     if ckpt_dir:
+        config_snapshot.record("restore", ckpt_dir)
         _drain_manager.preCheckpointRestore()
         ckpt = _m5.core.getCheckpoint(ckpt_dir)
         _m5.core.unserializeGlobals(ckpt);
-        for obj in root.descendants(): obj.loadState(ckpt)
+        for obj in root.descendants_list(): obj.loadState(ckpt)
+        profile.phase("loadState")
     else:
-        for obj in root.descendants(): obj.initState()
+        for obj in root.descendants_list(): obj.initState()
+        profile.phase("initState")
 
     # Check to see if any of the stat events are in the past after resuming from
     # a checkpoint, If so, this call will shift them to be at a valid time.
     updateStatEvents()
 
+    profile.report(len(root.descendants_list()))
+
 need_startup = True
 def simulate(*args, **kwargs):
     global need_startup
 
+    config_snapshot.record("simulate", *args, **kwargs)
+
     if need_startup:
         root = objects.Root.getInstance()
-        for obj in root.descendants(): obj.startup()
+        for obj in root.descendants_list(): obj.startup()
         need_startup = False
 
         # Python exit handlers happen in reverse order.
@@ -211,6 +279,8 @@ def drain():
 
         return False
 
+    config_snapshot.record("drain")
+
     # Don't try to drain a system that is already drained
     is_drained = _drain_manager.isDrained()
     while not is_drained:
@@ -219,10 +289,12 @@ def drain():
     assert _drain_manager.isDrained(), "Drain state inconsistent"
 
 def memWriteback(root):
+    config_snapshot.record("memWriteback")
     for obj in root.descendants():
         obj.memWriteback()
 
 def memInvalidate(root):
+    config_snapshot.record("memInvalidate")
     for obj in root.descendants():
         obj.memInvalidate()
 
@@ -231,6 +303,8 @@ def checkpoint(dir):
     if not isinstance(root, objects.Root):
         raise TypeError("Checkpoint must be called on a root object.")
 
+    config_snapshot.record("checkpoint", dir)
+
     drain()
     memWriteback(root)
     print("Writing checkpoint")
@@ -257,6 +331,8 @@ def switchCpus(system, cpuList, verbose=True):
       cpuList -- (old_cpu, new_cpu) tuples
     """
 
+    config_snapshot.record("switchCpus")
+
     if verbose:
         print("switching cpus")
 
@@ -351,6 +427,7 @@ def fork(simout="%(parent)s.f%(fork_seq)i"):
     if not _m5.core.listenersDisabled():
         raise RuntimeError("Can not fork a simulator with listeners enabled")
 
+    config_snapshot.record("fork")
     drain()
 
     try:
@@ -375,6 +452,10 @@ def fork(simout="%(parent)s.f%(fork_seq)i"):
 
     return pid
 
-from _m5.core import disableAllListeners, listenersDisabled
+def disableAllListeners():
+    config_snapshot.record("disableAllListeners")
+    _m5.core.disableAllListeners()
+
+from _m5.core import listenersDisabled
 from _m5.core import listenersLoopbackOnly
 from _m5.core import curTick
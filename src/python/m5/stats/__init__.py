@@ -42,12 +42,16 @@ import m5
 import _m5.stats
 from m5.objects import Root
 from m5.params import isNullPointer
-from .gem5stats import JsonOutputVistor
+from .gem5stats import ColumnarOutputVisitor, JsonOutputVistor
+from m5 import config_snapshot
 from m5.util import attrdict, fatal
 
 # Stat exports
 from _m5.stats import schedStatEvent as schedEvent
-from _m5.stats import periodicStatDump
+
+def periodicStatDump(period):
+    config_snapshot.record("stats.periodicStatDump", period)
+    _m5.stats.periodicStatDump(period)
 
 outputList = []
 
@@ -184,15 +188,47 @@ def _hdf5Factory(fn, chunking=10, desc=True, formulas=True):
     return _m5.stats.initHDF5(fn, chunking, desc, formulas)
 
 @_url_factory(["json"])
-def _jsonFactory(fn):
+def _jsonFactory(fn, ndjson=False, indent=4):
     """Output stats in JSON format.
 
+    The JSON is written while the stats hierarchy is visited, without
+    building an intermediate Python object for the whole dump.
+
+    Parameters:
+      * ndjson (bool): Append each dump to the file as one line of
+                       newline-delimited JSON instead of overwriting the
+                       file on every dump (default: False)
+      * indent (int): Indentation of the (non-ndjson) output (default: 4)
+
     Example:
       json://stats.json
+      json://stats.ndjson?ndjson=True
+
+    """
+
+    return JsonOutputVistor(fn, ndjson=ndjson, indent=indent)
+
+@_url_factory(["col"])
+def _columnarFactory(fn, delta=True):
+    """Output stats in a columnar binary format.
+
+    All scalars, vector elements and distribution fields are stored as
+    columns of 64-bit floats. The column names are written once and
+    each dump appends a record of values, which makes periodic dumps
+    cheap to write and easy to load as a time series. Use
+    m5.ext.pystats.columnar.load() to read the file into NumPy arrays.
+
+    Parameters:
+      * delta (bool): Only store the values that changed since the
+                      previous dump (default: True)
+
+    Example:
+      col://stats.col
+      col://stats.col?delta=False
 
     """
 
-    return JsonOutputVistor(fn)
+    return ColumnarOutputVisitor(fn, delta=delta)
 
 def addStatVisitor(url):
     """Add a stat visitor specified using a URL string
@@ -368,6 +404,11 @@ global_dump_roots = []
 def dump(roots=None):
     '''Dump all statistics data to the registered outputs'''
 
+    if roots is None:
+        config_snapshot.record("stats.dump")
+    else:
+        config_snapshot.record("stats.dump", roots)
+
     all_roots = []
     if roots is not None:
         all_roots.extend(roots)
@@ -395,7 +436,7 @@ def dump(roots=None):
         prepare()
 
     for output in outputList:
-        if isinstance(output, JsonOutputVistor):
+        if isinstance(output, (JsonOutputVistor, ColumnarOutputVisitor)):
             if not all_roots:
                 output.dump(Root.getInstance())
             else:
@@ -409,6 +450,8 @@ def dump(roots=None):
 def reset():
     '''Reset all statistics to the base state'''
 
+    config_snapshot.record("stats.reset")
+
     # call reset stats on all SimObjects
     root = Root.getInstance()
     if root:
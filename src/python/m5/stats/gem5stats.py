@@ -29,11 +29,14 @@ This serves as the bridge between the gem5 statistics exposed via PyBind11 and
 the Python Stats model.
 """
 
+import atexit
 from datetime import datetime
-from typing import IO, List, Union
+import json
+from typing import Any, IO, List, Optional, Tuple, Union
 
 import _m5.stats
 from m5.objects import *
+from m5.ext.pystats.columnar import ColumnarStatsWriter
 from m5.ext.pystats.group import *
 from m5.ext.pystats.simstat import *
 from m5.ext.pystats.statistic import *
@@ -43,11 +46,16 @@ class JsonOutputVistor():
     """
     This is a helper vistor class used to include a JSON output via the stats
     API (`src/python/m5/stats/__init__.py`).
+
+    The JSON is streamed to the output file while the gem5 stats hierarchy is
+    visited, so no SimStat object is built for a dump. The output has the
+    same structure as `SimStat.dump()`.
     """
     file: str
+    ndjson: bool
     json_args: Dict
 
-    def __init__(self, file: str, **kwargs):
+    def __init__(self, file: str, ndjson: bool = False, **kwargs):
         """
         Parameters
         ----------
@@ -55,13 +63,23 @@ class JsonOutputVistor():
         file: str
             The output file location in which the JSON will be dumped.
 
+        ndjson: bool
+            If True, the output is newline-delimited JSON: each dump is
+            appended to the file as a single line. Otherwise every dump
+            overwrites the file with an indented JSON document.
+
         kwargs: Dict[str, Any]
             Additional parameters to be passed to the `json.dumps` method.
         """
 
         self.file = file
+        self.ndjson = ndjson
         self.json_args = kwargs
 
+        if self.ndjson:
+            # Dumps are appended, so start from an empty file.
+            open(self.file, 'w').close()
+
     def dump(self, roots: Union[List[SimObject], Root]) -> None:
         """
         Dumps the stats of a simulation root (or list of roots) to the output
@@ -77,9 +95,251 @@ class JsonOutputVistor():
             The Root, or List of roots, whose stats are are to be dumped JSON.
         """
 
-        with open(self.file, 'w') as fp:
-            simstat = get_simstat(root=roots, prepare_stats=False)
-            simstat.dump(fp=fp, **self.json_args)
+        json_args = dict(self.json_args)
+        if self.ndjson:
+            json_args['indent'] = None
+            json_args.setdefault('separators', (',', ':'))
+        else:
+            json_args.setdefault('indent', 4)
+
+        with open(self.file, 'a' if self.ndjson else 'w') as fp:
+            writer = _JsonStreamWriter(fp=fp, **json_args)
+            _write_simstat(writer, roots)
+            if self.ndjson:
+                fp.write('\n')
+
+class _JsonStreamWriter():
+    """
+    A minimal incremental JSON writer. Objects are opened and closed
+    explicitly and leaf values are rendered with `json.dumps`, which lets a
+    caller write a large document without holding it in memory.
+    """
+
+    def __init__(self, fp: IO[str], indent: Optional[int] = None,
+                 separators: Optional[Tuple[str, str]] = None, **kwargs):
+        self._fp = fp
+        self._indent = indent
+        if separators is None:
+            separators = (',', ': ') if indent is not None else (', ', ': ')
+        self._item_sep, self._key_sep = separators
+        self._json_args = dict(kwargs, indent=indent, separators=separators)
+        # One entry per open object: True until its first member is written.
+        self._empty = []
+
+    def _newline(self) -> None:
+        if self._indent is not None:
+            self._fp.write('\n' + ' ' * (self._indent * len(self._empty)))
+
+    def _key(self, key: Optional[str]) -> None:
+        if not self._empty:
+            return
+        if not self._empty[-1]:
+            self._fp.write(self._item_sep)
+        self._empty[-1] = False
+        self._newline()
+        self._fp.write(json.dumps(key) + self._key_sep)
+
+    def begin_object(self, key: Optional[str] = None) -> None:
+        self._key(key)
+        self._fp.write('{')
+        self._empty.append(True)
+
+    def end_object(self) -> None:
+        empty = self._empty.pop()
+        if not empty:
+            self._newline()
+        self._fp.write('}')
+
+    def member(self, key: str, value: Any) -> None:
+        self._key(key)
+        text = json.dumps(value, **self._json_args)
+        if self._indent is not None and '\n' in text:
+            text = text.replace(
+                '\n', '\n' + ' ' * (self._indent * len(self._empty)))
+        self._fp.write(text)
+
+def _write_stats_group(writer: _JsonStreamWriter, key: str,
+                       group: _m5.stats.Group) -> None:
+    """
+    Streams a gem5 Group object with the same structure as
+    `get_stats_group(group).to_json()`.
+    """
+
+    writer.begin_object(key)
+    writer.member("type", "Group")
+    writer.member("time_conversion", None)
+
+    for stat in group.getStats():
+        statistic = __get_statistic(stat)
+        if statistic is not None:
+            writer.member(stat.name, statistic.to_json())
+
+    for name, child in group.getStatGroups().items():
+        _write_stats_group(writer, name, child)
+
+    writer.end_object()
+
+def _write_simstat(writer: _JsonStreamWriter,
+                   root: Union[Root, List[SimObject]]) -> None:
+    """
+    Streams the stats of a simulation with the same structure as
+    `get_simstat(root, prepare_stats=False).to_json()`.
+    """
+
+    final_tick = Root.getInstance().resolveStat("finalTick").value
+    sim_ticks = Root.getInstance().resolveStat("simTicks").value
+
+    writer.begin_object()
+    writer.member("creation_time",
+                  datetime.now().replace(microsecond=0).isoformat())
+    writer.member("time_conversion", None)
+    writer.member("simulated_begin_time", int(final_tick - sim_ticks))
+    writer.member("simulated_end_time", int(final_tick))
+
+    for r in root:
+        if isinstance(r, Root):
+            for key, group in r.getStatGroups().items():
+                _write_stats_group(writer, key, group)
+        elif isinstance(r, SimObject):
+            _write_stats_group(writer, r.name, r)
+        else:
+            raise TypeError("Object (" + str(r) + ") passed is neither Root "
+                            "nor SimObject. " + __name__ + " only processes "
+                            "Roots, SimObjects, or a list of Roots and/or "
+                            "SimObjects.")
+
+    writer.end_object()
+
+class ColumnarOutputVisitor():
+    """
+    A stats visitor writing the columnar binary format implemented in
+    `m5.ext.pystats.columnar`. Every scalar, vector element and
+    distribution field becomes a column of 64-bit floats; the column names
+    are written on the first dump and every later dump only appends values.
+    """
+    file: str
+    delta: bool
+
+    def __init__(self, file: str, delta: bool = True):
+        """
+        Parameters
+        ----------
+
+        file: str
+            The output file location.
+
+        delta: bool
+            If True, dumps after the first only store the values that
+            changed since the previous dump.
+        """
+
+        self.file = file
+        self.delta = delta
+        self._fp = None
+        self._writer = None
+        self._roots = None
+        self._columns = None
+
+        # The file stays open between dumps. Registering now, before the
+        # handler dumping the stats at exit, closes it after that dump.
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        """
+        Closes the output file. Called when gem5 exits; later dumps fail.
+        """
+        if self._fp is not None and not self._fp.closed:
+            self._fp.close()
+
+    def dump(self, roots: Union[List[SimObject], Root]) -> None:
+        """
+        Appends the stats of a simulation root (or list of roots) to the
+        output file. Every dump must be of the same roots.
+
+        WARNING: This dump assumes the statistics have already been prepared
+        for the target root.
+        """
+
+        roots = list(roots)
+        if self._writer is None:
+            self._roots = roots
+            names, self._columns = _columnar_layout(roots)
+            self._fp = open(self.file, 'wb')
+            self._writer = ColumnarStatsWriter(self._fp, names,
+                                               delta=self.delta)
+        elif roots != self._roots:
+            raise ValueError("The columnar stats output (%s) only supports "
+                             "dumping the same roots on every dump" %
+                             self.file)
+
+        values = []
+        for info, extract in self._columns:
+            extract(info, values)
+        final_tick = Root.getInstance().resolveStat("finalTick").value
+        self._writer.write_dump(int(final_tick), values)
+        self._writer.flush()
+
+def _columnar_layout(roots: List[SimObject]):
+    """
+    Walks the stats hierarchy below the roots and returns the column names
+    together with a list of (info, extract) pairs. `extract(info, values)`
+    appends the current values of the info's columns to `values`.
+    """
+
+    names = []
+    columns = []
+
+    def extract_scalar(info, values):
+        values.append(info.value)
+
+    def extract_vector(info, values):
+        values.extend(info.value)
+
+    def extract_dist(info, values):
+        values.extend((info.min_val, info.max_val, info.sum, info.squares,
+                       info.underflow, info.overflow, info.logs))
+        values.extend(info.values)
+
+    def add_group(prefix, group):
+        for info in group.getStats():
+            info.prepare()
+            name = prefix + info.name
+            if isinstance(info, _m5.stats.ScalarInfo):
+                names.append(name)
+                columns.append((info, extract_scalar))
+            elif isinstance(info, _m5.stats.DistInfo):
+                names.extend("%s::%s" % (name, field) for field in
+                             ("min_value", "max_value", "sum", "squares",
+                              "underflows", "overflows", "logs"))
+                names.extend("%s::%d" % (name, i)
+                             for i in range(len(info.values)))
+                columns.append((info, extract_dist))
+            elif isinstance(info, _m5.stats.FormulaInfo):
+                # Formulas are derived from other stats, like in the JSON
+                # output they are left out.
+                pass
+            elif isinstance(info, _m5.stats.VectorInfo):
+                for index in range(info.size):
+                    subname = str(info.subnames[index]) or str(index)
+                    names.append("%s::%s" % (name, subname))
+                columns.append((info, extract_vector))
+
+        for key, child in group.getStatGroups().items():
+            add_group(prefix + key + ".", child)
+
+    for r in roots:
+        if isinstance(r, Root):
+            for key, group in r.getStatGroups().items():
+                add_group(key + ".", group)
+        elif isinstance(r, SimObject):
+            add_group(r.name + ".", r)
+        else:
+            raise TypeError("Object (" + str(r) + ") passed is neither Root "
+                            "nor SimObject. " + __name__ + " only processes "
+                            "Roots, SimObjects, or a list of Roots and/or "
+                            "SimObjects.")
+
+    return names, columns
 
 def get_stats_group(group: _m5.stats.Group) -> Group:
     """
@@ -35,9 +35,12 @@ def fixGlobalFrequency():
     _m5.core.fixClockFrequency()
 
 def setGlobalFrequency(ticksPerSecond):
+    from m5 import config_snapshot
     from m5.util import convert
     import _m5.core
 
+    config_snapshot.record("setGlobalFrequency", ticksPerSecond)
+
     if isinstance(ticksPerSecond, int):
         tps = ticksPerSecond
     elif isinstance(ticksPerSecond, float):
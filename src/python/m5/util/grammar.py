@@ -24,11 +24,134 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import hashlib
 import os
+import pickle
+import re
+import tempfile
+import types
 
 import ply.lex
 import ply.yacc
 
+# Directory to cache generated lexer and parser tables in, or None to
+# generate them every time a lexer or parser is built.  Tables are named
+# after a hash of the grammar specification (the token rules and the
+# grammar rule docstrings), so any number of grammars, and versions of the
+# same grammar, can share a single directory.
+table_dir = os.environ.get('M5_PLY_TABLE_DIR')
+
+def setTableDir(path):
+    global table_dir
+    table_dir = path
+
+def _moduleDict(module):
+    return dict((k, getattr(module, k)) for k in dir(module))
+
+def _tablePath(kind, *spec):
+    digest = hashlib.sha1(repr((ply.yacc.__version__,) + spec).encode())
+    return os.path.join(table_dir,
+                        '%s-%s.pickle' % (kind, digest.hexdigest()))
+
+def _writeTable(path, write):
+    # Have write() create the table in a temporary file and rename it into
+    # place so concurrent builds never see a partially written table.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        result = write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return result
+
+def buildLexer(module, **kwargs):
+    '''Build a PLY lexer for the token rules in module, using the table
+    cache if there is one.'''
+    if table_dir is None:
+        return ply.lex.lex(module=module, **kwargs)
+
+    ldict = _moduleDict(module)
+    reflags = kwargs.get('reflags', 0)
+    linfo = ply.lex.LexerReflect(ldict, reflags=reflags)
+    linfo.get_all()
+    rules = []
+    for state in sorted(linfo.stateinfo):
+        rules.append((state, linfo.stateinfo[state],
+            [ (name, func.__doc__) for name, func in
+              linfo.funcsym.get(state, []) ],
+            linfo.strsym.get(state, []),
+            linfo.ignore.get(state),
+            getattr(linfo.errorf.get(state), '__name__', None)))
+    path = _tablePath('lextab', linfo.tokens, linfo.literals, reflags, rules)
+
+    try:
+        with open(path, 'rb') as f:
+            lextab = types.ModuleType('lextab')
+            lextab.__dict__.update(pickle.load(f))
+        return ply.lex.lex(module=module, optimize=1, lextab=lextab,
+                           **kwargs)
+    except Exception:
+        pass
+
+    lexer = ply.lex.lex(module=module, **kwargs)
+
+    # The same information ply.lex.Lexer.writetab() writes out, except that
+    # the flags the master regular expressions were compiled with are
+    # recorded correctly.
+    statere = {}
+    for state, lre in lexer.lexstatere.items():
+        statere[state] = [ (lexer.lexstateretext[state][i],
+            ply.lex._funcs_to_names(lre[i][1],
+                                    lexer.lexstaterenames[state][i]))
+            for i in range(len(lre)) ]
+    table = {
+        '_tabversion' : ply.lex.__version__,
+        '_lextokens' : lexer.lextokens,
+        '_lexreflags' : re.VERBOSE | reflags,
+        '_lexliterals' : lexer.lexliterals,
+        '_lexstateinfo' : lexer.lexstateinfo,
+        '_lexstatere' : statere,
+        '_lexstateignore' : lexer.lexstateignore,
+        '_lexstateerrorf' : dict((state, ef.__name__)
+            for state, ef in lexer.lexstateerrorf.items() if ef),
+    }
+    def write(filename):
+        with open(filename, 'wb') as f:
+            pickle.dump(table, f)
+    _writeTable(path, write)
+    return lexer
+
+def buildParser(module, **kwargs):
+    '''Build a PLY LALR parser for the grammar rules in module, using the
+    table cache if there is one.'''
+    if table_dir is None:
+        return ply.yacc.yacc(module=module, **kwargs)
+
+    pdict = _moduleDict(module)
+    if kwargs.get('start') is not None:
+        pdict['start'] = kwargs['start']
+    pinfo = ply.yacc.ParserReflect(pdict)
+    pinfo.get_all()
+    path = _tablePath('parsetab', kwargs.get('method', 'LALR'), pinfo.start,
+        pinfo.prec, pinfo.tokens,
+        [ (name, doc) for line, file, name, doc in pinfo.pfuncs ])
+
+    try:
+        lr = ply.yacc.LRTable()
+        lr.read_pickle(path)
+        lr.bind_callables(pdict)
+        return ply.yacc.LRParser(lr, pinfo.error_func)
+    except Exception:
+        pass
+
+    # Don't leave parser.out debugging files behind unless asked to.
+    kwargs.setdefault('debug', 0)
+    return _writeTable(path, lambda filename:
+        ply.yacc.yacc(module=module, picklefile=filename, **kwargs))
+
 class ParseError(Exception):
     def __init__(self, message, token=None):
         Exception.__init__(self, message)
@@ -45,7 +168,7 @@ class Grammar(object):
             raise AttributeError("module is an illegal attribute")
 
         if 'output' in kwargs:
-            dir,tab = os.path.split(output)
+            dir,tab = os.path.split(kwargs.pop('output'))
             if not tab.endswith('.py'):
                 raise AttributeError('The output file must end with .py')
             kwargs['outputdir'] = dir
@@ -67,11 +190,11 @@ class Grammar(object):
             return self.yacc_kwargs
 
         if attr == 'lex':
-            self.lex = ply.lex.lex(module=self, **self.lex_kwargs)
+            self.lex = buildLexer(self, **self.lex_kwargs)
             return self.lex
 
         if attr == 'yacc':
-            self.yacc = ply.yacc.yacc(module=self, **self.yacc_kwargs)
+            self.yacc = buildParser(self, **self.yacc_kwargs)
             return self.yacc
 
         if attr == 'current_lexer':
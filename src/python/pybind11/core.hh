@@ -38,6 +38,7 @@
 #ifndef __PYTHON_PYBIND11_CORE_HH__
 #define __PYTHON_PYBIND11_CORE_HH__
 
+#include "pybind11/pybind11.h"
 #include "pybind11/stl_bind.h"
 
 #include <vector>
@@ -46,4 +47,28 @@
 
 PYBIND11_MAKE_OPAQUE(std::vector<AddrRange>);
 
+/**
+ * Set a field of a param struct from a Python value, the way the
+ * field's pybind property would. Used by the create_batch() functions
+ * of the generated param wrappers.
+ */
+template <typename T>
+void
+setParamFromPython(T &field, const pybind11::handle &value)
+{
+    field = value.cast<T>();
+}
+
+/**
+ * Vector fields are filled element by element, which also works for
+ * vectors that are exposed to Python as opaque types.
+ */
+template <typename T, typename Alloc>
+void
+setParamFromPython(std::vector<T, Alloc> &field, const pybind11::handle &value)
+{
+    for (auto item: value)
+        field.push_back(item.cast<T>());
+}
+
 #endif
@@ -119,6 +119,7 @@ class UniqueFixture(Fixture):
             if hasattr(self, '_init_done'):
                 return
             super(UniqueFixture, self).__init__(self, **kwargs)
+            self.set_shared()
             self._init(*args, **kwargs)
             self._init_done = True
 
@@ -27,11 +27,16 @@
 '''
 Built in test cases that verify particular details about a gem5 run.
 '''
+import collections
+import difflib
+import itertools
+import math
+import os
 import re
 
 from testlib import test_util
 from testlib.configuration import constants
-from testlib.helper import joinpath, diff_out_file
+from testlib.helper import joinpath
 
 class Verifier(object):
     def __init__(self, fixtures=tuple()):
@@ -73,15 +78,59 @@ class MatchGoldStandard(Verifier):
         fixtures = params.fixtures
         # Get the file from the tempdir of the test.
         tempdir = fixtures[constants.tempdir_fixture_name].path
-        self.test_filename = joinpath(tempdir, self.test_filename)
+        test_filename = joinpath(tempdir, self.test_filename)
 
-        diff = diff_out_file(self.standard_filename,
-                            self.test_filename,
-                            ignore_regexes=self.ignore_regex,
-                            logger=params.log)
+        if not os.path.exists(self.standard_filename):
+            raise OSError("%s doesn't exist in reference directory"
+                          % self.standard_filename)
+        if not os.path.exists(test_filename):
+            raise OSError("%s doesn't exist in output directory"
+                          % test_filename)
+
+        diff = self.compare(self.standard_filename, test_filename)
         if diff is not None:
-            test_util.fail('Stdout did not match:\n%s\nSee %s for full results'
-                      % (diff, tempdir))
+            test_util.fail('%s did not match:\n%s\nSee %s for full results'
+                      % (os.path.basename(test_filename), diff, tempdir))
+
+    def compare(self, standard_filename, test_filename):
+        '''
+        Compare the test output to the standard, ignoring the lines matched
+        by ignore_regex in both.  The files are read a chunk of lines at a
+        time rather than loaded whole, and left unmodified.
+
+        :returns: None if they match, otherwise a unified diff starting at
+        the first difference.
+        '''
+        ignore = _combine_regex(self.ignore_regex)
+        standard = _filtered_lines(standard_filename, ignore)
+        test = _filtered_lines(test_filename, ignore)
+
+        context = collections.deque(maxlen=3)
+        lineno = 0
+        for standard_line, test_line in itertools.zip_longest(standard, test):
+            if standard_line != test_line:
+                break
+            context.append(standard_line)
+            lineno += 1
+        else:
+            return None
+
+        # Only diff a window of the files following the first difference,
+        # which is enough to see what went wrong.
+        standard_window = list(context)
+        test_window = list(context)
+        if standard_line is not None:
+            standard_window.append(standard_line)
+        if test_line is not None:
+            test_window.append(test_line)
+        standard_window.extend(itertools.islice(standard, _diff_window))
+        test_window.extend(itertools.islice(test, _diff_window))
+
+        diff = ''.join(difflib.unified_diff(standard_window, test_window,
+                                            fromfile=standard_filename,
+                                            tofile=test_filename))
+        return 'First difference at line %d (after filtering):\n%s' % \
+            (lineno + 1, diff)
 
     def _generic_instance_warning(self, kwargs):
         '''
@@ -142,11 +191,92 @@ class MatchStderr(DerivedGoldStandard):
     _default_ignore_regex = []
 
 class MatchStats(DerivedGoldStandard):
-    # TODO: Likely will want to change this verifier since we have the weird
-    # perl script right now. A simple diff probably isn't going to work.
+    '''
+    Compares the statistics in stats.txt to those in a standard one.
+
+    Rather than diffing the files, the statistics on lines that differ are
+    parsed into an index by dump and name and their values are compared
+    numerically, so descriptions, formatting and the order of statistics are
+    ignored.
+    '''
     _file = constants.gem5_simulation_stats
     _default_ignore_regex = []
 
+    def __init__(self, standard_filename, tolerances=None,
+                 default_tolerance=0, **kwargs):
+        '''
+        :param tolerances: A mapping of regexes, matched against statistic
+        names, to the relative tolerance allowed in the values of those
+        statistics.  The first matching regex applies.
+
+        :param default_tolerance: The relative tolerance allowed in the
+        values of statistics that don't match any of tolerances.
+        '''
+        super(MatchStats, self).__init__(standard_filename, **kwargs)
+        self.tolerances = list(tolerances.items()) if tolerances else []
+        self.default_tolerance = default_tolerance
+
+        self._tolerance_regex = _combine_regex(
+                [ regex for regex, _ in self.tolerances ], named=True)
+
+    def tolerance(self, name):
+        '''The relative tolerance allowed in the value of a statistic.'''
+        if self._tolerance_regex is not None:
+            match = self._tolerance_regex.match(name)
+            if match is not None:
+                return self.tolerances[int(match.lastgroup[1:])][1]
+        return self.default_tolerance
+
+    def compare(self, standard_filename, test_filename):
+        ignore = _combine_regex(self.ignore_regex)
+        standard = _filtered_lines(standard_filename, ignore)
+        test = _filtered_lines(test_filename, ignore)
+
+        # Most lines of the files are identical, so only the statistics on
+        # lines that differ are parsed and indexed by dump and name to be
+        # compared.
+        standard_dump = test_dump = 0
+        standard_stats = {}
+        test_stats = {}
+        for standard_line, test_line in itertools.zip_longest(standard, test):
+            if standard_line == test_line:
+                if standard_line.startswith(_begin_stats):
+                    standard_dump += 1
+                    test_dump += 1
+                continue
+            if standard_line is not None:
+                standard_dump = _index_stat(standard_line, standard_dump,
+                                            standard_stats)
+            if test_line is not None:
+                test_dump = _index_stat(test_line, test_dump, test_stats)
+
+        mismatched = []
+        for key in sorted(standard_stats.keys() & test_stats.keys()):
+            standard_values = standard_stats[key]
+            values = test_stats[key]
+            if standard_values != values and \
+                    not _stats_match(standard_values, values,
+                                     self.tolerance(key[1])):
+                mismatched.append((key, standard_values, values))
+        missing = sorted(standard_stats.keys() - test_stats.keys())
+        unexpected = sorted(test_stats.keys() - standard_stats.keys())
+
+        if not (mismatched or unexpected or missing):
+            return None
+
+        report = []
+        for key, standard_values, values in mismatched[:_max_reported]:
+            report.append('%s: expected %s, got %s' %
+                          (_stat_name(key), ' '.join(standard_values),
+                           ' '.join(values)))
+        report.extend('missing: %s' % _stat_name(key)
+                      for key in missing[:_max_reported])
+        report.extend('unexpected: %s' % _stat_name(key)
+                      for key in unexpected[:_max_reported])
+        report.append('%d statistics differ, %d missing, %d unexpected' %
+                      (len(mismatched), len(missing), len(unexpected)))
+        return '\n'.join(report)
+
 class MatchConfigINI(DerivedGoldStandard):
     _file = constants.gem5_simulation_config_ini
     _default_ignore_regex = (
@@ -173,12 +303,12 @@ class MatchRegex(Verifier):
         # Get the file from the tempdir of the test.
         tempdir = fixtures[constants.tempdir_fixture_name].path
 
+        regex = _combine_regex(self.regex)
         def parse_file(fname):
             with open(fname, 'r') as file_:
                 for line in file_:
-                    for regex in self.regex:
-                        if re.match(regex, line):
-                            return True
+                    if regex.match(line):
+                        return True
         if self.match_stdout:
             if parse_file(joinpath(tempdir,
                                    constants.gem5_simulation_stdout)):
@@ -194,3 +324,96 @@ def _iterable_regex(regex):
     if isinstance(regex, _re_type) or isinstance(regex, str):
         regex = (regex,)
     return regex
+
+# Lines read from output files at a time, as a size hint for readlines().
+_chunk_size = 1 << 20
+# Lines of each file shown in a diff after the first difference.
+_diff_window = 100
+# Differences of each kind listed when statistics don't match.
+_max_reported = 50
+
+def _combine_regex(regexes, named=False):
+    '''
+    Combine strings and compiled regexes into a single compiled alternation,
+    so a line is checked against all of them in one match.  If named, the
+    i-th alternative is a group named 't<i>'.
+
+    :returns: None if there are no regexes.
+    '''
+    alternatives = []
+    for i, regex in enumerate(regexes or ()):
+        if isinstance(regex, _re_type):
+            flags = ''.join(letter for flag, letter in
+                            ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'),
+                             (re.DOTALL, 's'), (re.VERBOSE, 'x'))
+                            if regex.flags & flag)
+            regex = regex.pattern
+        else:
+            flags = ''
+        if named:
+            regex = '(?P<t%d>%s)' % (i, regex)
+        if flags:
+            regex = '(?%s:%s)' % (flags, regex)
+        else:
+            regex = '(?:%s)' % regex
+        alternatives.append(regex)
+    if not alternatives:
+        return None
+    return re.compile('|'.join(alternatives))
+
+def _filtered_lines(filename, ignore):
+    '''Generate the lines of a file which don't match the ignore regex.'''
+    with open(filename, 'r') as file_:
+        while True:
+            lines = file_.readlines(_chunk_size)
+            if not lines:
+                return
+            if ignore is None:
+                yield from lines
+            else:
+                match = ignore.match
+                for line in lines:
+                    if match(line) is None:
+                        yield line
+
+_begin_stats = '---------- Begin Simulation Statistics'
+
+def _index_stat(line, dump, stats):
+    '''
+    Add the statistic on a line of a stats.txt to stats, keyed by the number
+    of the dump it's in and its name, with the fields of its value.
+
+    :returns: the number of the dump the following line is in.
+    '''
+    if line.startswith(_begin_stats):
+        return dump + 1
+    fields = line.partition('#')[0].split()
+    if len(fields) >= 2:
+        stats[dump, fields[0]] = [ f for f in fields[1:] if f != '|' ]
+    return dump
+
+def _stat_value(field):
+    try:
+        return float(field.rstrip('%'))
+    except ValueError:
+        return field
+
+def _stats_match(standard, test, tolerance):
+    if len(standard) != len(test):
+        return False
+    for expected, value in zip(map(_stat_value, standard),
+                               map(_stat_value, test)):
+        if isinstance(expected, float) and isinstance(value, float):
+            if expected == value or \
+                    (math.isnan(expected) and math.isnan(value)):
+                continue
+            if abs(expected - value) > \
+                    tolerance * max(abs(expected), abs(value)):
+                return False
+        elif expected != value:
+            return False
+    return True
+
+def _stat_name(key):
+    dump, name = key
+    return name if dump <= 1 else '%s (dump %d)' % (name, dump)
@@ -0,0 +1,94 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import io
+import math
+import unittest
+
+from m5.ext.pystats import columnar
+
+class ColumnarTestSuite(unittest.TestCase):
+    """Test cases for the columnar binary stats format"""
+
+    def _roundtrip(self, dumps, delta):
+        fp = io.BytesIO()
+        writer = columnar.ColumnarStatsWriter(fp, ["a", "b.c", "d::0"],
+                                              delta=delta)
+        for tick, values in dumps:
+            writer.write_dump(tick, values)
+        fp.seek(0)
+        return fp, list(columnar.iter_dumps(fp))
+
+    def test_full_dumps(self):
+        dumps = [(10, [1.0, 2.0, 3.0]), (20, [1.0, 5.0, 3.0])]
+        _, read = self._roundtrip(dumps, delta=False)
+        self.assertEqual(len(read), 2)
+        for (tick, values), (names, rtick, rvalues, bitmap) in \
+                zip(dumps, read):
+            self.assertEqual(names, ["a", "b.c", "d::0"])
+            self.assertEqual(rtick, tick)
+            self.assertEqual(list(rvalues), values)
+            self.assertIsNone(bitmap)
+
+    def test_delta_dumps(self):
+        dumps = [(10, [1.0, 2.0, 3.0]),
+                 (20, [1.0, 5.0, 3.0]),
+                 (30, [1.0, 5.0, 3.0]),
+                 (40, [0.0, 5.0, 4.0])]
+        fp, read = self._roundtrip(dumps, delta=True)
+        self.assertEqual([(t, list(v)) for _, t, v, _ in read], dumps)
+        self.assertEqual([b for _, _, _, b in read],
+                         [None, b"\x02", b"\x00", b"\x05"])
+
+        full = io.BytesIO()
+        writer = columnar.ColumnarStatsWriter(full, ["a", "b.c", "d::0"],
+                                              delta=False)
+        for tick, values in dumps:
+            writer.write_dump(tick, values)
+        self.assertLess(len(fp.getvalue()), len(full.getvalue()))
+
+    def test_nan_unchanged(self):
+        nan = float("nan")
+        _, read = self._roundtrip([(1, [nan, 1.0, 2.0]),
+                                   (2, [nan, 1.0, 2.0])], delta=True)
+        self.assertEqual(read[1][3], b"\x00")
+        self.assertTrue(math.isnan(read[1][2][0]))
+
+    def test_bad_value_count(self):
+        writer = columnar.ColumnarStatsWriter(io.BytesIO(), ["a"])
+        with self.assertRaises(ValueError):
+            writer.write_dump(0, [1.0, 2.0])
+
+    def test_truncated_record(self):
+        fp, _ = self._roundtrip([(10, [1.0, 2.0, 3.0]),
+                                 (20, [4.0, 5.0, 6.0])], delta=False)
+        data = fp.getvalue()
+        read = list(columnar.iter_dumps(io.BytesIO(data[:-4])))
+        self.assertEqual(len(read), 1)
+
+    def test_bad_magic(self):
+        with self.assertRaises(ValueError):
+            list(columnar.iter_dumps(io.BytesIO(b"not a stats file")))
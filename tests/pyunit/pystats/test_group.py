@@ -0,0 +1,102 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from m5.ext.pystats import Group, SimStat
+from m5.ext.pystats.statistic import Accumulator, Distribution, Scalar
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class GroupPathIndexTestSuite(unittest.TestCase):
+    """Test cases for looking up pystats by their full dotted path"""
+
+    def setUp(self):
+        cpus = {"cpu%d" % i: Group(numCycles=Scalar(value=1000 * (i + 1)),
+                                   ipc=Scalar(value=0.5))
+                for i in range(2)}
+        l2 = Group(demandHits=Scalar(value=10), demandMisses=Scalar(value=3))
+        self.system = Group(l2=l2, **cpus)
+        self.simstat = SimStat(creation_time=None, time_conversion=None,
+                               simulated_begin_time=0, simulated_end_time=1,
+                               system=self.system)
+
+    def test_exact(self):
+        stat = self.simstat.find_path("system.cpu1.numCycles")
+        self.assertEqual(stat.value, 2000)
+        self.assertIs(self.system.find_path("cpu1.numCycles"), stat)
+        self.assertIsNone(self.system.find_path("cpu2.numCycles"))
+        self.assertEqual(self.system.match_paths("l2.demandHits", "exact"),
+                         ["l2.demandHits"])
+
+    def test_prefix(self):
+        self.assertEqual(self.system.match_paths("l2.", "prefix"),
+                         ["l2.demandHits", "l2.demandMisses"])
+        self.assertEqual(self.system.match_paths("l3", "prefix"), [])
+
+    def test_glob(self):
+        self.assertEqual(self.system.match_paths("cpu*.numCycles"),
+                         ["cpu0.numCycles", "cpu1.numCycles"])
+
+    def test_regex(self):
+        self.assertEqual(self.system.match_paths(r"l2\..*Miss", "regex"),
+                         ["l2.demandMisses"])
+
+    def test_unknown_match(self):
+        with self.assertRaises(ValueError):
+            self.system.match_paths("cpu0", "fuzzy")
+
+    def test_invalidation(self):
+        self.assertEqual(self.system.match_paths("mem.*"), [])
+        self.system.mem = Group(bytesRead=Scalar(value=64))
+        self.assertEqual(self.system.match_paths("mem.*"), ["mem.bytesRead"])
+
+    def test_index_not_serialized(self):
+        self.system.find_path("cpu0.ipc")
+        self.assertNotIn("_path_index", self.system.to_json())
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_values(self):
+        values = self.system.find_values("cpu*.numCycles")
+        self.assertEqual(list(values), [1000, 2000])
+        self.assertEqual(values.sum(), 3000)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_mixed_values(self):
+        self.system.l1 = Group(
+            hist=Distribution(value=[1, 2, 3], min=0, max=2, num_bins=3,
+                              bin_size=1),
+            lat=Accumulator(value=[4, 5], count=2, min=4, max=5),
+            hits=Scalar(value=7))
+        values = self.system.find_values("l1.*")
+        self.assertEqual(values.dtype, object)
+        self.assertEqual(len(values), 3)
+        self.assertEqual(list(values[0]), [1, 2, 3])
+        self.assertEqual(values[1], 7)
+        self.assertEqual(list(values[2]), [4, 5])
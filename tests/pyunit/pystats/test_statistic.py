@@ -0,0 +1,104 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import unittest
+
+from m5.ext.pystats import Group
+from m5.ext.pystats.statistic import Accumulator, Distribution, Scalar
+from m5.ext.pystats.storagetype import StorageType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class StatisticTestSuite(unittest.TestCase):
+    """Test cases for the pystats Statistic classes"""
+
+    def test_scalar_has_no_dict(self):
+        scalar = Scalar(value=1.5)
+        self.assertFalse(hasattr(scalar, "__dict__"))
+        with self.assertRaises(AttributeError):
+            scalar.not_a_field = 1
+
+    def test_scalar_json(self):
+        scalar = Scalar(value=3, unit="Count", description="desc",
+                        datatype=StorageType["f64"])
+        self.assertEqual(scalar.to_json(), {
+            "value": 3, "type": "Scalar", "unit": "Count",
+            "description": "desc", "datatype": "f64"})
+
+    def test_distribution_json(self):
+        dist = Distribution(value=[1.0, 2.0, 3.0], min=0, max=2,
+                            num_bins=3, bin_size=1, sum=8.0)
+        expected = {
+            "value": [1.0, 2.0, 3.0], "type": "Distribution", "unit": None,
+            "description": None, "datatype": None, "min": 0, "max": 2,
+            "num_bins": 3, "bin_size": 1, "sum": 8.0, "underflow": None,
+            "overflow": None, "logs": None, "sum_squared": None}
+        self.assertEqual(json.dumps(dist.to_json()), json.dumps(expected))
+
+    def test_integer_values(self):
+        accumulator = Accumulator(value=[1, 2, 3, 6], count=4, min=1, max=6)
+        self.assertEqual(accumulator.value, [1, 2, 3, 6])
+        self.assertIsInstance(accumulator.value, list)
+        self.assertEqual(accumulator.count, 4)
+        self.assertEqual(accumulator.mean(), 3)
+
+    def test_mixed_values_json(self):
+        dist = Distribution(value=[1, 2.5, 3], min=0, max=2,
+                            num_bins=3, bin_size=1)
+        self.assertEqual(json.dumps(dist.to_json()["value"]), "[1, 2.5, 3]")
+
+    def test_mean_count(self):
+        dist = Distribution(value=[1.0, 2.0, 4.5], min=0, max=2,
+                            num_bins=3, bin_size=1)
+        self.assertEqual(dist.count(), 7.5)
+        self.assertEqual(dist.mean(), 2.5)
+
+    def test_empty_mean(self):
+        import statistics
+
+        dist = Distribution(value=[], min=0, max=0, num_bins=1, bin_size=1)
+        self.assertEqual(dist.count(), 0)
+        with self.assertRaises(statistics.StatisticsError):
+            dist.mean()
+
+    def test_group_json(self):
+        group = Group(a=Scalar(value=1), b=Group(c=Scalar(value=2.0)))
+        self.assertEqual(group.to_json()["b"]["c"]["value"], 2.0)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_as_array(self):
+        dist = Distribution(value=[1.0, 2.0, 4.5], min=0, max=2,
+                            num_bins=3, bin_size=1)
+        values = dist.as_array()
+        self.assertEqual(values.dtype, numpy.float64)
+        self.assertEqual(list(values), [1.0, 2.0, 4.5])
+
+        accumulator = Accumulator(value=[1, 2, 3], count=3, min=1, max=3)
+        self.assertEqual(accumulator.as_array().dtype, numpy.int64)
@@ -27,10 +27,26 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from configparser import ConfigParser
+from multiprocessing import Pool
 import gzip
+import shutil
+import struct
+import time
+import zlib
 
 import sys, re, os
 
+from checkpoint_pagestore import (ManifestWriter, PageStore, default_store,
+                                  open_image)
+
+page_size = 1 << 12
+
+# Memory images are copied in blocks of this size
+block_size = 1 << 20
+zero_block = bytes(block_size)
+
+pmem_name = "system.physmem.store0.pmem"
+
 class myCP(ConfigParser):
     def __init__(self):
         ConfigParser.__init__(self)
@@ -38,28 +54,117 @@ class myCP(ConfigParser):
     def optionxform(self, optionstr):
         return optionstr
 
-def aggregate(output_dir, cpts, no_compress, memory_size):
+def write_sparse(out, offset, data):
+    """Write data to out at offset, seeking past zero pages instead of
+    writing them. out must already extend past the end of the data, for
+    example by being truncate()d to its final size."""
+    view = memoryview(data)
+    if view == zero_block[:len(view)]:
+        return
+    start = 0
+    while start < len(view):
+        end = min(start + page_size, len(view))
+        if view[start:end] != zero_block[:end - start]:
+            # Extend the run to the next zero page
+            run_end = end
+            while run_end < len(view):
+                next_end = min(run_end + page_size, len(view))
+                if view[run_end:next_end] == zero_block[:next_end - run_end]:
+                    break
+                run_end = next_end
+            out.seek(offset + start)
+            out.write(view[start:run_end])
+            end = run_end
+        start = end
+
+def read_image(gf, size):
+    """Yield the first size bytes of a memory image in large blocks, padded
+    with zeros if the image is shorter"""
+    remaining = size
+    while remaining > 0:
+        block = gf.read(min(block_size, remaining))
+        if not block:
+            break
+        remaining -= len(block)
+        yield block
+    while remaining > 0:
+        yield zero_block[:min(block_size, remaining)]
+        remaining -= min(block_size, remaining)
+
+def copy_image_raw(job):
+    """Decompress the first size bytes of a checkpoint's memory image into
+    the raw output image at offset"""
+    src, dst, offset, size = job
+    with open_image(src) as gf, open(dst, "r+b") as out:
+        for block in read_image(gf, size):
+            write_sparse(out, offset, block)
+            offset += len(block)
+    return src
+
+def copy_image_gzip(job):
+    """Recompress the first size bytes of a checkpoint's memory image into
+    a gzip member file, to be concatenated into the output image"""
+    src, dst, offset, size = job
+    with open_image(src) as gf, \
+            gzip.open(dst, "wb", compresslevel=6) as out:
+        for block in read_image(gf, size):
+            out.write(block)
+    return src
+
+def write_zero_member(job):
+    """Write a gzip member holding size zero bytes. A block of zeros is
+    compressed once, with a full flush so that the compressed block can be
+    repeated, instead of compressing every block."""
+    dst, size = job
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed_block = (compressor.compress(zero_block) +
+                        compressor.flush(zlib.Z_FULL_FLUSH))
+    crc = 0
+    with open(dst, "wb") as out:
+        # gzip header: magic, deflate, no flags, mtime, no extra flags, unix
+        out.write(b"\x1f\x8b\x08\x00" + struct.pack("<I", int(time.time())) +
+                  b"\x00\x03")
+        remaining = size
+        while remaining >= block_size:
+            out.write(compressed_block)
+            crc = zlib.crc32(zero_block, crc)
+            remaining -= block_size
+        if remaining:
+            out.write(compressor.compress(zero_block[:remaining]))
+            crc = zlib.crc32(zero_block[:remaining], crc)
+        out.write(compressor.flush())
+        out.write(struct.pack("<II", crc, size & 0xffffffff))
+    return dst
+
+def aggregate(output_dir, cpts, no_compress, memory_size, mem_format=None,
+              jobs=None, page_store=None):
     merged_config = None
     page_ptr = 0
 
+    if mem_format is None:
+        mem_format = "raw" if no_compress else "gzip"
+    if mem_format not in ("gzip", "raw", "pages"):
+        raise ValueError("Unknown memory image format '%s'" % mem_format)
+
     output_path = output_dir
     if not os.path.isdir(output_path):
-        os.system("mkdir -p " + output_path)
-
-    agg_mem_file = open(output_path + "/system.physmem.store0.pmem", "wb+")
-    agg_config_file = open(output_path + "/m5.cpt", "wb+")
+        os.makedirs(output_path)
 
-    if not no_compress:
-        merged_mem = gzip.GzipFile(fileobj= agg_mem_file, mode="wb")
+    agg_mem_path = os.path.join(output_path, pmem_name)
+    agg_config_file = open(output_path + "/m5.cpt", "w")
 
     max_curtick = 0
     num_digits = len(str(len(cpts)-1))
 
+    # (checkpoint image, offset, size) of each image to be copied
+    images = []
+
     for (i, arg) in enumerate(cpts):
         print(arg)
         merged_config = myCP()
         config = myCP()
-        config.readfp(open(cpts[i] + "/m5.cpt"))
+        with open(cpts[i] + "/m5.cpt") as f:
+            config.read_file(f)
 
         for sec in config.sections():
             if re.compile("cpu").search(sec):
@@ -69,12 +174,13 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
                 items = config.items(sec)
                 for item in items:
                     if item[0] == "paddr":
-                        merged_config.set(newsec, item[0], int(item[1]) + (page_ptr << 12))
+                        merged_config.set(newsec, item[0],
+                            str(int(item[1]) + (page_ptr << 12)))
                         continue
                     merged_config.set(newsec, item[0], item[1])
 
                 if re.compile("workload.FdMap256$").search(sec):
-                    merged_config.set(newsec, "M5_pid", i)
+                    merged_config.set(newsec, "M5_pid", str(i))
 
             elif sec == "system":
                 pass
@@ -93,53 +199,83 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
 
         ### memory stuff
         pages = int(config.get("system", "pagePtr"))
+        images.append((cpts[i] + "/" + pmem_name, page_ptr * page_size,
+                       pages * page_size))
         page_ptr = page_ptr + pages
         print("pages to be read: ", pages)
 
-        f = open(cpts[i] + "/system.physmem.store0.pmem", "rb")
-        gf = gzip.GzipFile(fileobj=f, mode="rb")
+    merged_config.add_section("system")
+    merged_config.set("system", "pagePtr", str(page_ptr))
+    merged_config.set("system", "nextPID", str(len(cpts)))
 
-        x = 0
-        while x < pages:
-            bytesRead = gf.read(1 << 12)
-            if not no_compress:
-                merged_mem.write(bytesRead)
-            else:
-                agg_mem_file.write(bytesRead)
-            x += 1
+    # Pad the rest of memory with zero pages
+    used_size = page_ptr * page_size
+    if memory_size is not None and memory_size > used_size:
+        page_ptr += (memory_size - used_size + page_size - 1) // page_size
+    file_size = page_ptr * page_size
 
-        gf.close()
-        f.close()
+    if mem_format == "pages":
+        # Pages are added to a single page store, so the images are copied
+        # one after the other. Zero pages, including the padding, take no
+        # space in the store.
+        store = PageStore(page_store or default_store(output_path))
+        with ManifestWriter(agg_mem_path, store, file_size) as out:
+            for src, offset, size in images:
+                with open_image(src) as gf:
+                    for block in read_image(gf, size):
+                        out.write(block)
+                print("copied", src)
+        store.close()
+        pool = None
+    elif mem_format == "raw":
+        # The images are decompressed in parallel and written in place in
+        # a sparse file, so the zero pages are never written
+        pool = Pool(jobs)
+        with open(agg_mem_path, "wb") as agg_mem_file:
+            agg_mem_file.truncate(file_size)
+        for src in pool.imap_unordered(copy_image_raw,
+                [(src, agg_mem_path, offset, size)
+                 for src, offset, size in images]):
+            print("copied", src)
+    else:
+        # Every image becomes a gzip member of its own, in parallel. gzip
+        # streams can be concatenated, so the members only need to be
+        # appended in order.
+        pool = Pool(jobs)
+        members = [("%s.part%d" % (agg_mem_path, i), offset, size)
+                   for i, (src, offset, size) in enumerate(images)]
+        results = [pool.apply_async(copy_image_gzip,
+                       ((src, member, offset, size),))
+                   for (src, _, _), (member, offset, size) in
+                   zip(images, members)]
+        if file_size > used_size:
+            zero_member = agg_mem_path + ".zero"
+            results.append(pool.apply_async(write_zero_member,
+                ((zero_member, file_size - used_size),)))
+            members.append((zero_member, used_size, file_size - used_size))
+        for result in results:
+            print("copied", result.get())
 
-    merged_config.add_section("system")
-    merged_config.set("system", "pagePtr", page_ptr)
-    merged_config.set("system", "nextPID", len(cpts))
-
-    file_size = page_ptr * 4 * 1024
-    dummy_data = "".zfill(4096)
-    while file_size < memory_size:
-        if not no_compress:
-            merged_mem.write(dummy_data)
-        else:
-            agg_mem_file.write(dummy_data)
-        file_size += 4 * 1024
-        page_ptr += 1
+        with open(agg_mem_path, "wb") as agg_mem_file:
+            for member, _, _ in members:
+                with open(member, "rb") as f:
+                    shutil.copyfileobj(f, agg_mem_file, block_size)
+                os.remove(member)
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     print("WARNING: ")
     print("Make sure the simulation using this checkpoint has at least ", end=' ')
     print(page_ptr, "x 4K of memory")
-    merged_config.set("system.physmem.store0", "range_size", page_ptr * 4 * 1024)
+    merged_config.set("system.physmem.store0", "range_size",
+                      str(page_ptr * page_size))
 
     merged_config.add_section("Globals")
-    merged_config.set("Globals", "curTick", max_curtick)
+    merged_config.set("Globals", "curTick", str(max_curtick))
 
     merged_config.write(agg_config_file)
-
-    if not no_compress:
-        merged_mem.close()
-        agg_mem_file.close()
-    else:
-        agg_mem_file.close()
+    agg_config_file.close()
 
 if __name__ == "__main__":
     from argparse import ArgumentParser
@@ -147,7 +283,20 @@ if __name__ == "__main__":
                             "hold the checkpoints to be combined>")
     parser.add_argument("-o", "--output-dir", action="store",
                         help="Output directory")
-    parser.add_argument("-c", "--no-compress", action="store_true")
+    parser.add_argument("-c", "--no-compress", action="store_true",
+                        help="Same as --format=raw")
+    parser.add_argument("--format", choices=["gzip", "raw", "pages"],
+                        default=None,
+                        help="Format of the memory image: gzip (the "
+                        "default), raw, an uncompressed sparse file "
+                        "which can be mmapped, or pages, a page manifest "
+                        "(see checkpoint_pagestore.py)")
+    parser.add_argument("--page-store", default=None,
+                        help="Page store for --format=pages (default: "
+                        "pagestore, next to the output directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of images to decompress in parallel "
+                        "(default: number of CPUs)")
     parser.add_argument("--cpts", nargs='+')
     parser.add_argument("--memory-size", action="store", type=int)
 
@@ -160,4 +309,5 @@ if __name__ == "__main__":
                      "need to be combined.")
 
     aggregate(options.output_dir, options.cpts, options.no_compress,
-              options.memory_size)
+              options.memory_size, options.format, options.jobs,
+              options.page_store)
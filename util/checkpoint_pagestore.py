@@ -0,0 +1,356 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Content-addressed page store for physical memory checkpoints.
+#
+# gem5 writes every physical memory backing store of a checkpoint as a
+# gzip'd image of the whole store. Checkpoints of the same workload (e.g.,
+# SimPoints) are mostly made of zero pages and pages they share. This
+# script replaces those images by page manifests: each page of the store is
+# either elided, if it is all zeros, or refers to a page in a page store
+# that is shared by all the checkpoints in a directory and holds every
+# distinct page once.
+#
+# A page store is a directory holding:
+#   pages.pack: The distinct pages, one after the other.
+#   pages.idx:  The digest of every page in pages.pack, in the same order.
+# Pages are only ever appended, so checkpoints sharing a store stay valid as
+# it grows. A store must not be written by more than one process at a time.
+#
+# A page manifest keeps the name of the image it replaces, so the
+# checkpoint itself (m5.cpt) is unchanged. It is gzip'd like an image, and
+# holds, all integers being 64-bit little endian:
+#   magic:      b"gem5pgs\x01"
+#   page_size
+#   num_pages
+#   path_len
+#   path:       Path of pages.pack, relative to the checkpoint directory.
+#   pages:      num_pages page numbers in pages.pack, or ZERO_PAGE.
+#
+# gem5 itself still writes gzip'd images when it takes a checkpoint; page
+# manifests are only made offline, by the 'pack' command of this script or
+# the checkpoint tools (checkpoint_aggregator.py, cpt_upgrader.py), which
+# read and write them through this module. gem5 restores a manifest by
+# reading the non-zero pages straight from the page store. Zero pages are
+# not written, as the backing store is zero initialised (shared backing
+# stores, which may hold old contents, have their zero pages cleared).
+
+from array import array
+from configparser import ConfigParser
+import gzip
+import hashlib
+import os
+import struct
+import sys
+
+PAGE_SIZE = 1 << 12
+MAGIC = b"gem5pgs\x01"
+ZERO_PAGE = (1 << 64) - 1
+
+# Pages are read and written in blocks of this size
+BLOCK_SIZE = 1 << 20
+
+_zero_page = bytes(PAGE_SIZE)
+_header = struct.Struct("<QQQ")
+
+def _to_little_endian(pages):
+    if sys.byteorder != "little":
+        pages = array("Q", pages)
+        pages.byteswap()
+    return pages
+
+class PageStore:
+    """
+    A directory of distinct pages shared by checkpoints. Pages are added
+    with add(), which returns their page number, and read back with read().
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.pack_path = os.path.join(directory, "pages.pack")
+        self.idx_path = os.path.join(directory, "pages.idx")
+
+        self.pack = open(self.pack_path, "ab+")
+        self.idx = open(self.idx_path, "ab+")
+
+        # If a writer died, either file may hold a partial or extra entry.
+        # Only keep the pages that are complete in both.
+        size = self._digest_size
+        self.idx.seek(0)
+        data = self.idx.read()
+        self.pack.seek(0, os.SEEK_END)
+        num_pages = min(len(data) // size, self.pack.tell() // PAGE_SIZE)
+        self.digests = {}
+        for number in range(num_pages):
+            self.digests[data[number * size:(number + 1) * size]] = number
+        self.idx.truncate(num_pages * size)
+        self.pack.truncate(num_pages * PAGE_SIZE)
+
+    _digest_size = 16
+
+    @classmethod
+    def _digest(cls, page):
+        return hashlib.blake2b(page, digest_size=cls._digest_size).digest()
+
+    def __len__(self):
+        return len(self.digests)
+
+    def add(self, page):
+        """Add a page, unless the store already holds it, and return its
+        page number"""
+        digest = self._digest(page)
+        number = self.digests.get(digest)
+        if number is None:
+            number = len(self.digests)
+            self.pack.seek(0, os.SEEK_END)
+            self.pack.write(page)
+            self.idx.write(digest)
+            self.digests[digest] = number
+        return number
+
+    def read(self, number):
+        self.pack.seek(number * PAGE_SIZE)
+        return self.pack.read(PAGE_SIZE)
+
+    def flush(self):
+        self.pack.flush()
+        self.idx.flush()
+
+    def close(self):
+        self.pack.close()
+        self.idx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def is_manifest(path):
+    """Is the memory image at path a page manifest"""
+    with gzip.open(path, "rb") as f:
+        try:
+            return f.read(len(MAGIC)) == MAGIC
+        except OSError:
+            return False
+
+class ManifestWriter:
+    """
+    A file-like object writing a memory image of a given size to a page
+    manifest, adding its pages to a page store. If less than size bytes
+    are written, the rest of the image is zeros.
+    """
+
+    def __init__(self, path, store, size):
+        self.store = store
+        self.num_pages = (size + PAGE_SIZE - 1) // PAGE_SIZE
+        self.page = 0
+        self.buffer = b""
+
+        pack_path = os.path.relpath(store.pack_path,
+            os.path.dirname(os.path.abspath(path))).encode()
+        self.manifest = gzip.open(path, "wb", compresslevel=6)
+        self.manifest.write(MAGIC)
+        self.manifest.write(_header.pack(PAGE_SIZE, self.num_pages,
+                                         len(pack_path)))
+        self.manifest.write(pack_path)
+
+    def _write_pages(self, data):
+        pages = array("Q")
+        view = memoryview(data)
+        for offset in range(0, len(data), PAGE_SIZE):
+            page = view[offset:offset + PAGE_SIZE]
+            if page == _zero_page:
+                pages.append(ZERO_PAGE)
+            else:
+                pages.append(self.store.add(page))
+        self.manifest.write(_to_little_endian(pages).tobytes())
+        self.page += len(pages)
+
+    def write(self, data):
+        if self.buffer:
+            data = self.buffer + data
+        whole = len(data) - len(data) % PAGE_SIZE
+        whole = min(whole, (self.num_pages - self.page) * PAGE_SIZE)
+        self._write_pages(data[:whole])
+        self.buffer = bytes(data[whole:])
+        return len(data)
+
+    def close(self):
+        if self.buffer and self.page < self.num_pages:
+            self._write_pages(self.buffer[:PAGE_SIZE].ljust(PAGE_SIZE,
+                                                             b"\0"))
+        self.buffer = b""
+        zero = array("Q", [ZERO_PAGE]).tobytes()
+        while self.page < self.num_pages:
+            count = min(self.num_pages - self.page, BLOCK_SIZE // 8)
+            self.manifest.write(zero * count)
+            self.page += count
+        self.manifest.close()
+        self.store.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class ManifestReader:
+    """
+    A file-like object reading the memory image described by a page
+    manifest.
+    """
+
+    def __init__(self, path):
+        self.manifest = gzip.open(path, "rb")
+        if self.manifest.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a page manifest" % path)
+        self.page_size, self.num_pages, path_len = _header.unpack(
+            self.manifest.read(_header.size))
+        pack_path = self.manifest.read(path_len).decode()
+        self.pack = open(os.path.join(os.path.dirname(path), pack_path),
+                         "rb")
+        self.page = 0
+        self.buffer = b""
+
+    def _read_pages(self, count):
+        data = self.manifest.read(count * 8)
+        pages = array("Q")
+        pages.frombytes(data)
+        pages = _to_little_endian(pages)
+        zero = bytes(self.page_size)
+        out = []
+        for number in pages:
+            if number == ZERO_PAGE:
+                out.append(zero)
+            else:
+                self.pack.seek(number * self.page_size)
+                out.append(self.pack.read(self.page_size))
+        self.page += len(pages)
+        return b"".join(out)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = (self.num_pages - self.page) * self.page_size + \
+                len(self.buffer)
+        while len(self.buffer) < size and self.page < self.num_pages:
+            count = min(self.num_pages - self.page,
+                max(1, (size - len(self.buffer) + self.page_size - 1) //
+                    self.page_size), BLOCK_SIZE // self.page_size)
+            self.buffer += self._read_pages(count)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        self.manifest.close()
+        self.pack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def open_image(path):
+    """Open a memory image for reading, be it a gzip'd image or a page
+    manifest"""
+    if is_manifest(path):
+        return ManifestReader(path)
+    return gzip.open(path, "rb")
+
+def _memory_images(cpt_dir):
+    """Yields (path, size) of the memory images of a checkpoint"""
+    config = ConfigParser()
+    config.optionxform = str
+    with open(os.path.join(cpt_dir, "m5.cpt")) as f:
+        config.read_file(f)
+    for sec in config.sections():
+        if config.has_option(sec, "filename") and \
+                config.has_option(sec, "range_size"):
+            yield (os.path.join(cpt_dir, config.get(sec, "filename")),
+                   config.getint(sec, "range_size"))
+
+def default_store(cpt_dir):
+    """The page store shared by the checkpoints next to cpt_dir"""
+    return os.path.join(os.path.dirname(os.path.abspath(cpt_dir)),
+                        "pagestore")
+
+def pack_checkpoint(cpt_dir, store):
+    """Replace the memory images of a checkpoint by page manifests"""
+    for path, size in _memory_images(cpt_dir):
+        if not os.path.exists(path) or is_manifest(path):
+            continue
+        with gzip.open(path, "rb") as image, \
+                ManifestWriter(path + ".tmp", store, size) as out:
+            while True:
+                block = image.read(BLOCK_SIZE)
+                if not block:
+                    break
+                out.write(block)
+        os.replace(path + ".tmp", path)
+
+def unpack_checkpoint(cpt_dir):
+    """Replace the page manifests of a checkpoint by gzip'd images"""
+    for path, size in _memory_images(cpt_dir):
+        if not os.path.exists(path) or not is_manifest(path):
+            continue
+        with ManifestReader(path) as image, \
+                gzip.open(path + ".tmp", "wb", compresslevel=6) as out:
+            while True:
+                block = image.read(BLOCK_SIZE)
+                if not block:
+                    break
+                out.write(block)
+        os.replace(path + ".tmp", path)
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="Convert the physical memory "
+                            "images of checkpoints to and from page "
+                            "manifests in a shared page store")
+    parser.add_argument("action", choices=["pack", "unpack"])
+    parser.add_argument("cpts", nargs="+", metavar="CPT_DIR")
+    parser.add_argument("--store", default=None,
+                        help="Page store directory (default: pagestore, "
+                        "next to the checkpoint directories)")
+    options = parser.parse_args()
+
+    if options.action == "pack":
+        stores = {}
+        for cpt in options.cpts:
+            directory = options.store or default_store(cpt)
+            if directory not in stores:
+                stores[directory] = PageStore(directory)
+            pack_checkpoint(cpt, stores[directory])
+            print(cpt, "packed,", len(stores[directory]), "distinct pages in",
+                  directory)
+        for store in stores.values():
+            store.close()
+    else:
+        for cpt in options.cpts:
+            unpack_checkpoint(cpt)
+            print(cpt, "unpacked")
@@ -199,8 +199,8 @@ def process_file(path, **kwargs):
     cpt.optionxform = str
 
     # Read the current data
-    cpt_file = file(path, 'r')
-    cpt.readfp(cpt_file)
+    cpt_file = open(path, 'r')
+    cpt.read_file(cpt_file)
     cpt_file.close()
 
     change = False
@@ -257,7 +257,28 @@ def process_file(path, **kwargs):
 
     # Write the old data back
     verboseprint("...completed")
-    cpt.write(file(path, 'w'))
+    with open(path, 'w') as cpt_file:
+        cpt.write(cpt_file)
+
+def process_memory(path, **kwargs):
+    """Convert the physical memory images of the checkpoint whose m5.cpt
+    is at path to or from page manifests (see checkpoint_pagestore.py)"""
+    import checkpoint_pagestore
+
+    cpt_dir = osp.dirname(path)
+    if kwargs.get('pack_pages'):
+        store_dir = kwargs.get('page_store') or \
+            checkpoint_pagestore.default_store(cpt_dir)
+        with checkpoint_pagestore.PageStore(store_dir) as store:
+            checkpoint_pagestore.pack_checkpoint(cpt_dir, store)
+        verboseprint("packed memory of", cpt_dir, "into", store_dir)
+    elif kwargs.get('unpack_pages'):
+        checkpoint_pagestore.unpack_checkpoint(cpt_dir)
+        verboseprint("unpacked memory of", cpt_dir)
+
+def process_checkpoint(path, **kwargs):
+    process_file(path, **kwargs)
+    process_memory(path, **kwargs)
 
 if __name__ == '__main__':
     from optparse import OptionParser, SUPPRESS_HELP
@@ -270,6 +291,15 @@ if __name__ == '__main__':
                       help="Do no backup each checkpoint before modifying it")
     parser.add_option("-v", "--verbose", action="store_true",
                       help="Print out debugging information as")
+    parser.add_option("--pack-pages", action="store_true",
+                      help="Also replace the physical memory images by "\
+                           "page manifests in a shared page store")
+    parser.add_option("--unpack-pages", action="store_true",
+                      help="Also replace page manifests by physical "\
+                           "memory images")
+    parser.add_option("--page-store", metavar="DIR", default=None,
+                      help="Page store for --pack-pages (default: "\
+                           "pagestore, next to each checkpoint)")
     parser.add_option("--get-cc-file", action="store_true",
                       # used during build; generate src/sim/tags.cc and exit
                       help=SUPPRESS_HELP)
@@ -298,7 +328,7 @@ if __name__ == '__main__':
 
     # Process a single file if we have it
     if osp.isfile(path):
-        process_file(path, **vars(options))
+        process_checkpoint(path, **vars(options))
     # Process an entire directory
     elif osp.isdir(path):
         cpt_file = osp.join(path, 'm5.cpt')
@@ -307,12 +337,13 @@ if __name__ == '__main__':
             for root,dirs,files in os.walk(path):
                 for name in files:
                     if name == 'm5.cpt':
-                        process_file(osp.join(root,name), **vars(options))
+                        process_checkpoint(osp.join(root,name),
+                                           **vars(options))
                 for dir in dirs:
                     pass
         # Maybe someone passed a cpt.XXXXXXX directory and not m5.cpt
         elif osp.isfile(cpt_file):
-            process_file(cpt_file, **vars(options))
+            process_checkpoint(cpt_file, **vars(options))
         else:
             print("Error: checkpoint file not found in {} ".format(path))
             print("and recurse not specified")
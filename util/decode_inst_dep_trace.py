@@ -85,7 +85,19 @@
 # 7,35666,1,COMP,3000::,4
 # 8,35670,1,STORE,1748748,4,74,0:,6,3:,7
 # 9,35670,1,COMP,500::,7
+#
+# If the output file name ends in .npy or .npz, the records are instead
+# written as a NumPy record array with the fields listed in RECORD_DTYPE
+# (see protolib.NumpyRecordWriter). The order and register dependencies
+# go to <output>.rob_dep.npy/npz and <output>.reg_dep.npy/npz, record
+# arrays of (record index, dependency seq_num) pairs. Missing optional
+# fields are stored as 0, except for the weight, which defaults to 1
+# like in the ASCII output.
+#
+# If the trace has an index (see index_trace.py), the ASCII output is
+# decoded in parallel, one process per chunk of the index.
 
+import io
 import protolib
 import sys
 
@@ -106,52 +118,49 @@ except:
         print("Failed to import proto definitions")
         exit(-1)
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: ", sys.argv[0], " <protobuf input> <ASCII output>")
-        exit(-1)
-
-    # Open the file on read mode
-    proto_in = protolib.openFileRd(sys.argv[1])
-
-    try:
-        ascii_out = open(sys.argv[2], 'w')
-    except IOError:
-        print("Failed to open ", sys.argv[2], " for writing")
-        exit(-1)
-
-    # Read the magic number in 4-byte Little Endian
-    magic_number = proto_in.read(4)
-
-    if magic_number != "gem5":
-        print("Unrecognized file")
-        exit(-1)
-
-    print("Parsing packet header")
-
-    # Add the packet header
-    header = inst_dep_record_pb2.InstDepRecordHeader()
-    protolib.decodeMessage(proto_in, header)
+RECORD_DTYPE = [('seq_num', '<u8'), ('pc', '<u8'), ('weight', '<u4'),
+                ('type', '<u4'), ('p_addr', '<u8'), ('size', '<u4'),
+                ('flags', '<u4'), ('comp_delay', '<u8'),
+                ('num_rob_dep', '<u4'), ('num_reg_dep', '<u4')]
 
-    print("Object id:", header.obj_id)
-    print("Tick frequency:", header.tick_freq)
+DEP_DTYPE = [('record', '<u8'), ('dep', '<u8')]
 
-    print("Parsing packets")
+def decode_numpy(proto_in, out_name):
+    records = protolib.NumpyRecordWriter(out_name, RECORD_DTYPE)
+    rob_deps = protolib.NumpyRecordWriter(
+        protolib.sidecarName(out_name, 'rob_dep'), DEP_DTYPE)
+    reg_deps = protolib.NumpyRecordWriter(
+        protolib.sidecarName(out_name, 'reg_dep'), DEP_DTYPE)
+    num_records = 0
+    packet = inst_dep_record_pb2.InstDepRecord()
+    for packet in proto_in.decodeMessages(packet):
+        weight = packet.weight if packet.HasField('weight') else 1
+        records.append((packet.seq_num, packet.pc, weight, packet.type,
+                        packet.p_addr, packet.size, packet.flags,
+                        packet.comp_delay, len(packet.rob_dep),
+                        len(packet.reg_dep)))
+        for dep in packet.rob_dep:
+            rob_deps.append((num_records, dep))
+        for dep in packet.reg_dep:
+            reg_deps.append((num_records, dep))
+        num_records += 1
+    records.close()
+    rob_deps.close()
+    reg_deps.close()
+    return num_records
 
-    print("Creating enum value,name lookup from proto")
+def enum_names():
     enumNames = {}
     desc = inst_dep_record_pb2.InstDepRecord.DESCRIPTOR
     for namestr, valdesc in list(desc.enum_values_by_name.items()):
-        print('\t', valdesc.number, namestr)
         enumNames[valdesc.number] = namestr
+    return enumNames
 
+def write_ascii(packets, ascii_out, enumNames):
     num_packets = 0
     num_regdeps = 0
     num_robdeps = 0
-    packet = inst_dep_record_pb2.InstDepRecord()
-
-    # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
+    for packet in packets:
         num_packets += 1
 
         # Write to file the seq num
@@ -202,13 +211,83 @@ def main():
         # New line
         ascii_out.write('\n')
 
+    return num_packets, num_robdeps, num_regdeps
+
+def decode_ascii_chunk(packets, first):
+    ascii_out = io.StringIO()
+    counts = write_ascii(packets, ascii_out, enum_names())
+    return ascii_out.getvalue(), counts
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: ", sys.argv[0],
+              " <protobuf input> <ASCII | .npy | .npz output>")
+        exit(-1)
+
+    # Open the file on read mode
+    proto_in = protolib.MessageReader(protolib.openFileRd(sys.argv[1]))
+
+    numpy_out = protolib.isNumpyOutput(sys.argv[2])
+    if not numpy_out:
+        try:
+            ascii_out = open(sys.argv[2], 'w')
+        except IOError:
+            print("Failed to open ", sys.argv[2], " for writing")
+            exit(-1)
+
+    # Read the magic number in 4-byte Little Endian
+    magic_number = proto_in.read(4).decode()
+
+    if magic_number != "gem5":
+        print("Unrecognized file")
+        exit(-1)
+
+    print("Parsing packet header")
+
+    # Add the packet header
+    header = inst_dep_record_pb2.InstDepRecordHeader()
+    proto_in.decodeMessage(header)
+
+    print("Object id:", header.obj_id)
+    print("Tick frequency:", header.tick_freq)
+
+    print("Parsing packets")
+
+    if numpy_out:
+        print("Parsed packets:", decode_numpy(proto_in, sys.argv[2]))
+        proto_in.close()
+        return
+
+    print("Creating enum value,name lookup from proto")
+    enumNames = enum_names()
+    for number, namestr in enumNames.items():
+        print('\t', number, namestr)
+
+    if protolib.hasIndex(sys.argv[1]):
+        # Decode the chunks recorded in the index in parallel
+        proto_in.close()
+        num_packets, num_robdeps, num_regdeps = 0, 0, 0
+        for text, counts in protolib.decodeParallel(
+                sys.argv[1], inst_dep_record_pb2.InstDepRecord,
+                decode_ascii_chunk):
+            ascii_out.write(text)
+            num_packets += counts[0]
+            num_robdeps += counts[1]
+            num_regdeps += counts[2]
+    else:
+        # Decode the packet messages until we hit the end of the file
+        packets = proto_in.decodeMessages(
+            inst_dep_record_pb2.InstDepRecord())
+        num_packets, num_robdeps, num_regdeps = \
+            write_ascii(packets, ascii_out, enumNames)
+        proto_in.close()
+
     print("Parsed packets:", num_packets)
     print("Packets with at least 1 reg dep:", num_regdeps)
     print("Packets with at least 1 rob dep:", num_robdeps)
 
     # We're done
     ascii_out.close()
-    proto_in.close()
 
 if __name__ == "__main__":
     main()
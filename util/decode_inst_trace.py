@@ -41,7 +41,20 @@
 # be done manually using:
 # protoc --python_out=. inst.proto
 # The ASCII trace format uses one line per request.
+#
+# If the output file name ends in .npy or .npz, the instructions are
+# instead written as a NumPy record array with the fields listed in
+# INST_DTYPE (see protolib.NumpyRecordWriter). The memory accesses of
+# each instruction go to a second record array (MEM_ACCESS_DTYPE) in
+# <output>.mem_access.npy/npz, whose 'inst' field is the index of the
+# instruction in the first array. Missing optional fields are stored
+# as 0, except for the tick, which defaults to the instruction count
+# like in the ASCII output.
+#
+# If the trace has an index (see index_trace.py), the ASCII output is
+# decoded in parallel, one process per chunk of the index.
 
+import io
 import protolib
 import sys
 
@@ -67,50 +80,34 @@ except:
         print("Failed to import inst proto definitions")
         exit(-1)
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: ", sys.argv[0], " <protobuf input> <ASCII output>")
-        exit(-1)
-
-    # Open the file in read mode
-    proto_in = protolib.openFileRd(sys.argv[1])
-
-    try:
-        ascii_out = open(sys.argv[2], 'w')
-    except IOError:
-        print("Failed to open ", sys.argv[2], " for writing")
-        exit(-1)
-
-    # Read the magic number in 4-byte Little Endian
-    magic_number = proto_in.read(4)
-
-    if magic_number != "gem5":
-        print("Unrecognized file", sys.argv[1])
-        exit(-1)
-
-    print("Parsing instruction header")
-
-    # Add the packet header
-    header = inst_pb2.InstHeader()
-    protolib.decodeMessage(proto_in, header)
+INST_DTYPE = [('tick', '<u8'), ('pc', '<u8'), ('inst', '<u4'),
+              ('nodeid', '<u4'), ('cpuid', '<u4'), ('type', '<u4'),
+              ('inst_flags', '<u4'), ('num_mem_access', '<u4')]
 
-    print("Object id:", header.obj_id)
-    print("Tick frequency:", header.tick_freq)
-    print("Memory addresses included:", header.has_mem)
-
-    if header.ver != 0:
-        print("Warning: file version newer than decoder:", header.ver)
-        print("This decoder may not understand how to decode this file")
-
-
-    print("Parsing instructions")
+MEM_ACCESS_DTYPE = [('inst', '<u8'), ('addr', '<u8'), ('size', '<u4'),
+                    ('mem_flags', '<u4')]
 
+def decode_numpy(proto_in, out_name):
+    insts = protolib.NumpyRecordWriter(out_name, INST_DTYPE)
+    mem_accesses = protolib.NumpyRecordWriter(
+        protolib.sidecarName(out_name, 'mem_access'), MEM_ACCESS_DTYPE)
     num_insts = 0
     inst = inst_pb2.Inst()
+    for inst in proto_in.decodeMessages(inst):
+        tick = inst.tick if inst.HasField('tick') else num_insts
+        insts.append((tick, inst.pc, inst.inst, inst.nodeid, inst.cpuid,
+                      inst.type, inst.inst_flags, len(inst.mem_access)))
+        for mem_acc in inst.mem_access:
+            mem_accesses.append((num_insts, mem_acc.addr, mem_acc.size,
+                                 mem_acc.mem_flags))
+        num_insts += 1
+    insts.close()
+    mem_accesses.close()
+    return num_insts
 
-    # Decode the inst messages until we hit the end of the file
-    optional_fields = ('tick', 'type', 'inst_flags', 'addr', 'size', 'mem_flags')
-    while protolib.decodeMessage(proto_in,  inst):
+def write_ascii(insts, ascii_out, first):
+    num_insts = first
+    for inst in insts:
         # If we have a tick use it, otherwise count instructions
         if inst.HasField('tick'):
             tick = inst.tick
@@ -138,11 +135,77 @@ def main():
         ascii_out.write('\n')
         num_insts += 1
 
+    return num_insts - first
+
+def decode_ascii_chunk(insts, first):
+    ascii_out = io.StringIO()
+    num_insts = write_ascii(insts, ascii_out, first)
+    return ascii_out.getvalue(), num_insts
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: ", sys.argv[0],
+              " <protobuf input> <ASCII | .npy | .npz output>")
+        exit(-1)
+
+    # Open the file in read mode
+    proto_in = protolib.MessageReader(protolib.openFileRd(sys.argv[1]))
+
+    numpy_out = protolib.isNumpyOutput(sys.argv[2])
+    if not numpy_out:
+        try:
+            ascii_out = open(sys.argv[2], 'w')
+        except IOError:
+            print("Failed to open ", sys.argv[2], " for writing")
+            exit(-1)
+
+    # Read the magic number in 4-byte Little Endian
+    magic_number = proto_in.read(4).decode()
+
+    if magic_number != "gem5":
+        print("Unrecognized file", sys.argv[1])
+        exit(-1)
+
+    print("Parsing instruction header")
+
+    # Add the packet header
+    header = inst_pb2.InstHeader()
+    proto_in.decodeMessage(header)
+
+    print("Object id:", header.obj_id)
+    print("Tick frequency:", header.tick_freq)
+    print("Memory addresses included:", header.has_mem)
+
+    if header.ver != 0:
+        print("Warning: file version newer than decoder:", header.ver)
+        print("This decoder may not understand how to decode this file")
+
+
+    print("Parsing instructions")
+
+    if numpy_out:
+        print("Parsed instructions:", decode_numpy(proto_in, sys.argv[2]))
+        proto_in.close()
+        return
+
+    if protolib.hasIndex(sys.argv[1]):
+        # Decode the chunks recorded in the index in parallel
+        proto_in.close()
+        num_insts = 0
+        for text, count in protolib.decodeParallel(
+                sys.argv[1], inst_pb2.Inst, decode_ascii_chunk):
+            ascii_out.write(text)
+            num_insts += count
+    else:
+        # Decode the inst messages until we hit the end of the file
+        insts = proto_in.decodeMessages(inst_pb2.Inst())
+        num_insts = write_ascii(insts, ascii_out, 0)
+        proto_in.close()
+
     print("Parsed instructions:", num_insts)
 
     # We're done
     ascii_out.close()
-    proto_in.close()
 
 if __name__ == "__main__":
     main()
@@ -36,8 +36,15 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 # This script is used to dump protobuf packet traces to ASCII
-# format.
+# format. If the output file name ends in .npy or .npz, the packets
+# are instead written as a NumPy record array with the fields listed
+# in PACKET_DTYPE (see protolib.NumpyRecordWriter). Optional fields
+# that are not present in a packet are stored as 0.
+#
+# If the trace has an index (see index_trace.py), the ASCII output is
+# decoded in parallel, one process per chunk of the index.
 
+import io
 import os
 import protolib
 import subprocess
@@ -48,19 +55,61 @@ util_dir = os.path.dirname(os.path.realpath(__file__))
 subprocess.check_call(['make', '--quiet', '-C', util_dir, 'packet_pb2.py'])
 import packet_pb2
 
+PACKET_DTYPE = [('tick', '<u8'), ('cmd', '<u4'), ('addr', '<u8'),
+                ('size', '<u4'), ('flags', '<u4'), ('pkt_id', '<u8'),
+                ('pc', '<u8')]
+
+def decode_numpy(proto_in, out_name):
+    records = protolib.NumpyRecordWriter(out_name, PACKET_DTYPE)
+    packet = packet_pb2.Packet()
+    append = records.append
+    for packet in proto_in.decodeMessages(packet):
+        append((packet.tick, packet.cmd, packet.addr, packet.size,
+                packet.flags, packet.pkt_id, packet.pc))
+    records.close()
+    return records.count
+
+def write_ascii(packets, ascii_out):
+    num_packets = 0
+    for packet in packets:
+        num_packets += 1
+        # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
+        cmd = 'r' if packet.cmd == 1 else ('w' if packet.cmd == 4 else 'u')
+        if packet.HasField('pkt_id'):
+            ascii_out.write('%s,' % (packet.pkt_id))
+        if packet.HasField('flags'):
+            ascii_out.write('%s,%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
+                            packet.flags, packet.tick))
+        else:
+            ascii_out.write('%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
+                                           packet.tick))
+        if packet.HasField('pc'):
+            ascii_out.write(',%s\n' % (packet.pc))
+        else:
+            ascii_out.write('\n')
+    return num_packets
+
+def decode_ascii_chunk(packets, first):
+    ascii_out = io.StringIO()
+    num_packets = write_ascii(packets, ascii_out)
+    return ascii_out.getvalue(), num_packets
+
 def main():
     if len(sys.argv) != 3:
-        print("Usage: ", sys.argv[0], " <protobuf input> <ASCII output>")
+        print("Usage: ", sys.argv[0],
+              " <protobuf input> <ASCII | .npy | .npz output>")
         exit(-1)
 
     # Open the file in read mode
-    proto_in = protolib.openFileRd(sys.argv[1])
+    proto_in = protolib.MessageReader(protolib.openFileRd(sys.argv[1]))
 
-    try:
-        ascii_out = open(sys.argv[2], 'w')
-    except IOError:
-        print("Failed to open ", sys.argv[2], " for writing")
-        exit(-1)
+    numpy_out = protolib.isNumpyOutput(sys.argv[2])
+    if not numpy_out:
+        try:
+            ascii_out = open(sys.argv[2], 'w')
+        except IOError:
+            print("Failed to open ", sys.argv[2], " for writing")
+            exit(-1)
 
     # Read the magic number in 4-byte Little Endian
     magic_number = proto_in.read(4).decode()
@@ -73,7 +122,7 @@ def main():
 
     # Add the packet header
     header = packet_pb2.PacketHeader()
-    protolib.decodeMessage(proto_in, header)
+    proto_in.decodeMessage(header)
 
     print("Object id:", header.obj_id)
     print("Tick frequency:", header.tick_freq)
@@ -83,32 +132,29 @@ def main():
 
     print("Parsing packets")
 
-    num_packets = 0
-    packet = packet_pb2.Packet()
-
-    # Decode the packet messages until we hit the end of the file
-    while protolib.decodeMessage(proto_in, packet):
-        num_packets += 1
-        # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
-        cmd = 'r' if packet.cmd == 1 else ('w' if packet.cmd == 4 else 'u')
-        if packet.HasField('pkt_id'):
-            ascii_out.write('%s,' % (packet.pkt_id))
-        if packet.HasField('flags'):
-            ascii_out.write('%s,%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
-                            packet.flags, packet.tick))
-        else:
-            ascii_out.write('%s,%s,%s,%s' % (cmd, packet.addr, packet.size,
-                                           packet.tick))
-        if packet.HasField('pc'):
-            ascii_out.write(',%s\n' % (packet.pc))
-        else:
-            ascii_out.write('\n')
+    if numpy_out:
+        print("Parsed packets:", decode_numpy(proto_in, sys.argv[2]))
+        proto_in.close()
+        return
+
+    if protolib.hasIndex(sys.argv[1]):
+        # Decode the chunks recorded in the index in parallel
+        proto_in.close()
+        num_packets = 0
+        for text, count in protolib.decodeParallel(
+                sys.argv[1], packet_pb2.Packet, decode_ascii_chunk):
+            ascii_out.write(text)
+            num_packets += count
+    else:
+        # Decode the packet messages until we hit the end of the file
+        packets = proto_in.decodeMessages(packet_pb2.Packet())
+        num_packets = write_ascii(packets, ascii_out)
+        proto_in.close()
 
     print("Parsed packets:", num_packets)
 
     # We're done
     ascii_out.close()
-    proto_in.close()
 
 if __name__ == "__main__":
     main()
@@ -114,7 +114,7 @@ def main():
         exit(-1)
 
     # Open the file in write mode
-    proto_out = open(sys.argv[2], 'wb')
+    proto_out = protolib.MessageWriter(open(sys.argv[2], 'wb'))
 
     # Open the file in read mode
     try:
@@ -125,7 +125,7 @@ def main():
 
     # Write the magic number in 4-byte Little Endian, similar to what
     # is done in src/proto/protoio.cc
-    proto_out.write("gem5")
+    proto_out.write(b"gem5")
 
     # Add the packet header
     header = inst_dep_record_pb2.InstDepRecordHeader()
@@ -133,7 +133,7 @@ def main():
     # Assume the default tick rate
     header.tick_freq = 1000000000
     header.window_size = 120
-    protolib.encodeMessage(proto_out, header)
+    proto_out.encodeMessage(header)
 
     print("Creating enum name,value lookup from proto")
     enumValues = {}
@@ -191,7 +191,7 @@ def main():
             if a_dep:
                 dep_record.reg_dep.append(int(a_dep))
 
-        protolib.encodeMessage(proto_out, dep_record)
+        proto_out.encodeMessage(dep_record)
         num_records += 1
 
     print("Converted", num_records, "records.")
@@ -90,21 +90,21 @@ def main():
         exit(-1)
 
     try:
-        proto_out = open(sys.argv[2], 'wb')
+        proto_out = protolib.MessageWriter(open(sys.argv[2], 'wb'))
     except IOError:
         print("Failed to open ", sys.argv[2], " for writing")
         exit(-1)
 
     # Write the magic number in 4-byte Little Endian, similar to what
     # is done in src/proto/protoio.cc
-    proto_out.write("gem5")
+    proto_out.write(b"gem5")
 
     # Add the packet header
     header = packet_pb2.PacketHeader()
     header.obj_id = "Converted ASCII trace " + sys.argv[1]
     # Assume the default tick rate
     header.tick_freq = 1000000000000
-    protolib.encodeMessage(proto_out, header)
+    proto_out.encodeMessage(header)
 
     # For each line in the ASCII trace, create a packet message and
     # write it to the encoded output
@@ -116,7 +116,7 @@ def main():
         packet.cmd = 1 if cmd == 'r' else 4
         packet.addr = int(addr)
         packet.size = int(size)
-        protolib.encodeMessage(proto_out, packet)
+        proto_out.encodeMessage(packet)
 
     # We're done
     ascii_in.close()
@@ -36,12 +36,17 @@ Some common queries can be found in common_queries.py
 
 from abc import ABC, abstractmethod
 
-import gridfs  # type: ignore
+import atexit
+import hashlib
+import json
 import os
-from pathlib import Path
-from pymongo import MongoClient  # type: ignore
-from typing import Any, Dict, Iterable, Union, Type
-from urllib.parse import urlparse
+from pathlib import Path, PurePath
+import re
+import shutil
+import sqlite3
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, Type
+from urllib.parse import parse_qs, urlparse
 from uuid import UUID
 
 
@@ -129,6 +134,11 @@ class ArtifactMongoDB(ArtifactDB):
         uri is the location of the database in a mongodb compatible form.
         http://dochub.mongodb.org/core/connections.
         """
+        # Imported here so that the other databases can be used without
+        # pymongo installed.
+        import gridfs  # type: ignore
+        from pymongo import MongoClient  # type: ignore
+
         # Note: Need "connect=False" so that we don't connect until the first
         # time we interact with the database. Required for the gem5 running
         # celery server
@@ -205,11 +215,260 @@ class ArtifactMongoDB(ArtifactDB):
             yield d
 
 
+class _DocumentEncoder(json.JSONEncoder):
+    """Encodes the UUIDs and paths in artifact documents as JSON. UUIDs are
+    encoded as in MongoDB extended JSON so that they can be decoded again."""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, UUID):
+            return {"$uuid": str(o)}
+        if isinstance(o, PurePath):
+            return str(o)
+        return super().default(o)
+
+
+def _decodeDocumentObject(d: Dict[str, Any]) -> Any:
+    if len(d) == 1 and "$uuid" in d:
+        return UUID(d["$uuid"])
+    return d
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value) is not None
+
+
+class ArtifactSQLiteDB(ArtifactDB):
+    """
+    This is a database for storing Artifacts (as defined in artifact.py) in a
+    local SQLite database, for when there is no database server to connect
+    to.
+
+    The artifacts are stored as JSON documents in the artifacts table, which
+    is indexed by the UUID, hash, name and type of the artifacts. Uploaded
+    files are stored in a directory next to the database, named by the
+    SHA-256 of their contents so that a file uploaded for several artifacts
+    is only stored once. The files table maps the UUID of each artifact to
+    the file uploaded for it.
+
+    Artifacts are inserted in batches. Pending artifacts are inserted before
+    the database is read, when the batch is full, when flush() is called and
+    when the process exits, so they aren't visible to other processes until
+    then.
+    """
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            id TEXT PRIMARY KEY,
+            hash TEXT,
+            name TEXT,
+            type TEXT,
+            document TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS artifacts_hash ON artifacts (hash);
+        CREATE INDEX IF NOT EXISTS artifacts_name ON artifacts (name);
+        CREATE INDEX IF NOT EXISTS artifacts_type_name
+            ON artifacts (type, name);
+        CREATE TABLE IF NOT EXISTS files (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            digest TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, uri: str) -> None:
+        """Open the database at the location given by the uri, creating it
+        if it doesn't exist.
+
+        sqlite://<path> is the path of the database file. Uploaded files are
+        stored in the directory <path>.files.
+
+        file://<path> is a directory, in which the database is stored in
+        artifacts.sqlite and uploaded files in files.
+
+        The batch query parameter sets how many artifacts are inserted at a
+        time, e.g. sqlite:///data/artifacts.sqlite?batch=1000.
+        """
+        result = urlparse(uri)
+        path = Path(result.netloc + result.path)
+        if result.scheme == "file":
+            path.mkdir(parents=True, exist_ok=True)
+            self.path = path / "artifacts.sqlite"
+            self.files_dir = path / "files"
+        else:
+            if path.parent != Path(""):
+                path.parent.mkdir(parents=True, exist_ok=True)
+            self.path = path
+            self.files_dir = Path(f"{path}.files")
+        self.files_dir.mkdir(exist_ok=True)
+
+        query = parse_qs(result.query)
+        self.batch_size = int(query.get("batch", ["100"])[0])
+
+        self._pending: List[
+            Tuple[str, Optional[str], Optional[str], Optional[str], str]
+        ] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+        atexit.register(self.flush)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection to the database. The connection is made the first
+        time it's used in each process, since connections can't be shared
+        with forked processes (e.g., by the gem5 running celery server)."""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(str(self.path), timeout=60)
+            self._conn.create_function("REGEXP", 2, _regexp)
+            with self._conn:
+                self._conn.executescript(self._schema)
+            self._pid = os.getpid()
+        return self._conn
+
+    def flush(self) -> None:
+        """Insert the pending artifacts into the database"""
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO artifacts (id, hash, name, type, document) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def close(self) -> None:
+        """Insert the pending artifacts and close the database"""
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def put(self, key: UUID, artifact: Dict[str, Union[str, UUID]]) -> None:
+        """Insert the artifact into the database with the key"""
+        assert artifact["_id"] == key
+        self._pending.append(
+            (
+                str(key),
+                artifact.get("hash"),  # type: ignore
+                artifact.get("name"),  # type: ignore
+                artifact.get("type"),  # type: ignore
+                json.dumps(artifact, cls=_DocumentEncoder),
+            )
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def upload(self, key: UUID, path: Path) -> None:
+        """Upload the file at path to the database with _id of key"""
+        # Copy the file into the files directory first, hashing it on the
+        # way, so that it is only read once.
+        sha = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.files_dir)
+        try:
+            with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    sha.update(chunk)
+                    dst.write(chunk)
+            digest = sha.hexdigest()
+            blob = self._blobPath(digest)
+            if blob.exists():
+                os.unlink(tmp)
+            else:
+                blob.parent.mkdir(exist_ok=True)
+                os.replace(tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO files (id, filename, digest) VALUES (?, ?, ?)",
+                (str(key), str(path), digest),
+            )
+
+    def _blobPath(self, digest: str) -> Path:
+        return self.files_dir / digest[:2] / digest
+
+    def _select(
+        self, where: str, args: Tuple[Any, ...], limit: int = 0
+    ) -> Iterable[Dict[str, Any]]:
+        self.flush()
+        cursor = self.conn.execute(
+            f"SELECT document FROM artifacts WHERE {where} "
+            "ORDER BY rowid LIMIT ?",
+            args + (limit if limit > 0 else -1,),
+        )
+        for (document,) in cursor:
+            yield json.loads(document, object_hook=_decodeDocumentObject)
+
+    def __contains__(self, key: Union[UUID, str]) -> bool:
+        """Key can be a UUID or a string. Returns true if item in DB"""
+        self.flush()
+        if isinstance(key, UUID):
+            query = "SELECT 1 FROM artifacts WHERE id = ? LIMIT 1"
+            key = str(key)
+        else:
+            # This is a hash.
+            query = "SELECT 1 FROM artifacts WHERE hash = ? LIMIT 1"
+        return self.conn.execute(query, (key,)).fetchone() is not None
+
+    def get(self, key: Union[UUID, str]) -> Dict[str, str]:
+        """Key can be a UUID or a string. Returns a dictionary to construct
+        an artifact.
+        """
+        if isinstance(key, UUID):
+            data = self._select("id = ?", (str(key),), limit=1)
+        else:
+            # This is a hash.
+            data = self._select("hash = ?", (key,), limit=1)
+        return next(iter(data), None)  # type: ignore
+
+    def downloadFile(self, key: UUID, path: Path) -> None:
+        """Download the file with the _id key to the path. Will overwrite the
+        file if it currently exists."""
+        row = self.conn.execute(
+            "SELECT digest FROM files WHERE id = ?", (str(key),)
+        ).fetchone()
+        if row is None:
+            raise Exception(f"Cannot find file for {key}")
+        shutil.copyfile(self._blobPath(row[0]), path)
+
+    def searchByName(self, name: str, limit: int) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some name."""
+        return self._select("name = ?", (name,), limit)
+
+    def searchByType(self, typ: str, limit: int) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some type."""
+        return self._select("type = ?", (typ,), limit)
+
+    def searchByNameType(
+        self, name: str, typ: str, limit: int
+    ) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some name and type."""
+        return self._select("type = ? AND name = ?", (typ, name), limit)
+
+    def searchByLikeNameType(
+        self, name: str, typ: str, limit: int
+    ) -> Iterable[Dict[str, Any]]:
+        """Returns an iterable of all artifacts in the database that match
+        some type and a regex name."""
+        return self._select("type = ? AND name REGEXP ?", (typ, name), limit)
+
+
 _db = None
 
 _default_uri = "mongodb://localhost:27017"
 
-_db_schemes: Dict[str, Type[ArtifactDB]] = {"mongodb": ArtifactMongoDB}
+_db_schemes: Dict[str, Type[ArtifactDB]] = {
+    "mongodb": ArtifactMongoDB,
+    "sqlite": ArtifactSQLiteDB,
+    "file": ArtifactSQLiteDB,
+}
 
 
 def _getDBType(uri: str) -> Type[ArtifactDB]:
@@ -220,6 +479,8 @@ def _getDBType(uri: str) -> Type[ArtifactDB]:
     Supported types:
         **ArtifactMongoDB**: mongodb://...
             See http://dochub.mongodb.org/core/connections for details.
+        **ArtifactSQLiteDB**: sqlite://... or file://...
+            See ArtifactSQLiteDB.__init__ for details.
     """
     result = urlparse(uri)
     if result.scheme in _db_schemes:
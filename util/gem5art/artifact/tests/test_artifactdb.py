@@ -0,0 +1,132 @@
+# Copyright (c) 2021 The Regents of the University of California
+# All Rights Reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tests for the SQLite ArtifactDB"""
+
+from pathlib import Path
+import tempfile
+import unittest
+from uuid import uuid4
+
+from gem5art.artifact._artifactdb import ArtifactSQLiteDB, _getDBType
+
+
+def _artifact(name, typ="test-type", inputs=None):
+    key = uuid4()
+    return {
+        "_id": key,
+        "name": name,
+        "type": typ,
+        "hash": key.hex,
+        "path": Path("/"),
+        "inputs": inputs if inputs is not None else [],
+        "git": {},
+    }
+
+
+class TestSQLiteDB(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = ArtifactSQLiteDB(f"file://{self.dir.name}?batch=2")
+
+    def tearDown(self):
+        self.db.close()
+        self.dir.cleanup()
+
+    def test_schemes(self):
+        self.assertIs(_getDBType("sqlite:///tmp/a.sqlite"), ArtifactSQLiteDB)
+        self.assertIs(_getDBType("file:///tmp/a"), ArtifactSQLiteDB)
+
+    def test_put_get(self):
+        parent = _artifact("parent")
+        child = _artifact("child", inputs=[parent["_id"]])
+        self.db.put(parent["_id"], parent)
+        self.db.put(child["_id"], child)
+
+        self.assertIn(child["_id"], self.db)
+        self.assertIn(child["hash"], self.db)
+        self.assertNotIn(uuid4(), self.db)
+
+        data = self.db.get(child["hash"])
+        self.assertEqual(data["_id"], child["_id"])
+        self.assertEqual(data["inputs"], [parent["_id"]])
+        self.assertEqual(data["path"], "/")
+        self.assertIsNone(self.db.get(uuid4()))
+
+    def test_batch(self):
+        a = _artifact("a")
+        self.db.put(a["_id"], a)
+        # Pending artifacts are visible to this process only after a flush,
+        # which happens before any read.
+        other = ArtifactSQLiteDB(f"file://{self.dir.name}")
+        self.assertNotIn(a["_id"], other)
+        b = _artifact("b")
+        self.db.put(b["_id"], b)
+        self.assertIn(a["_id"], other)
+        self.assertIn(b["_id"], other)
+        other.close()
+
+    def test_search(self):
+        for name, typ in [("a1", "x"), ("a2", "x"), ("a1", "y"), ("b", "x")]:
+            artifact = _artifact(name, typ)
+            self.db.put(artifact["_id"], artifact)
+
+        names = lambda data: sorted(d["name"] for d in data)
+        self.assertEqual(
+            names(self.db.searchByName("a1", limit=0)), ["a1", "a1"]
+        )
+        self.assertEqual(
+            names(self.db.searchByType("x", limit=0)), ["a1", "a2", "b"]
+        )
+        self.assertEqual(len(list(self.db.searchByType("x", limit=2))), 2)
+        self.assertEqual(
+            names(self.db.searchByNameType("a1", "y", limit=0)), ["a1"]
+        )
+        self.assertEqual(
+            names(self.db.searchByLikeNameType("^a", "x", limit=0)),
+            ["a1", "a2"],
+        )
+
+    def test_files(self):
+        src = Path(self.dir.name) / "src"
+        src.write_bytes(b"contents")
+        keys = [uuid4(), uuid4()]
+        for key in keys:
+            self.db.upload(key, src)
+
+        # Identical files are only stored once.
+        blobs = [p for p in self.db.files_dir.glob("*/*") if p.is_file()]
+        self.assertEqual(len(blobs), 1)
+
+        dst = Path(self.dir.name) / "dst"
+        self.db.downloadFile(keys[1], dst)
+        self.assertEqual(dst.read_bytes(), b"contents")
+        with self.assertRaises(Exception):
+            self.db.downloadFile(uuid4(), dst)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# This script times the code generators built on PLY grammars: the ISA
+# parser for each ISA description and SLICC for each protocol. For every
+# one it reports how long building the lexer and parser tables takes
+# without the table cache, with an empty cache and with a warm cache, and
+# how long parsing and generating code take.
+#
+#   grammar_bench.py
+#   grammar_bench.py --isa arm --isa x86 --protocol MI_example
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+gem5_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [ os.path.join(gem5_root, 'src', 'arch'),
+                  os.path.join(gem5_root, 'src', 'mem'),
+                  os.path.join(gem5_root, 'src', 'python'),
+                  os.path.join(gem5_root, 'ext', 'ply') ]
+
+import m5.util.grammar
+
+def timeTables(make_grammar, table_dir):
+    m5.util.grammar.setTableDir(table_dir)
+    grammar = make_grammar()
+    start = time.perf_counter()
+    grammar.lex
+    grammar.yacc
+    return time.perf_counter() - start
+
+def benchIsa(isa, table_dir, output_dir):
+    import isa_parser
+
+    desc = os.path.join(gem5_root, 'src', 'arch', isa, 'isa', 'main.isa')
+    # Some ISA descriptions import Python modules that live next to them.
+    sys.path.insert(0, os.path.dirname(desc))
+    try:
+        make_parser = lambda: isa_parser.ISAParser(output_dir)
+        tables = [ timeTables(make_parser, d)
+                   for d in (None, table_dir, table_dir) ]
+
+        # The ISA parser generates code as it parses, so the two can't be
+        # timed separately.
+        parser = make_parser()
+        parser.lex
+        parser.yacc
+        start = time.perf_counter()
+        parser.parse_isa_desc(desc)
+        parse = time.perf_counter() - start
+    finally:
+        sys.path.remove(os.path.dirname(desc))
+    return tables, parse, None
+
+def benchProtocol(protocol, table_dir, output_dir):
+    from slicc.parser import SLICC
+
+    base_dir = os.path.join(gem5_root, 'src', 'mem', 'ruby', 'protocol')
+    slicc_file = os.path.join(base_dir, protocol + '.slicc')
+
+    # SLICC parses the protocol as soon as it's constructed, so time the
+    # tables with an instance that hasn't been initialized.
+    make_grammar = lambda: SLICC.__new__(SLICC)
+    tables = [ timeTables(make_grammar, d)
+               for d in (None, table_dir, table_dir) ]
+
+    start = time.perf_counter()
+    slicc = SLICC(slicc_file, base_dir)
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    slicc.process()
+    slicc.writeCodeFiles(output_dir, [])
+    codegen = time.perf_counter() - start
+    return tables, parse, codegen
+
+def main():
+    isas = sorted(os.path.basename(os.path.dirname(os.path.dirname(p)))
+        for p in glob.glob(os.path.join(gem5_root, 'src', 'arch', '*',
+                                        'isa', 'main.isa')))
+    protocols = sorted(os.path.basename(p)[:-len('.slicc')]
+        for p in glob.glob(os.path.join(gem5_root, 'src', 'mem', 'ruby',
+                                        'protocol', '*.slicc')))
+    # This file only declares interfaces shared by the protocols.
+    protocols.remove('RubySlicc_interfaces')
+
+    parser = argparse.ArgumentParser(
+        description="Time table generation, parsing and code generation "
+        "for the ISA parser and SLICC")
+    parser.add_argument("--isa", action="append", choices=isas,
+                        help="ISA description to process, may be repeated "
+                        "[Default: all]")
+    parser.add_argument("--protocol", action="append", choices=protocols,
+                        help="SLICC protocol to process, may be repeated "
+                        "[Default: all]")
+    parser.add_argument("--no-isa", action="store_true",
+                        help="Don't process any ISA descriptions")
+    parser.add_argument("--no-protocol", action="store_true",
+                        help="Don't process any SLICC protocols")
+    args = parser.parse_args()
+
+    jobs = []
+    if not args.no_isa:
+        jobs += [ ('isa', isa, benchIsa) for isa in args.isa or isas ]
+    if not args.no_protocol:
+        jobs += [ ('slicc', protocol, benchProtocol)
+                  for protocol in args.protocol or protocols ]
+
+    print("%-6s %-22s %10s %10s %10s %10s %10s" %
+          ("kind", "name", "uncached", "cold", "warm", "parse", "codegen"))
+    for kind, name, bench in jobs:
+        table_dir = tempfile.mkdtemp(prefix='ply-tables-')
+        output_dir = tempfile.mkdtemp(prefix='grammar-bench-')
+        # Without the table cache PLY writes its tables to the current
+        # directory, so keep them out of the way.
+        cwd = os.getcwd()
+        os.chdir(output_dir)
+        try:
+            tables, parse, codegen = bench(name, table_dir, output_dir)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(table_dir)
+            shutil.rmtree(output_dir)
+
+        times = [ "%10.3f" % t for t in tables ]
+        times.append("%10.3f" % parse)
+        times.append("%10.3f" % codegen if codegen is not None
+                     else "%10s" % "-")
+        print("%-6s %-22s %s" % (kind, name, " ".join(times)))
+
+if __name__ == "__main__":
+    main()
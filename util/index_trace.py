@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# This script builds the index used by the decode_*_trace.py scripts to
+# decode protobuf traces in parallel. The index records the offset of
+# every N-th message and is stored next to the trace as <trace>.idx.
+#
+# Uncompressed traces are indexed in place:
+#   index_trace.py trace.pb
+#
+# gzip'd traces cannot be split, so they are first rewritten as a
+# block-compressed trace, a sequence of independent gzip members that is
+# still readable as a normal gzip file:
+#   index_trace.py trace.pb.gz --block-compress trace.blk.gz
+
+import argparse
+import sys
+
+import protolib
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index a protobuf trace for parallel decoding")
+    parser.add_argument("trace", help="The trace to index")
+    parser.add_argument("--every", type=int, default=1 << 16,
+                        help="Number of messages per chunk "
+                        "[Default: %(default)s]")
+    parser.add_argument("--block-compress", metavar="OUTPUT",
+                        help="Write a block-compressed copy of the trace to "
+                        "OUTPUT and index it instead")
+    args = parser.parse_args()
+
+    if args.every < 1:
+        parser.error("--every must be at least 1")
+
+    try:
+        if args.block_compress:
+            index = protolib.writeBlockCompressed(args.trace,
+                                                  args.block_compress,
+                                                  args.every)
+            indexed = args.block_compress
+        else:
+            index = protolib.indexTrace(args.trace, args.every)
+            indexed = args.trace
+    except IOError as e:
+        print(e)
+        sys.exit(1)
+
+    print("Indexed %d messages in %d chunks: %s%s" %
+          (index.num_messages, len(index.offsets), indexed,
+           protolib.TraceIndex.SUFFIX))
+
+if __name__ == "__main__":
+    main()
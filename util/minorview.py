@@ -65,6 +65,9 @@ if __name__ == '__main__':
         help='time of first event to load from file')
     parser.add_argument('--end-time', metavar='time', type=int, default=None,
         help='time of last event to load from file')
+    parser.add_argument('--index', action='store_true', default=False,
+        help='index the event file (into <event-file>.mvidx) and load '
+            + 'events from it as they are viewed')
     parser.add_argument('--mini-views', action='store_true', default=False,
         help='show tiny views of the next 10 time steps')
     parser.add_argument('eventFile', metavar='event-file', default='ev')
@@ -96,8 +99,13 @@ if __name__ == '__main__':
     if args.eventFile and os.access(args.eventFile, os.O_RDONLY):
         controller.startTime = args.start_time
         controller.endTime = args.end_time
-        model.load_events(args.eventFile, startTime=args.start_time,
-            endTime=args.end_time)
+        controller.useIndex = args.index
+        if args.index:
+            model.load_indexed_events(args.eventFile,
+                startTime=args.start_time, endTime=args.end_time)
+        else:
+            model.load_events(args.eventFile, startTime=args.start_time,
+                endTime=args.end_time)
         controller.set_time_index(0)
     else:
         parser.error('Can\'t read event file: ' + args.eventFile)
@@ -39,8 +39,13 @@ from .colours import unknownColour
 from .point import Point
 import re
 from . import blobs
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import heapq
 from time import time as wall_time
 import os
+import struct
 
 id_parts = "TSPLFE"
 
@@ -535,6 +540,207 @@ class BlobEvent(object):
             list(map(find_inst, blocks))
         return sorted(ret)
 
+class EventIndex(object):
+    """Compact, time-ordered index of a MinorTrace event file.  The index
+    holds, for each unit, the times and file offsets of the unique
+    MinorTrace events (and of the events made to carry comments) and the
+    offsets of each event's comments, along with the offsets of the
+    MinorInst and MinorLine definitions keyed by their sequence numbers.
+    Events can then be decoded from the event file on demand"""
+
+    magic = b'minorview-index\x01'
+
+    # Arrays, in file order, of each unit's index entry
+    unitArrays = ('times', 'offsets', 'commentEvents', 'commentOffsets')
+
+    def __init__(self):
+        self.sourceSize = 0
+        self.sourceMtime = 0
+        # Per unit (as named in the event file) dict of unitArrays name to
+        #   array
+        self.units = {}
+        # MinorInst definitions sorted by (fetchSeqNum, execSeqNum)
+        self.instFetchSeqNums = array('q')
+        self.instExecSeqNums = array('q')
+        self.instOffsets = array('q')
+        # MinorLine definitions sorted by lineSeqNum
+        self.lineSeqNums = array('q')
+        self.lineOffsets = array('q')
+
+    @staticmethod
+    def index_filename(file):
+        """Name of the index sidecar for an event file"""
+        return file + '.mvidx'
+
+    def add_unit(self, unit):
+        entry = dict((name, array('q')) for name in self.unitArrays)
+        self.units[unit] = entry
+        return entry
+
+    def build(self, file):
+        """Index the given event file in a single pass"""
+        self.__init__()
+        stat = os.stat(file)
+        self.sourceSize = stat.st_size
+        self.sourceMtime = stat.st_mtime_ns
+
+        match_line_re = re.compile(
+            br'^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
+
+        time = -1
+        last_time_lines = {}
+        comments = []
+        insts = []
+        lines = []
+
+        def add_event(entry, time, offset):
+            entry['times'].append(time)
+            entry['offsets'].append(offset)
+
+        def update_comments(comments, time):
+            # Attach comments to the unit's event at this time, or make a
+            #   new event there with the same MinorTrace data as the last
+            #   one (as BlobModel.load_events does)
+            for unit, offset in comments:
+                entry = self.units.get(unit)
+                if entry is None:
+                    entry = self.add_unit(unit)
+                times = entry['times']
+                if len(times) == 0 or times[-1] != time:
+                    offsets = entry['offsets']
+                    add_event(entry, time,
+                        offsets[-1] if len(offsets) != 0 else -1)
+                entry['commentEvents'].append(len(times) - 1)
+                entry['commentOffsets'].append(offset)
+
+        f = open(file, 'rb')
+        offset = 0
+        for l in f:
+            match = match_line_re.match(l)
+            if match is not None:
+                event_time, unit, line_type, rest = match.groups()
+                event_time = int(event_time)
+                unit = unit.decode()
+
+                if event_time != time:
+                    update_comments(comments, time)
+                    comments = []
+                    time = event_time
+
+                if line_type is None:
+                    comments.append((unit, offset))
+                elif line_type == b'MinorTrace:':
+                    if last_time_lines.get(unit, None) != rest:
+                        entry = self.units.get(unit)
+                        if entry is None:
+                            entry = self.add_unit(unit)
+                        add_event(entry, event_time, offset)
+                        last_time_lines[unit] = rest
+                elif line_type in (b'MinorInst:', b'MinorLine:'):
+                    pairs = parse.parse_pairs(rest.decode())
+                    if 'id' in pairs:
+                        id = Id().from_string(pairs['id'])
+                        if line_type == b'MinorInst:':
+                            insts.append((id.fetchSeqNum, id.execSeqNum,
+                                offset))
+                        else:
+                            lines.append((id.lineSeqNum, offset))
+            offset += len(l)
+        update_comments(comments, time)
+        f.close()
+
+        # Sorting is stable so later definitions of the same id stay last
+        insts.sort(key=lambda inst: (inst[0], inst[1]))
+        for fetchSeqNum, execSeqNum, offset in insts:
+            self.instFetchSeqNums.append(fetchSeqNum)
+            self.instExecSeqNums.append(execSeqNum)
+            self.instOffsets.append(offset)
+        lines.sort(key=lambda line: line[0])
+        for lineSeqNum, offset in lines:
+            self.lineSeqNums.append(lineSeqNum)
+            self.lineOffsets.append(offset)
+
+        return self
+
+    def is_current(self, file):
+        """Does this index describe the current contents of file"""
+        stat = os.stat(file)
+        return (stat.st_size == self.sourceSize and
+            stat.st_mtime_ns == self.sourceMtime)
+
+    def save(self, indexFile):
+        """Write the index to a file"""
+        def write_array(f, a):
+            f.write(struct.pack('<q', len(a)))
+            a.tofile(f)
+
+        f = open(indexFile, 'wb')
+        f.write(self.magic)
+        f.write(struct.pack('<qqq', self.sourceSize, self.sourceMtime,
+            len(self.units)))
+        for unit, entry in self.units.items():
+            name = unit.encode()
+            f.write(struct.pack('<q', len(name)))
+            f.write(name)
+            for name in self.unitArrays:
+                write_array(f, entry[name])
+        for a in (self.instFetchSeqNums, self.instExecSeqNums,
+            self.instOffsets, self.lineSeqNums, self.lineOffsets):
+            write_array(f, a)
+        f.close()
+
+    def load(self, indexFile):
+        """Read an index written by save"""
+        def read_int(f):
+            return struct.unpack('<q', f.read(8))[0]
+
+        def read_array(f):
+            a = array('q')
+            a.fromfile(f, read_int(f))
+            return a
+
+        self.__init__()
+        f = open(indexFile, 'rb')
+        if f.read(len(self.magic)) != self.magic:
+            f.close()
+            raise ValueError('Not a minorview index file: ' + indexFile)
+        self.sourceSize = read_int(f)
+        self.sourceMtime = read_int(f)
+        for i in range(read_int(f)):
+            unit = f.read(read_int(f)).decode()
+            entry = self.add_unit(unit)
+            for name in self.unitArrays:
+                entry[name] = read_array(f)
+        self.instFetchSeqNums = read_array(f)
+        self.instExecSeqNums = read_array(f)
+        self.instOffsets = read_array(f)
+        self.lineSeqNums = read_array(f)
+        self.lineOffsets = read_array(f)
+        f.close()
+        return self
+
+    def find_inst_offset(self, fetchSeqNum, execSeqNum):
+        """Find the file offset of an instruction definition, falling back
+        to its macroop (or first microop) as BlobModel.find_inst does"""
+        fetches = self.instFetchSeqNums
+        lower = bisect_left(fetches, fetchSeqNum)
+        upper = bisect_right(fetches, fetchSeqNum)
+        if lower == upper:
+            return None
+        execs = self.instExecSeqNums[lower:upper]
+        for wanted in (execSeqNum, 0):
+            index = bisect_right(execs, wanted) - 1
+            if index >= 0 and execs[index] == wanted:
+                return self.instOffsets[lower + index]
+        return self.instOffsets[lower]
+
+    def find_line_offset(self, lineSeqNum):
+        """Find the file offset of a line definition"""
+        index = bisect_right(self.lineSeqNums, lineSeqNum) - 1
+        if index >= 0 and self.lineSeqNums[index] == lineSeqNum:
+            return self.lineOffsets[index]
+        return None
+
 class BlobModel(object):
     """Model bringing together blob definitions and parsed events"""
     def __init__(self, unitNamePrefix=''):
@@ -546,6 +752,12 @@ class BlobModel(object):
         self.lastTime = 0
         self.unitNamePrefix = unitNamePrefix
 
+    match_line_re = re.compile(
+        '^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
+
+    # Number of events decoded from an indexed event file to keep
+    eventCacheSize = 4096
+
     def clear_events(self):
         """Drop all events and times"""
         self.lastTime = 0
@@ -554,6 +766,12 @@ class BlobModel(object):
         self.lines = {}
         self.numEvents = 0
 
+        # State for events loaded by load_indexed_events
+        self.index = None
+        self.indexUnits = {}
+        self.eventFile = None
+        self.eventCache = OrderedDict()
+
         for unit, events in self.unitEvents.items():
             self.unitEvents[unit] = []
 
@@ -586,8 +804,14 @@ class BlobModel(object):
             return self.insts[full_key]
         elif macroop_key in self.insts:
             return self.insts[macroop_key]
-        else:
-            return None
+        elif self.index is not None:
+            offset = self.index.find_inst_offset(id.fetchSeqNum,
+                id.execSeqNum)
+            if offset is not None:
+                self.add_minor_inst(self.read_event_line(offset)[3])
+                return self.insts.get(full_key,
+                    self.insts.get(macroop_key, None))
+        return None
 
     def add_line(self, line):
         """Add a MinorLine line to the model"""
@@ -617,13 +841,17 @@ class BlobModel(object):
     def find_line(self, id):
         """Find a line by id"""
         key = id.lineSeqNum
+        if key not in self.lines and self.index is not None:
+            offset = self.index.find_line_offset(key)
+            if offset is not None:
+                self.add_minor_line(self.read_event_line(offset)[3])
         return self.lines.get(key, None)
 
     def find_event_bisection(self, unit, time, events,
         lower_index, upper_index):
         """Find an event by binary search on time indices"""
         while lower_index <= upper_index:
-            pivot = (upper_index + lower_index) / 2
+            pivot = (upper_index + lower_index) // 2
             pivotEvent = events[pivot]
             event_equal = (pivotEvent.time == time or
                 (pivotEvent.time < time and
@@ -648,7 +876,9 @@ class BlobModel(object):
 
     def find_unit_event_by_time(self, unit, time):
         """Find the last event for the given unit at time <= time"""
-        if unit in self.unitEvents:
+        if self.index is not None:
+            return self.find_indexed_event_by_time(unit, time)
+        elif unit in self.unitEvents:
             events = self.unitEvents[unit]
             ret = self.find_event_bisection(unit, time, events,
                 0, len(events)-1)
@@ -660,11 +890,121 @@ class BlobModel(object):
     def find_time_index(self, time):
         """Find a time index close to the given time (where
         times[return] <= time and times[return+1] > time"""
-        ret = 0
-        lastIndex = len(self.times) - 1
-        while ret < lastIndex and self.times[ret + 1] <= time:
-            ret += 1
-        return ret
+        return max(0, bisect_right(self.times, time) - 1)
+
+    def read_event_line(self, offset):
+        """Read the event file line at the given offset of an indexed event
+        file and return its (time, unit, line_type, rest)"""
+        self.eventFile.seek(offset)
+        l = self.eventFile.readline().decode()
+        time, unit, line_type, rest = self.match_line_re.match(l).groups()
+        return int(time), unit, line_type, rest
+
+    def decode_indexed_event(self, unit, entry, index):
+        """Make the BlobEvent for the index'th event of a unit of an
+        indexed event file"""
+        event = BlobEvent(unit, entry['times'][index], {})
+        offset = entry['offsets'][index]
+        if offset != -1:
+            event.pairs = parse.parse_pairs(self.read_event_line(offset)[3])
+
+            # Try to decode the colour data for this event
+            blobs = self.unitNameToBlobs.get(unit, [])
+            for blob in blobs:
+                if blob.visualDecoder is not None:
+                    event.visuals[blob.picChar] = (
+                        blob.visualDecoder(event.pairs))
+
+        commentEvents = entry['commentEvents']
+        for comment in range(bisect_left(commentEvents, index),
+            bisect_right(commentEvents, index)):
+            event.comments.append(self.read_event_line(
+                entry['commentOffsets'][comment])[3])
+        return event
+
+    def find_indexed_event_by_time(self, unit, time):
+        """Find the last event for the given unit at time <= time in an
+        indexed event file, decoding it if it's not already cached"""
+        entry = self.indexUnits.get(unit)
+        if entry is None:
+            return None
+        index = bisect_right(entry['times'], time) - 1
+        if index < 0:
+            return None
+
+        key = (unit, index)
+        event = self.eventCache.get(key)
+        if event is None:
+            event = self.decode_indexed_event(unit, entry, index)
+            self.eventCache[key] = event
+            if len(self.eventCache) > self.eventCacheSize:
+                self.eventCache.popitem(last=False)
+        else:
+            self.eventCache.move_to_end(key)
+        return event
+
+    def load_indexed_events(self, file, startTime=0, endTime=None):
+        """Load an event file through its index (see EventIndex), making
+        the index first if it doesn't exist or is out of date.  Only the
+        index is read up front, events are decoded as they are viewed"""
+        self.clear_events()
+
+        if not os.access(file, os.R_OK):
+            print('Can\'t open file', file)
+            exit(1)
+
+        start_wall_time = wall_time()
+
+        indexFile = EventIndex.index_filename(file)
+        index = None
+        if os.access(indexFile, os.R_OK):
+            try:
+                index = EventIndex().load(indexFile)
+            except (ValueError, EOFError, struct.error):
+                index = None
+            if index is not None and not index.is_current(file):
+                index = None
+
+        if index is None:
+            print('Indexing file', file)
+            index = EventIndex().build(file)
+            try:
+                index.save(indexFile)
+            except IOError:
+                print('Can\'t write index file', indexFile)
+        else:
+            print('Opening file', file, 'with index', indexFile)
+
+        self.index = index
+        self.eventFile = open(file, 'rb')
+        # Each unit's times are sorted, so only the part of each in the
+        #   window needs merging
+        windows = []
+        for unit, entry in index.units.items():
+            unit = re.sub('^' + self.unitNamePrefix + '\.?(.*)$',
+                '\\1', unit)
+            unitTimes = entry['times']
+            self.numEvents += len(unitTimes)
+            if unit in self.unitEvents:
+                self.indexUnits[unit] = entry
+                lower = bisect_left(unitTimes, startTime)
+                if endTime is None:
+                    upper = len(unitTimes)
+                else:
+                    upper = bisect_right(unitTimes, endTime)
+                windows.append(unitTimes[lower:upper])
+
+        self.times = []
+        for time in heapq.merge(*windows):
+            if len(self.times) == 0 or self.times[-1] != time:
+                self.times.append(time)
+        if len(self.times) != 0:
+            self.lastTime = self.times[-1]
+
+        end_wall_time = wall_time()
+
+        print('Unique events:', self.numEvents)
+        print('Time to load:', end_wall_time - start_wall_time)
 
     def add_minor_inst(self, rest):
         """Parse and add a MinorInst line to the model"""
@@ -775,8 +1115,7 @@ class BlobModel(object):
             else:
                 l = f.readline()
 
-        match_line_re = re.compile(
-            '^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
+        match_line_re = self.match_line_re
 
         # Parse each line of the events file, accumulating comments to be
         #   attached to MinorTrace events when the time changes
@@ -195,6 +195,7 @@ class BlobController(object):
         self.defaultEventFile = defaultEventFile
         self.startTime = None
         self.endTime = None
+        self.useIndex = False
 
         self.otherViews = []
 
@@ -332,7 +333,11 @@ class BlobController(object):
 
     def load_events(self, button):
         """Reload events file"""
-        self.model.load_events(self.filenameEntry.get_text(),
+        if self.useIndex:
+            load = self.model.load_indexed_events
+        else:
+            load = self.model.load_events
+        load(self.filenameEntry.get_text(),
             startTime=self.startTime, endTime=self.endTime)
         self.set_time_index(min(len(self.model.times) - 1,
             self.view.timeIndex))
@@ -37,72 +37,213 @@
 
 # Pipeline activity viewer for the O3 CPU model.
 
+import heapq
+import mmap
 import optparse
 import os
+import struct
 import sys
-import copy
 
-# Temporary storage for instructions. The queue is filled in out-of-order
-# until it reaches 'max_threshold' number of instructions. It is then
-# sorted out and instructions are printed out until their number drops to
-# 'min_threshold'.
+# Instructions are written to the trace when they are destroyed, which is
+# not necessarily in sequence number order. They are sorted out through a
+# heap keyed by sequence number that holds up to 'window' instructions:
+# once it is full, the instruction with the lowest sequence number is
+# printed for every new instruction read.
 # It is assumed that the instructions are not out of order for more then
-# 'min_threshold' places - otherwise they will appear out of order.
-insts = {
-    'queue': [] ,         # Instructions to print.
-    'max_threshold':2000, # Instructions are sorted out and printed when
-                          # their number reaches this threshold.
-    'min_threshold':1000, # Printing stops when this number is reached.
-    'sn_start':0,         # The first instruction seq. number to be printed.
-    'sn_stop':0,          # The last instruction seq. number to be printed.
-    'tick_start':0,       # The first tick to be printed
-    'tick_stop':0,        # The last tick to be printed
-    'tick_drift':2000,    # Used to calculate the start and the end of main
-                          # loop. We assume here that the instructions are not
-                          # out of order for more then 2000 CPU ticks,
-                          # otherwise the print may not start/stop
-                          # at the time specified by tick_start/stop.
-    'only_committed':0,   # Set if only committed instructions are printed.
-}
+# 'window' places - otherwise they will appear out of order.
+window = 2000
+
+# Used to calculate the end of the trace to be read when stopping at a
+# tick. We assume here that the instructions are not out of order for more
+# then 2000 CPU cycles, otherwise the print may stop earlier than the time
+# specified by tick_stop.
+tick_drift = 2000
+
+# Pipeline stages, in the order in which they appear in the trace.
+stage_names = ['fetch', 'decode', 'rename', 'dispatch', 'issue', 'complete',
+               'retire', 'store']
+
+def parse_trace(trace):
+    """Yields the instructions of a text O3PipeView trace, in the order in
+    which they appear in the trace, as dicts with the tick of every stage
+    (0 if the instruction didn't reach it) and their 'pc', 'upc', 'sn' and
+    'disasm'."""
+    inst = None
+    for line in trace:
+        if not line.startswith('O3PipeView:'):
+            continue
+        fields = line.rstrip('\n').split(':', 6)
+        stage = fields[1]
+        if stage == 'fetch':
+            inst = {
+                'fetch': int(fields[2]),
+                'pc': fields[3],
+                'upc': fields[4],
+                'sn': int(fields[5]),
+                'disasm': ' '.join(fields[6].split()),
+                'store': 0,
+            }
+        elif inst is None:
+            # The trace starts in the middle of an instruction
+            continue
+        elif stage == 'retire':
+            inst['retire'] = int(fields[2])
+            if len(fields) > 4 and fields[3] == 'store':
+                inst['store'] = int(fields[4])
+            yield inst
+            inst = None
+        else:
+            inst[stage] = int(fields[2])
+
+def sort_by_sn(insts, window):
+    """Sorts a stream of instructions by sequence number, assuming they are
+    no more than 'window' places out of order."""
+    heap = []
+    for inst in insts:
+        if len(heap) < window:
+            heapq.heappush(heap, (inst['sn'], inst['fetch'], id(inst), inst))
+        else:
+            yield heapq.heappushpop(heap,
+                (inst['sn'], inst['fetch'], id(inst), inst))[3]
+    while heap:
+        yield heapq.heappop(heap)[3]
+
+def select_insts(insts, cycle_time, committed_only, start_tick, stop_tick,
+                 start_sn, stop_sn):
+    """Filters a stream of instructions sorted by sequence number down to
+    the region of interest. Reading stops once the stream is past the end of
+    that region."""
+    for inst in insts:
+        if ((stop_tick > 0 and
+             inst['fetch'] > stop_tick + tick_drift * cycle_time) or
+            (stop_sn > 0 and inst['sn'] > stop_sn + window)):
+            return
+        # As the instructions are read out of order, filter out those that
+        # reside out of the specified boundaries.
+        if start_sn > 0 and inst['sn'] < start_sn:
+            continue # earlier then the starting sequence number
+        if stop_sn > 0 and inst['sn'] > stop_sn:
+            continue # later then the ending sequence number
+        if start_tick > 0 and inst['fetch'] < start_tick:
+            continue # earlier then the starting tick number
+        if stop_tick > 0 and inst['fetch'] > stop_tick:
+            continue # later then the ending tick number
+        if committed_only and inst['retire'] == 0:
+            continue # retire is set to zero if it hasn't been completed
+        yield inst
+
+# Compact binary pipeline trace. The header is followed by one fixed-size
+# record per instruction, sorted by sequence number, and a table of the
+# distinct disassembly strings. Fetch happens in program order, so the
+# records are sorted by fetch tick as well, which lets a region of interest
+# be found by bisection on either key.
+binary_magic = b'gem5o3pv\x01'
+# Number of records, offset of the string table
+binary_header = struct.Struct('<QQ')
+# sn, pc, upc, disasm index, then the tick of every stage
+binary_record = struct.Struct('<QQII' + 'Q' * len(stage_names))
+binary_fetch_offset = struct.calcsize('<QQII')
+
+def write_binary(insts, out):
+    """Writes a stream of instructions sorted by sequence number to a
+    binary trace file."""
+    strings = {}
+    count = 0
+    out.write(binary_magic)
+    out.write(binary_header.pack(0, 0))
+    for inst in insts:
+        disasm = strings.setdefault(inst['disasm'], len(strings))
+        out.write(binary_record.pack(inst['sn'], int(inst['pc'], 16),
+            int(inst['upc']), disasm,
+            *[inst.get(stage, 0) for stage in stage_names]))
+        count += 1
+
+    table_offset = out.tell()
+    out.write(struct.pack('<Q', len(strings)))
+    for string in strings:
+        string = string.encode()
+        out.write(struct.pack('<I', len(string)))
+        out.write(string)
+    out.seek(len(binary_magic))
+    out.write(binary_header.pack(count, table_offset))
+
+class BinaryTrace(object):
+    """A binary trace file, memory mapped so that instructions are only
+    decoded when read."""
+    def __init__(self, trace):
+        self.mmap = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(binary_magic)] != binary_magic:
+            raise ValueError('not a binary O3PipeView trace')
+        self.base = len(binary_magic) + binary_header.size
+        self.count, table_offset = binary_header.unpack_from(self.mmap,
+            len(binary_magic))
+
+        self.strings = []
+        (num_strings,) = struct.unpack_from('<Q', self.mmap, table_offset)
+        offset = table_offset + 8
+        for i in range(num_strings):
+            (length,) = struct.unpack_from('<I', self.mmap, offset)
+            offset += 4
+            self.strings.append(self.mmap[offset:offset + length].decode())
+            offset += length
+
+    def __len__(self):
+        return self.count
+
+    def _field(self, index, field):
+        return struct.unpack_from('<Q', self.mmap,
+            self.base + index * binary_record.size + field)[0]
+
+    def _bisect(self, value, field):
+        lower, upper = 0, self.count
+        while lower < upper:
+            middle = (lower + upper) // 2
+            if self._field(middle, field) < value:
+                lower = middle + 1
+            else:
+                upper = middle
+        return lower
+
+    def find_sn(self, sn):
+        """Index of the first instruction with a sequence number >= sn"""
+        return self._bisect(sn, 0)
+
+    def find_tick(self, tick):
+        """Index of the first instruction fetched at or after tick"""
+        return self._bisect(tick, binary_fetch_offset)
+
+    def insts(self, start=0):
+        """Yields the instructions from the given index onwards"""
+        for index in range(start, self.count):
+            fields = binary_record.unpack_from(self.mmap,
+                self.base + index * binary_record.size)
+            inst = dict(zip(stage_names, fields[4:]))
+            inst['sn'] = fields[0]
+            inst['pc'] = '0x%08x' % fields[1]
+            inst['upc'] = str(fields[2])
+            inst['disasm'] = self.strings[fields[3]]
+            yield inst
+
+    def close(self):
+        self.mmap.close()
 
 def process_trace(trace, outfile, cycle_time, width, color, timestamps,
-                  committed_only, store_completions, start_tick, stop_tick, start_sn, stop_sn):
-    global insts
-
-    insts['sn_start'] = start_sn
-    insts['sn_stop'] = stop_sn
-    insts['tick_start'] = start_tick
-    insts['tick_stop'] = stop_tick
-    insts['tick_drift'] = insts['tick_drift'] * cycle_time
-    insts['only_committed'] = committed_only
-    line = None
-    fields = None
-
-    # Skip lines up to the starting tick
-    if start_tick != 0:
-        while True:
-            line = trace.readline()
-            if not line: return
-            fields = line.split(':')
-            if fields[0] != 'O3PipeView': continue
-            if int(fields[2]) >= start_tick: break
-    elif start_sn != 0:
-        while True:
-            line = trace.readline()
-            if not line: return
-            fields = line.split(':')
-            if fields[0] != 'O3PipeView': continue
-            if fields[1] == 'fetch' and int(fields[5]) >= start_sn: break
+                  committed_only, store_completions, start_tick, stop_tick,
+                  start_sn, stop_sn):
+    if isinstance(trace, BinaryTrace):
+        # The binary trace is already sorted, so jump straight to the
+        # region of interest
+        start = 0
+        if start_tick != 0:
+            start = trace.find_tick(start_tick)
+        elif start_sn != 0:
+            start = trace.find_sn(start_sn)
+        insts = trace.insts(start)
     else:
-        line = trace.readline()
-        if not line: return
-        fields = line.split(':')
+        insts = sort_by_sn(parse_trace(trace), window)
 
-    # Skip lines up to next instruction fetch
-    while fields[0] != 'O3PipeView' or fields[1] != 'fetch':
-        line = trace.readline()
-        if not line: return
-        fields = line.split(':')
+    insts = select_insts(insts, cycle_time, committed_only, start_tick,
+                         stop_tick, start_sn, stop_sn)
 
     # Print header
     outfile.write('// f = fetch, d = decode, n = rename, p = dispatch, '
@@ -121,72 +262,19 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
         outfile.write('timestamps'.center(25))
     outfile.write('\n')
 
-    # Region of interest
-    curr_inst = {}
-    while True:
-        if fields[0] == 'O3PipeView':
-            curr_inst[fields[1]] = int(fields[2])
-            if fields[1] == 'fetch':
-                if ((stop_tick > 0 and int(fields[2]) > stop_tick+insts['tick_drift']) or
-                    (stop_sn > 0 and int(fields[5]) > (stop_sn+insts['max_threshold']))):
-                    print_insts(outfile, cycle_time, width, color, timestamps, 0)
-                    return
-                (curr_inst['pc'], curr_inst['upc']) = fields[3:5]
-                curr_inst['sn'] = int(fields[5])
-                curr_inst['disasm'] = ' '.join(fields[6][:-1].split())
-            elif fields[1] == 'retire':
-                if curr_inst['retire'] == 0:
-                    curr_inst['disasm'] = '-----' + curr_inst['disasm']
-                if store_completions:
-                    curr_inst[fields[3]] = int(fields[4])
-                queue_inst(outfile, curr_inst, cycle_time, width, color, timestamps, store_completions)
-
-        line = trace.readline()
-        if not line:
-            print_insts(outfile, cycle_time, width, color, timestamps, store_completions, 0)
-            return
-        fields = line.split(':')
-
-
-#Sorts out instructions according to sequence number
-def compare_by_sn(a, b):
-    return cmp(a['sn'], b['sn'])
-
-# Puts new instruction into the print queue.
-# Sorts out and prints instructions when their number reaches threshold value
-def queue_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
-    global insts
-    l_copy = copy.deepcopy(inst)
-    insts['queue'].append(l_copy)
-    if len(insts['queue']) > insts['max_threshold']:
-        print_insts(outfile, cycle_time, width, color, timestamps, store_completions, insts['min_threshold'])
-
-# Sorts out and prints instructions in print queue
-def print_insts(outfile, cycle_time, width, color, timestamps, store_completions, lower_threshold):
-    global insts
-    insts['queue'].sort(compare_by_sn)
-    while len(insts['queue']) > lower_threshold:
-        print_item=insts['queue'].pop(0)
-        # As the instructions are processed out of order the main loop starts
-        # earlier then specified by start_sn/tick and finishes later then what
-        # is defined in stop_sn/tick.
-        # Therefore, here we have to filter out instructions that reside out of
-        # the specified boundaries.
-        if (insts['sn_start'] > 0 and print_item['sn'] < insts['sn_start']):
-            continue; # earlier then the starting sequence number
-        if (insts['sn_stop'] > 0 and print_item['sn'] > insts['sn_stop']):
-            continue; # later then the ending sequence number
-        if (insts['tick_start'] > 0 and print_item['fetch'] < insts['tick_start']):
-            continue; # earlier then the starting tick number
-        if (insts['tick_stop'] > 0 and print_item['fetch'] > insts['tick_stop']):
-            continue; # later then the ending tick number
-
-        if (insts['only_committed'] != 0 and print_item['retire'] == 0):
-            continue; # retire is set to zero if it hasn't been completed
-        print_inst(outfile,  print_item, cycle_time, width, color, timestamps, store_completions)
+    for inst in insts:
+        if inst['retire'] == 0:
+            inst['disasm'] = '-----' + inst['disasm']
+        print_inst(outfile, inst, cycle_time, width, color, timestamps,
+                   store_completions)
 
-# Prints a single instruction
-def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
+# Pipeline stages to print, by (color, store_completions)
+stages_cache = {}
+
+def pipeline_stages(color, store_completions):
+    key = (color, store_completions)
+    if key in stages_cache:
+        return stages_cache[key]
     if color:
         from m5.util.terminal import termcap
     else:
@@ -219,11 +307,21 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             {'name': 'store',
              'color': termcap.Yellow + termcap.Reverse,
              'shorthand': 's'})
+    stages_cache[key] = stages
+    return stages
+
+# Prints a single instruction
+def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
+    if color:
+        from m5.util.terminal import termcap
+    else:
+        from m5.util.terminal import no_termcap as termcap
+    stages = pipeline_stages(color, store_completions)
 
     # Print
 
     time_width = width * cycle_time
-    base_tick = (inst['fetch'] / time_width) * time_width
+    base_tick = (inst['fetch'] // time_width) * time_width
 
     # Find out the time of the last event - it may not
     # be 'retire' if the instruction is not comlpeted.
@@ -237,7 +335,7 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
     if ((last_event_time - inst['fetch']) < time_width):
         num_lines = 1 # compact form
     else:
-        num_lines = ((last_event_time - base_tick) / time_width) + 1
+        num_lines = ((last_event_time - base_tick) // time_width) + 1
 
     curr_color = termcap.Normal
 
@@ -267,7 +365,7 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             if (stages[event[2]]['name'] == 'dispatch' and
                 inst['dispatch'] == inst['issue']):
                 continue
-            outfile.write(curr_color + dot * ((event[0] / cycle_time) - pos))
+            outfile.write(curr_color + dot * ((event[0] // cycle_time) - pos))
             outfile.write(stages[event[2]]['color'] +
                           stages[event[2]]['shorthand'])
 
@@ -276,7 +374,7 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             else:
                 curr_color = termcap.Normal
 
-            pos = (event[0] / cycle_time) + 1
+            pos = (event[0] // cycle_time) + 1
         outfile.write(curr_color + dot * (width - pos) + termcap.Normal +
                       ']-(' + str(base_tick + i * time_width).rjust(15) + ') ')
         if i == 0:
@@ -345,6 +443,11 @@ def main():
         '--store_completions',
         action='store_true', default=False,
         help="additionally display store completion ticks (default: '%default')")
+    parser.add_option(
+        '--binary-out',
+        metavar='FILE', default=None,
+        help="convert the trace to the binary format, which can be read "
+             "back by this script, instead of printing it")
     (options, args) = parser.parse_args()
     if len(args) != 1:
         parser.error('incorrect number of arguments')
@@ -358,13 +461,26 @@ def main():
         parser.error('invalid range')
         sys.exit(1)
     # Process trace
+    if options.binary_out:
+        print('Converting trace... ', end=' ')
+        with open(args[0], 'r') as trace:
+            with open(options.binary_out, 'wb') as out:
+                write_binary(sort_by_sn(parse_trace(trace), window), out)
+        print('done!')
+        return
+
     print('Processing trace... ', end=' ')
-    with open(args[0], 'r') as trace:
-        with open(options.outfile, 'w') as out:
-            process_trace(trace, out, options.cycle_time, options.width,
-                          options.color, options.timestamps,
-                          options.only_committed, options.store_completions,
-                          *(tick_range + inst_range))
+    with open(args[0], 'rb') as trace:
+        if trace.read(len(binary_magic)) == binary_magic:
+            trace = BinaryTrace(trace)
+        else:
+            trace = open(args[0], 'r')
+    with open(options.outfile, 'w') as out:
+        process_trace(trace, out, options.cycle_time, options.width,
+                      options.color, options.timestamps,
+                      options.only_committed, options.store_completions,
+                      *(tick_range + inst_range))
+    trace.close()
     print('done!')
 
 
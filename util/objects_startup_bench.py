@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# This script times how long a gem5 binary takes to start up and run a
+# trivial config, with the SimObjects in m5.objects imported on demand (the
+# default) and with every SimObject module imported up front
+# (M5_EAGER_OBJECTS). It reports the minimum and median wall clock times
+# over a number of runs for a config importing a few SimObjects and for one
+# importing all of them with "from m5.objects import *".
+#
+#   objects_startup_bench.py build/X86/gem5.opt
+#   objects_startup_bench.py build/X86/gem5.opt --runs 20
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+configs = {
+    'some' : 'from m5.objects import Root, System, SrcClockDomain\n',
+    'all' : 'from m5.objects import *\n',
+}
+
+def timeRuns(gem5, config, env, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call([ gem5, '--quiet', '--redirect-stdout',
+                                '--redirect-stderr', config ],
+                              env=env, cwd=os.path.dirname(config))
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time gem5 startup with lazily and eagerly imported "
+        "SimObjects")
+    parser.add_argument("gem5", help="gem5 binary to run")
+    parser.add_argument("--runs", type=int, default=10,
+                        help="Number of times to run each config "
+                        "[Default: %(default)s]")
+    args = parser.parse_args()
+
+    lazy_env = dict(os.environ)
+    lazy_env.pop('M5_EAGER_OBJECTS', None)
+    eager_env = dict(lazy_env, M5_EAGER_OBJECTS='true')
+
+    print("%-6s %-6s %10s %10s" % ("mode", "config", "min", "median"))
+    with tempfile.TemporaryDirectory(prefix='objects-bench-') as tmp:
+        for config_name, contents in configs.items():
+            config = os.path.join(tmp, config_name + '.py')
+            with open(config, 'w') as f:
+                f.write(contents)
+            for mode, env in (('lazy', lazy_env), ('eager', eager_env)):
+                times = timeRuns(os.path.abspath(args.gem5), config, env,
+                                 args.runs)
+                print("%-6s %-6s %10.3f %10.3f" %
+                      (mode, config_name, min(times),
+                       statistics.median(times)))
+                sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,11 @@
 
 
 from configparser import ConfigParser
-import string, sys, subprocess, os
+import math, sys, subprocess, os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import statslib
 
 # Compile DSENT to generate the Python module and then import it.
 # This script assumes it is executed from the gem5 root.
@@ -146,25 +150,23 @@ def parseStats(stats_file, config, router_config_file, link_config_file,
                vcs_per_vnet, buffers_per_data_vc, buffers_per_control_vc,
                ni_flit_size_bits):
 
-    # Open the stats.txt file and parse it to for the required numbers
-    # and the number of routers.
+    # Open the stats.txt file and parse it for the required numbers
     try:
-        stats_handle = open(stats_file, 'r')
-        stats_handle.close()
+        stats = statslib.StatsFile(stats_file)
     except IOError:
         print("Failed to open ", stats_file, " for reading")
         exit(-1)
 
-    # Now parse the stats
-    pattern = "sim_seconds"
-    lines = string.split(subprocess.check_output(
-                ["grep", pattern, stats_file]), '\n', -1)
-    assert len(lines) >= 1
+    if len(stats) == 0:
+        print("No statistics found in ", stats_file)
+        exit(-1)
 
-    ## Assume that the first line is the one required
-    [l1,l2,l3] = lines[0].partition(" ")
-    l4 = l3.strip().partition(" ")
-    simulation_length_in_seconds = float(l4[0])
+    ## Assume that the first dump is the one required
+    names = ["sim_seconds", "simSeconds"]
+    values = stats.values(names, dumps=[0])
+    seconds = [ values[n][0] for n in names if not math.isnan(values[n][0]) ]
+    assert len(seconds) >= 1
+    simulation_length_in_seconds = seconds[0]
 
     # Initialize DSENT with a configuration file
     dsent.initialize(router_config_file)
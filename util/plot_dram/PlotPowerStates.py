@@ -39,6 +39,11 @@ import matplotlib.pyplot as plt
 from matplotlib.font_manager import FontProperties
 import numpy as np
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import statslib
 
 # global results dict
 results = {}
@@ -122,7 +127,7 @@ def plotLowPStates(plot_dir, stats_fname, bank_util_list, seqbytes_list,
     @param delay_list: list of itt max multipliers (e.g. [1, 20, 200])
 
     """
-    stats_file = open(stats_fname, 'r')
+    stats_file = statslib.StatsFile(stats_fname)
 
     global bankUtilValues
     bankUtilValues = bank_util_list
@@ -134,59 +139,48 @@ def plotLowPStates(plot_dir, stats_fname, bank_util_list, seqbytes_list,
     delayValues = delay_list
     initResults()
 
-    # throw away the first two lines of the stats file
-    stats_file.readline()
-    stats_file.readline() # the 'Begin' line
-
     #######################################
     # Parse stats file and gather results
     ########################################
 
+    #### state time values ####
+    # Example format:
+    # 'system.mem_ctrls_0.memoryStateTime::ACT    1000000'
+    state_stats = stats_file.match(
+        r'system\.mem_ctrls_0\.memoryStateTime::.*')
+    #### state energy values ####
+    # Example format:
+    # system.mem_ctrls_0.actEnergy                 35392980
+    energy_stats = list(StatToKey.keys())
+    values = stats_file.values(state_stats + energy_stats)
+
+    # Now grab the state, i.e. 'ACT'
+    def stateName(statistic):
+        return statistic.split('::')[1]
+
+    def dumpResults(dump, stats, key):
+        result = {}
+        for statistic in stats:
+            value = values[statistic][dump]
+            if not np.isnan(value):
+                result[key(statistic)] = int(value)
+        return result
+
+    # There is one stats dump per combination of the swept values, in
+    # the order they are swept in
+    dump = 0
     for delay in delayValues:
         for bank_util in bankUtilValues:
             for seq_bytes in seqBytesValues:
-
-                for line in stats_file:
-                    if 'Begin' in line:
-                        break
-
-                    if len(line.strip()) == 0:
-                        continue
-
-                    #### state time values ####
-                    if 'system.mem_ctrls_0.memoryStateTime' in line:
-                        # remove leading and trailing white spaces
-                        line = line.strip()
-                        # Example format:
-                        # 'system.mem_ctrls_0.memoryStateTime::ACT    1000000'
-                        statistic, stime = line.split()[0:2]
-                        # Now grab the state, i.e. 'ACT'
-                        state = statistic.split('::')[1]
-                        # store the value of the stat in the results dict
-                        results[delay][bank_util][seq_bytes][state] = \
-                            int(stime)
-                    #### state energy values ####
-                    elif line.strip().split()[0] in list(StatToKey.keys()):
-                        # Example format:
-                        # system.mem_ctrls_0.actEnergy                 35392980
-                        statistic, e_val = line.strip().split()[0:2]
-                        senergy = int(float(e_val))
-                        state = StatToKey[statistic]
-                        # store the value of the stat in the results dict
-                        results[delay][bank_util][seq_bytes][state] = senergy
+                # store the values of the stats in the results dict
+                results[delay][bank_util][seq_bytes].update(
+                    dumpResults(dump, state_stats, stateName))
+                results[delay][bank_util][seq_bytes].update(
+                    dumpResults(dump, energy_stats, StatToKey.get))
+                dump += 1
 
     # To add last traffic gen idle period stats to the results dict
-    for line in stats_file:
-        if 'system.mem_ctrls_0.memoryStateTime' in line:
-            line = line.strip() # remove leading and trailing white spaces
-            # Example format:
-            # 'system.mem_ctrls_0.memoryStateTime::ACT    1000000'
-            statistic, stime = line.split()[0:2]
-            # Now grab the state energy, .e.g 'ACT'
-            state = statistic.split('::')[1]
-            idleResults[state] = int(stime)
-            if state == 'ACT_PDN':
-                break
+    idleResults.update(dumpResults(dump, state_stats, stateName))
 
     ########################################
     # Call plot functions
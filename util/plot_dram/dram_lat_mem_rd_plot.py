@@ -43,9 +43,14 @@ except ImportError:
     print("Failed to import matplotlib and numpy")
     exit(-1)
 
+import os
 import sys
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import statslib
+
 # This script is intended to post process and plot the output from
 # running configs/dram/lat_mem_rd.py, as such it parses the simout and
 # stats.txt to get the relevant data points.
@@ -56,7 +61,7 @@ def main():
         exit(-1)
 
     try:
-        stats = open(sys.argv[1] + '/stats.txt', 'r')
+        stats = statslib.StatsFile(sys.argv[1] + '/stats.txt')
     except IOError:
         print("Failed to open ", sys.argv[1] + '/stats.txt', " for reading")
         exit(-1)
@@ -88,14 +93,13 @@ def main():
         print("Failed to get address ranges, ensure simout is up-to-date")
         exit(-1)
 
-    # Now parse the stats
+    # Now parse the stats, keeping the values of every dump in order
     raw_rd_lat = []
 
-    for line in stats:
-        match = re.match(".*readLatencyHist::mean\s+(.+)\s+#.*", line)
-        if match:
-            raw_rd_lat.append(float(match.groups(0)[0]) / 1000)
-    stats.close()
+    values = stats.values(stats.match(r'.*readLatencyHist::mean'))
+    if values:
+        values = np.column_stack(list(values.values())).ravel()
+        raw_rd_lat = list(values[~np.isnan(values)] / 1000)
 
     # The stats also contain the warming, so filter the latency stats
     i = 0
@@ -44,9 +44,14 @@ except ImportError:
     print("Failed to import matplotlib and numpy")
     exit(-1)
 
+import os
 import sys
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import statslib
+
 # Determine the parameters of the sweep from the simout output, and
 # then parse the stats and plot the 3D surface corresponding to the
 # different combinations of parallel banks, and stride size, as
@@ -68,7 +73,7 @@ def main():
     mode = sys.argv[1][1]
 
     try:
-        stats = open(sys.argv[2] + '/stats.txt', 'r')
+        stats = statslib.StatsFile(sys.argv[2] + '/stats.txt')
     except IOError:
         print("Failed to open ", sys.argv[2] + '/stats.txt', " for reading")
         exit(-1)
@@ -98,24 +103,17 @@ def main():
         print("Failed to establish sweep details, ensure simout is up-to-date")
         exit(-1)
 
-    # Now parse the stats
-    peak_bw = []
-    bus_util = []
-    avg_pwr = []
-
-    for line in stats:
-        match = re.match(".*busUtil\s+(\d+\.\d+)\s+#.*", line)
-        if match:
-            bus_util.append(float(match.groups(0)[0]))
-
-        match = re.match(".*peakBW\s+(\d+\.\d+)\s+#.*", line)
-        if match:
-            peak_bw.append(float(match.groups(0)[0]))
-
-        match = re.match(".*averagePower\s+(\d+\.?\d*)\s+#.*", line)
-        if match:
-            avg_pwr.append(float(match.groups(0)[0]))
-    stats.close()
+    # Now parse the stats, keeping the values of every dump in order
+    def dumpValues(pattern):
+        values = stats.values(stats.match(pattern))
+        if not values:
+            return []
+        values = np.column_stack(list(values.values())).ravel()
+        return list(values[~np.isnan(values)])
+
+    bus_util = dumpValues(r'.*busUtil')
+    peak_bw = dumpValues(r'.*peakBW')
+    avg_pwr = dumpValues(r'.*averagePower')
 
 
     # Sanity check
@@ -69,7 +69,12 @@
 # types of proto objects can use the same function to decode a single message
 
 import gzip
+import itertools
+import mmap
+import multiprocessing
+import os
 import struct
+import zipfile
 
 def openFileRd(in_file):
     """
@@ -161,3 +166,477 @@ def encodeMessage(out_file, message):
     out = message.SerializeToString()
     _EncodeVarint32(out_file, len(out))
     out_file.write(out)
+
+class MessageReader(object):
+    """
+    Buffered reader of length-delimited messages.
+
+    Instead of reading the input one byte at a time, the reader pulls
+    large chunks from the file (or maps uncompressed files into memory)
+    and decodes the varint length prefixes directly from the buffer.
+    Use read() for any raw data preceding the messages, e.g., the magic
+    number, then decodeMessage(), decodeMessages() or rawMessages().
+    """
+
+    def __init__(self, in_file, chunk_size=1 << 20):
+        self._file = in_file
+        self._chunk_size = chunk_size
+        self._buf = b''
+        self._pos = 0
+        # Offset in the (uncompressed) input of the start of _buf
+        self._base = 0
+        self._eof = False
+        self._mmap = None
+
+        # Uncompressed files are mapped into memory and decoded in
+        # place. Compressed files (and anything without a file
+        # descriptor) are read in chunks.
+        if not isinstance(in_file, gzip.GzipFile):
+            try:
+                self._mmap = mmap.mmap(in_file.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+            except (AttributeError, IOError, OSError, ValueError):
+                self._mmap = None
+            if self._mmap is not None:
+                self._buf = self._mmap
+                self._pos = in_file.tell()
+                self._eof = True
+        if self._mmap is None:
+            self._base = in_file.tell()
+
+    def _fill(self, size):
+        """
+        Make sure at least size bytes are buffered past the current
+        position, unless the end of the file is reached first.
+        """
+        avail = len(self._buf) - self._pos
+        if avail >= size or self._eof:
+            return
+        chunks = [ self._buf[self._pos:] ]
+        while avail < size:
+            chunk = self._file.read(max(self._chunk_size, size - avail))
+            if not chunk:
+                self._eof = True
+                break
+            chunks.append(chunk)
+            avail += len(chunk)
+        self._base += self._pos
+        self._buf = b''.join(chunks)
+        self._pos = 0
+
+    def tell(self):
+        """
+        Return the offset of the next unread byte in the (uncompressed)
+        input.
+        """
+        return self._base + self._pos
+
+    def read(self, size):
+        """
+        Read size raw bytes (fewer at the end of the file).
+        """
+        self._fill(size)
+        data = self._buf[self._pos:self._pos + size]
+        self._pos += len(data)
+        return bytes(data)
+
+    def _readVarint32(self):
+        # A varint is at most 10 bytes long
+        self._fill(10)
+        buf = self._buf
+        pos = self._pos
+        end = len(buf)
+        result = 0
+        shift = 0
+        while pos < end:
+            b = buf[pos]
+            pos += 1
+            result |= ((b & 0x7f) << shift)
+            if not (b & 0x80):
+                self._pos = pos
+                return result & 0xffffffff
+            shift += 7
+            if shift >= 64:
+                raise IOError('Too many bytes when decoding varint.')
+        if pos == self._pos:
+            return None
+        raise IOError('Truncated varint at the end of the file.')
+
+    def rawMessages(self):
+        """
+        Generator of the serialized messages in the file. Each message
+        is returned as a bytes object without its length prefix.
+        """
+        while True:
+            size = self._readVarint32()
+            if size is None:
+                return
+            self._fill(size)
+            pos = self._pos
+            data = self._buf[pos:pos + size]
+            if len(data) != size:
+                raise IOError('Truncated message at the end of the file.')
+            self._pos = pos + size
+            yield data
+
+    def decodeMessages(self, message):
+        """
+        Generator that decodes every remaining message in the file into
+        message and yields it. The same message object is reused for
+        every iteration, copy it if it needs to be kept.
+        """
+        parse = message.ParseFromString
+        for data in self.rawMessages():
+            parse(data)
+            yield message
+
+    def decodeMessage(self, message):
+        """
+        Decode the next message into message. Return False if no
+        message could be read.
+        """
+        try:
+            size = self._readVarint32()
+            if size is None:
+                return False
+            self._fill(size)
+            data = self._buf[self._pos:self._pos + size]
+            if len(data) != size:
+                return False
+            self._pos += size
+            message.ParseFromString(data)
+            return True
+        except IOError:
+            return False
+
+    def close(self):
+        if self._mmap is not None:
+            self._buf = b''
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+class MessageWriter(object):
+    """
+    Buffered writer of length-delimited messages, the counterpart of
+    MessageReader. Messages are accumulated in memory and written to
+    the file in large blocks.
+    """
+
+    def __init__(self, out_file, buffer_size=1 << 20):
+        self._file = out_file
+        self._buffer_size = buffer_size
+        self._buf = bytearray()
+
+    def write(self, data):
+        """
+        Write raw bytes, e.g., the magic number.
+        """
+        self._buf += data
+        if len(self._buf) >= self._buffer_size:
+            self.flush()
+
+    def encodeMessage(self, message):
+        """
+        Encode a message with the length prepended as a 32-bit varint.
+        """
+        out = message.SerializeToString()
+        buf = self._buf
+        value = len(out)
+        while value > 0x7f:
+            buf.append(0x80 | (value & 0x7f))
+            value >>= 7
+        buf.append(value)
+        buf += out
+        if len(buf) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._file.write(self._buf)
+            self._buf = bytearray()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+def isNumpyOutput(filename):
+    """
+    Return True if the file name asks for NumPy output (.npy or .npz).
+    """
+    return os.path.splitext(filename)[1] in ('.npy', '.npz')
+
+def sidecarName(filename, name):
+    """
+    Return the name of a file stored next to filename, e.g.,
+    sidecarName('trace.npy', 'reg_dep') is 'trace.reg_dep.npy'.
+    """
+    root, ext = os.path.splitext(filename)
+    return '%s.%s%s' % (root, name, ext)
+
+class NumpyRecordWriter(object):
+    """
+    Streams fixed-dtype records to a NumPy file without holding all of
+    them in memory.
+
+    A .npy output is a single one-dimensional record array, which can be
+    opened with numpy.load(filename, mmap_mode='r'). The header is
+    written with room for any record count and updated on close().
+
+    A .npz output stores the records in chunks, one array per chunk
+    named chunk_000000, chunk_000001, etc.
+    """
+
+    # Number of digits reserved for the record count in a .npy header
+    _COUNT_DIGITS = 20
+
+    def __init__(self, filename, dtype, chunk_size=1 << 16):
+        try:
+            import numpy
+        except ImportError:
+            print("NumPy output requires the numpy module")
+            exit(-1)
+
+        self._np = numpy
+        self._dtype = numpy.dtype(dtype)
+        self._chunk_size = chunk_size
+        self._rows = []
+        self._chunks = 0
+        self.count = 0
+
+        self._zip = None
+        if filename.endswith('.npz'):
+            self._zip = zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED,
+                                        allowZip64=True)
+        else:
+            self._file = open(filename, 'wb')
+            self._file.write(self._npyHeader(10 ** self._COUNT_DIGITS - 1))
+
+    def _npyHeader(self, count):
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % \
+                 (self._np.lib.format.dtype_to_descr(self._dtype), count)
+        # Pad the header with spaces so that it has the same size for
+        # any count and the data stays 64-byte aligned.
+        max_len = len(header) - len(str(count)) + self._COUNT_DIGITS
+        total = 10 + max_len + 1
+        total = (total + 63) // 64 * 64
+        header = header.ljust(total - 10 - 1) + '\n'
+        return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + \
+            header.encode('latin1')
+
+    def append(self, record):
+        """
+        Append one record, given as a tuple in dtype field order.
+        """
+        self._rows.append(record)
+        if len(self._rows) >= self._chunk_size:
+            self._flushChunk()
+
+    def _flushChunk(self):
+        if not self._rows:
+            return
+        chunk = self._np.array(self._rows, dtype=self._dtype)
+        self._rows = []
+        self.count += len(chunk)
+        if self._zip is not None:
+            name = 'chunk_%06d.npy' % self._chunks
+            with self._zip.open(name, 'w', force_zip64=True) as f:
+                self._np.lib.format.write_array(f, chunk,
+                                                allow_pickle=False)
+        else:
+            self._file.write(chunk.tobytes())
+        self._chunks += 1
+
+    def close(self):
+        self._flushChunk()
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._file.seek(0)
+            self._file.write(self._npyHeader(self.count))
+            self._file.close()
+
+class TraceIndex(object):
+    """
+    Index of the message boundaries of a trace, stored next to the trace
+    in <trace>.idx.
+
+    The index records the input offset of every every-th message after
+    the header, which splits the trace into chunks that can be decoded
+    independently. For an uncompressed trace the offsets point directly
+    at message boundaries. gzip'd traces are not seekable, so they must
+    first be converted to a block-compressed trace (see
+    writeBlockCompressed()): a sequence of independent gzip members, each
+    starting at a message boundary. Such a trace is still a valid gzip
+    file, and the offsets of a block-compressed index point at the start
+    of the gzip members.
+    """
+
+    MAGIC = b'gem5idx\x01'
+    SUFFIX = '.idx'
+    _HEADER = struct.Struct('<IBQQ')
+
+    def __init__(self, every, compressed, num_messages, offsets):
+        self.every = every
+        self.compressed = compressed
+        self.num_messages = num_messages
+        self.offsets = offsets
+
+    def chunks(self):
+        """
+        Return a list of (offset, first message, message count) tuples,
+        one per chunk.
+        """
+        chunks = []
+        for i, offset in enumerate(self.offsets):
+            first = i * self.every
+            count = min(self.every, self.num_messages - first)
+            chunks.append((offset, first, count))
+        return chunks
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(self._HEADER.pack(self.every, self.compressed,
+                                      self.num_messages, len(self.offsets)))
+            f.write(struct.pack('<%dQ' % len(self.offsets), *self.offsets))
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise IOError('%s is not a trace index' % filename)
+            every, compressed, num_messages, num_offsets = \
+                cls._HEADER.unpack(f.read(cls._HEADER.size))
+            offsets = list(struct.unpack('<%dQ' % num_offsets,
+                                         f.read(8 * num_offsets)))
+        return cls(every, bool(compressed), num_messages, offsets)
+
+def hasIndex(in_file):
+    """
+    Return True if the trace has an index that is at least as recent as
+    the trace itself.
+    """
+    index_file = in_file + TraceIndex.SUFFIX
+    return os.path.exists(index_file) and \
+        os.path.getmtime(index_file) >= os.path.getmtime(in_file)
+
+def _skipHeader(reader):
+    """
+    Skip the magic number and the header message of a trace.
+    """
+    if reader.read(4) != b'gem5':
+        raise IOError('Unrecognized trace file')
+    if next(reader.rawMessages(), None) is None:
+        raise IOError('Trace file without a header')
+
+def indexTrace(in_file, every=1 << 16):
+    """
+    Build the index of an uncompressed trace and store it in
+    <in_file>.idx.
+    """
+    reader = MessageReader(openFileRd(in_file))
+    if isinstance(reader._file, gzip.GzipFile):
+        reader.close()
+        raise IOError('%s is compressed and must be block-compressed '
+                      'before it can be indexed' % in_file)
+
+    _skipHeader(reader)
+    offsets = []
+    num_messages = 0
+    pos = reader.tell()
+    for data in reader.rawMessages():
+        if num_messages % every == 0:
+            offsets.append(pos)
+        num_messages += 1
+        pos = reader.tell()
+    reader.close()
+
+    index = TraceIndex(every, False, num_messages, offsets)
+    index.save(in_file + TraceIndex.SUFFIX)
+    return index
+
+def writeBlockCompressed(in_file, out_file, every=1 << 16, compresslevel=6):
+    """
+    Convert a trace (compressed or not) to a block-compressed trace with
+    every messages per gzip member, and store its index in
+    <out_file>.idx.
+    """
+    reader = MessageReader(openFileRd(in_file))
+    out = open(out_file, 'wb')
+    offsets = []
+    num_messages = 0
+
+    # The magic number and the header go into the first member
+    magic = reader.read(4)
+    header = next(reader.rawMessages(), None)
+    if magic != b'gem5' or header is None:
+        raise IOError('Unrecognized trace file %s' % in_file)
+
+    block = bytearray(magic)
+
+    def flushBlock(block):
+        out.write(gzip.compress(bytes(block), compresslevel))
+
+    def appendMessage(block, data):
+        value = len(data)
+        while value > 0x7f:
+            block.append(0x80 | (value & 0x7f))
+            value >>= 7
+        block.append(value)
+        block += data
+
+    appendMessage(block, header)
+    for data in reader.rawMessages():
+        if num_messages % every == 0:
+            flushBlock(block)
+            block = bytearray()
+            offsets.append(out.tell())
+        appendMessage(block, data)
+        num_messages += 1
+    flushBlock(block)
+
+    out.close()
+    reader.close()
+
+    index = TraceIndex(every, True, num_messages, offsets)
+    index.save(out_file + TraceIndex.SUFFIX)
+    return index
+
+def _decodeChunk(args):
+    in_file, compressed, offset, first, count, message_type, func = args
+    f = open(in_file, 'rb')
+    f.seek(offset)
+    if compressed:
+        f = gzip.GzipFile(fileobj=f, mode='rb')
+    reader = MessageReader(f)
+    messages = itertools.islice(reader.decodeMessages(message_type()), count)
+    try:
+        return func(messages, first)
+    finally:
+        reader.close()
+
+def decodeParallel(in_file, message_type, func, processes=None):
+    """
+    Decode an indexed trace in parallel.
+
+    The trace is split into the chunks recorded in its index and every
+    chunk is decoded in a separate process. func(messages, first) is
+    called in the worker with an iterator over the decoded messages of a
+    chunk and the index of the first message of the chunk in the trace;
+    the iterator reuses a single message object. The results of func
+    are yielded in trace order.
+    """
+    index = TraceIndex.load(in_file + TraceIndex.SUFFIX)
+    jobs = [ (in_file, index.compressed, offset, first, count,
+              message_type, func)
+             for offset, first, count in index.chunks() ]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(_decodeChunk, jobs):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,84 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# This script times resolving the proxies (Parent.any, Parent.clk_domain,
+# etc.) in a large synthetic configuration, with and without sharing the
+# results of searches up the hierarchy the way m5.instantiate() does. It
+# builds a system of --cpus subsystems, each holding --caches classic
+# caches, twice and unproxies one copy each way. It must be run by gem5:
+#
+#   build/X86/gem5.opt util/proxy_bench.py
+#   build/X86/gem5.opt util/proxy_bench.py --cpus 256 --caches 8
+
+import argparse
+import time
+
+from m5 import proxy
+from m5.objects import *
+
+def buildSystem(cpus, caches):
+    system = System(eventq_index=0)
+    system.voltage_domain = VoltageDomain()
+    system.clk_domain = SrcClockDomain(clock='1GHz',
+                                       voltage_domain=system.voltage_domain)
+    system.cpus = [ SubSystem() for _ in range(cpus) ]
+    for cpu in system.cpus:
+        cpu.clk_domain = SrcClockDomain(clock='2GHz',
+                                        voltage_domain=Parent.voltage_domain)
+        cpu.caches = [ Cache(size='32kB', assoc=8, tag_latency=2,
+                             data_latency=2, response_latency=2, mshrs=4,
+                             tgts_per_mshr=20)
+                       for _ in range(caches) ]
+    return system
+
+def timeUnproxy(system, cached):
+    objs = system.descendants_list()
+    start = time.perf_counter()
+    if cached:
+        with proxy.cachedResolution():
+            for obj in objs:
+                obj.unproxyParams()
+    else:
+        for obj in objs:
+            obj.unproxyParams()
+    return len(objs), time.perf_counter() - start
+
+parser = argparse.ArgumentParser(
+    description="Time proxy resolution in a large synthetic configuration")
+parser.add_argument("--cpus", type=int, default=128,
+                    help="Number of CPU subsystems [Default: %(default)s]")
+parser.add_argument("--caches", type=int, default=4,
+                    help="Number of caches per CPU [Default: %(default)s]")
+args = parser.parse_args()
+
+print("%-8s %10s %10s %10s" % ("mode", "objects", "build", "unproxy"))
+for cached in (False, True):
+    start = time.perf_counter()
+    system = buildSystem(args.cpus, args.caches)
+    build = time.perf_counter() - start
+    count, unproxy = timeUnproxy(system, cached)
+    print("%-8s %10d %10.3f %10.3f" %
+          ("cached" if cached else "uncached", count, build, unproxy))
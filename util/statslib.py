@@ -0,0 +1,374 @@
+# Copyright (c) 2021 The Regents of The University of California
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# This file is a library for reading the text statistics (stats.txt)
+# written by gem5, shared by the scripts that post-process them. A
+# stats file holds one dump per stats dump in the simulation, e.g.,
+#
+#   from statslib import StatsFile
+#
+#   stats = StatsFile('m5out/stats.txt')
+#   ticks = stats.values(['finalTick'])['finalTick']
+#   ipc = stats.values(stats.match(r'system\.cpu\d*\.ipc'))
+
+import gzip
+import math
+import mmap
+import multiprocessing
+import re
+
+BEGIN = b'---------- Begin Simulation Statistics ----------\n'
+END = b'\n---------- End Simulation Statistics   ----------\n'
+
+# Uncompressed bytes of dumps handed to a worker at a time
+_JOB_SIZE = 16 << 20
+
+def _isGzip(filename):
+    with open(filename, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+def _value(line, name_len):
+    """
+    Return the value of the stat on a line, or NaN if it isn't a number
+    (e.g., a vector printed on a single line).
+    """
+    fields = line[name_len:].split(None, 1)
+    try:
+        return float(fields[0])
+    except (IndexError, ValueError):
+        return math.nan
+
+def _parseBody(body, names, layout):
+    """
+    Return the values of the stats names in the body of a dump. layout
+    maps stat names to the line they were on in a previous dump; it is
+    updated if the stats have moved, which happens when stats that are
+    zero aren't printed.
+    """
+    lines = body.split(b'\n')
+    num_lines = len(lines)
+    table = None
+    # Stats that haven't been printed shift the ones that follow them by
+    # the same number of lines.
+    shift = 0
+    values = []
+    for name in names:
+        n = len(name)
+        i = layout.get(name, num_lines)
+        for i in (i, i + shift):
+            line = lines[i] if 0 <= i < num_lines else b''
+            if line.startswith(name) and line[n:n + 1] == b' ':
+                break
+        else:
+            if table is None:
+                table = { l[:l.find(b' ')]: i for i, l in enumerate(lines) }
+            i = table.get(name)
+            if i is None:
+                values.append(math.nan)
+                continue
+            line = lines[i]
+        if i != layout.get(name):
+            shift = i - layout.get(name, i)
+            layout[name] = i
+        values.append(_value(line, n))
+    return values
+
+def _parseBodies(args):
+    bodies, names, layout = args
+    return [ _parseBody(body, names, layout) for body in bodies ]
+
+def _parseRange(args):
+    filename, offsets, names, layout = args
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return [ _parseBody(buf[begin:end], names, layout)
+                     for begin, end in offsets ]
+        finally:
+            buf.close()
+
+def _streamBodies(f, chunk_size=_JOB_SIZE):
+    """
+    Generator of the (begin, end, body) of every dump in a stream, where
+    begin and end are the offsets of the body in the (uncompressed)
+    stream.
+    """
+    buf = b''
+    base = 0
+    pos = 0
+    eof = False
+    while True:
+        begin = buf.find(BEGIN, pos)
+        end = buf.find(END, begin + len(BEGIN)) if begin >= 0 else -1
+        if end >= 0:
+            begin += len(BEGIN)
+            yield base + begin, base + end, buf[begin:end]
+            pos = end + len(END)
+            continue
+        if eof:
+            return
+        try:
+            chunk = f.read(chunk_size)
+        except (EOFError, OSError):
+            # A gzip stream that wasn't closed properly, e.g., because
+            # the simulation is still running. Stop at the last complete
+            # dump.
+            chunk = b''
+        if not chunk:
+            eof = True
+        # Keep the incomplete dump (or anything that could be the start
+        # of a marker) and append the new data.
+        keep = begin if begin >= 0 else max(pos, len(buf) - len(BEGIN))
+        base += keep
+        buf = buf[keep:] + chunk
+        pos = 0
+
+class StatsFile(object):
+    """
+    Reader of a gem5 stats.txt file, which may be gzip'd.
+
+    The file is scanned once to build an index of where every dump
+    starts and ends, and the names of the stats in the first dump.
+    values() then extracts a selection of stats from every dump (or a
+    range of them) as NumPy arrays, parsing ranges of dumps in parallel.
+    Uncompressed files are mapped into memory; gzip'd files can't be
+    read at random, so they are decompressed again for every call to
+    values(), which doesn't need the index and scans the file only once.
+    """
+
+    def __init__(self, filename, processes=None):
+        self.filename = filename
+        self.processes = processes
+        self.compressed = _isGzip(filename)
+        self._dumps = None
+        self._names = None
+        self._descs = None
+        self._layout = {}
+
+    def _open(self):
+        if self.compressed:
+            return gzip.open(self.filename, 'rb')
+        return open(self.filename, 'rb')
+
+    def _map(self):
+        with open(self.filename, 'rb') as f:
+            try:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                return b''
+
+    def dumps(self):
+        """
+        Return the list of the (begin, end) offsets of the body of every
+        dump in the (uncompressed) file.
+        """
+        if self._dumps is None:
+            if self.compressed:
+                with self._open() as f:
+                    self._dumps = [ (begin, end)
+                                    for begin, end, body in _streamBodies(f) ]
+            else:
+                buf = self._map()
+                dumps = []
+                pos = buf.find(BEGIN)
+                while pos >= 0:
+                    begin = pos + len(BEGIN)
+                    end = buf.find(END, begin)
+                    if end < 0:
+                        break
+                    dumps.append((begin, end))
+                    pos = buf.find(BEGIN, end + len(END))
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+                self._dumps = dumps
+        return self._dumps
+
+    def __len__(self):
+        return len(self.dumps())
+
+    def _body(self, index):
+        if self.compressed:
+            with self._open() as f:
+                for i, (begin, end, body) in enumerate(_streamBodies(f)):
+                    if i == index:
+                        return body
+            raise IndexError('dump %d out of range' % index)
+        begin, end = self.dumps()[index]
+        buf = self._map()
+        try:
+            return buf[begin:end]
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    def _indexNames(self):
+        if self._names is not None:
+            return
+        self._names = []
+        self._descs = {}
+        if self.compressed:
+            with self._open() as f:
+                body = next((b for _, _, b in _streamBodies(f)), b'')
+        else:
+            body = self._body(0) if self.dumps() else b''
+        for i, line in enumerate(body.split(b'\n')):
+            fields = line.split(None, 1)
+            if not fields:
+                continue
+            name = fields[0].decode()
+            self._names.append(name)
+            self._layout[fields[0]] = i
+            desc = line.partition(b' # ')[2]
+            self._descs[name] = desc.decode(errors='replace').strip()
+
+    def names(self):
+        """
+        Return the names of the stats in the first dump, in file order.
+        Stats that are only printed when they aren't zero may be missing.
+        """
+        self._indexNames()
+        return list(self._names)
+
+    def match(self, pattern):
+        """
+        Return the names of the stats in the first dump that match the
+        regular expression pattern, in file order.
+        """
+        regex = re.compile(pattern)
+        return [ n for n in self.names() if regex.fullmatch(n) ]
+
+    def description(self, name):
+        """
+        Return the description of a stat in the first dump, or '' if
+        it isn't there.
+        """
+        self._indexNames()
+        return self._descs.get(name, '')
+
+    def dump(self, index):
+        """
+        Return a dictionary with the value of every stat in a dump.
+        """
+        dump = {}
+        for line in self._body(index).split(b'\n'):
+            fields = line.split(None, 1)
+            if fields:
+                dump[fields[0].decode()] = _value(line, len(fields[0]))
+        return dump
+
+    def _select(self, dumps):
+        if dumps is None:
+            return None
+        if isinstance(dumps, slice):
+            return range(len(self))[dumps]
+        return list(dumps)
+
+    def _jobs(self, items):
+        """
+        Split a list of (body size, item) into lists of items of about
+        _JOB_SIZE bytes each, or in as many lists as there are workers if
+        that makes them smaller.
+        """
+        total = sum(s for s, _ in items)
+        processes = self.processes or multiprocessing.cpu_count()
+        limit = min(_JOB_SIZE, max(1, total // processes))
+        jobs = []
+        job = []
+        job_size = 0
+        for s, item in items:
+            job.append(item)
+            job_size += s
+            if job_size >= limit:
+                jobs.append(job)
+                job = []
+                job_size = 0
+        if job:
+            jobs.append(job)
+        return jobs
+
+    def _run(self, func, jobs, parallel=True):
+        if self.processes == 1 or not parallel:
+            for job in jobs:
+                yield func(job)
+            return
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            for result in pool.imap(func, jobs):
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _streamJobs(self, selected, names):
+        wanted = set(selected) if selected is not None else None
+        with self._open() as f:
+            bodies = []
+            size = 0
+            for i, (_, _, body) in enumerate(_streamBodies(f)):
+                if wanted is not None and i not in wanted:
+                    continue
+                bodies.append(body)
+                size += len(body)
+                if size >= _JOB_SIZE:
+                    yield (bodies, names, self._layout)
+                    bodies = []
+                    size = 0
+            if bodies:
+                yield (bodies, names, self._layout)
+
+    def values(self, names, dumps=None):
+        """
+        Return a dictionary with a NumPy array of the values of each of
+        the stats names in every dump, or in the dumps selected by
+        dumps: a slice or a sequence of dump indices. The values of stats
+        that aren't in a dump are NaN.
+        """
+        import numpy
+
+        names = list(names)
+        keys = [ n.encode() for n in names ]
+        self._indexNames()
+        selected = self._select(dumps)
+
+        if self.compressed:
+            # Parse the dumps while the file is being decompressed
+            results = self._run(_parseBodies,
+                                self._streamJobs(selected, keys))
+        else:
+            offsets = self.dumps()
+            if selected is not None:
+                offsets = [ offsets[i] for i in selected ]
+            jobs = [ (self.filename, job, keys, self._layout)
+                     for job in self._jobs(
+                         [ (e - b, (b, e)) for b, e in offsets ]) ]
+            results = self._run(_parseRange, jobs, len(jobs) > 1)
+
+        rows = [ row for result in results for row in result ]
+        array = numpy.array(rows, dtype=numpy.float64).reshape(
+            len(rows), len(names))
+        return { name: array[:, i] for i, name in enumerate(names) }
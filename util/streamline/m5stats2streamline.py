@@ -59,6 +59,7 @@
 # Subsequent versions should be backward compatible
 
 import re, sys, os
+import array
 from configparser import ConfigParser
 import gzip
 import xml.etree.ElementTree as ET
@@ -67,6 +68,11 @@ import shutil
 import zlib
 
 import argparse
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import statslib
 
 parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -103,6 +109,11 @@ parser.add_argument("--gzipped-bmp-not-supported", action="store_true",
                     This option is only required when using Streamline versions \
                     older than 5.14")
 
+parser.add_argument("--cumulative-stats", action="store_true",
+                    help="The stats were dumped without being reset, convert \
+                    them to the change in each window. Only use this for \
+                    stats that are counts.")
+
 parser.add_argument("--verbose", action="store_true",
                     help="Enable verbose output")
 
@@ -183,11 +194,6 @@ class Task(object):
         self.children = []
         self.tick = tick # time this task first appeared
 
-class Event(object):
-    def __init__(self, tick, task):
-        self.tick = tick
-        self.task = task
-
 ############################################################
 # Types used in APC Protocol
 #  - packed32, packed64
@@ -327,16 +333,13 @@ def int16(x):
 # a packed32 length followed by the specified number of characters
 def stringList(x):
     ret = []
-    ret += packed32(len(x))
-    for i in x:
-        ret.append(i)
+    data = x.encode()
+    ret += packed32(len(data))
+    ret += data
     return ret
 
 def utf8StringList(x):
-    ret = []
-    for i in x:
-        ret.append(ord(i))
-    return ret
+    return list(x.encode())
 
 # packed64 time value in nanoseconds relative to the uptime from the
 # Summary message.
@@ -350,39 +353,96 @@ def timestampList(x):
 ############################################################
 
 def writeBinary(outfile, binary_list):
-    for i in binary_list:
-        outfile.write("%c" % i)
+    outfile.write(bytes(binary_list))
+
+# Buffered writer of the .apc binary file. Frames are copied into a
+# preallocated buffer, which is written out when it is full.
+class FrameWriter(object):
+    def __init__(self, outfile, buffer_size=1 << 20):
+        self.outfile = outfile
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.pos = 0
+
+    # data is a bytes-like object, e.g., a NumPy array of uint8
+    def write(self, data):
+        size = len(data)
+        if self.pos + size > len(self.buffer):
+            self.flush()
+            if size > len(self.buffer):
+                self.outfile.write(data)
+                return
+        self.view[self.pos:self.pos + size] = data
+        self.pos += size
+
+    def flush(self):
+        self.outfile.write(self.view[:self.pos])
+        self.pos = 0
+
+    def close(self):
+        self.flush()
+        self.outfile.close()
+
+############################################################
+# Vectorized types used in APC Protocol
+#  - packed32, packed64 of an array of values
+#  - int32 of an array of values
+# Each returns a 2D array of bytes with one row per value, and the
+# number of bytes of each row that are used.
+############################################################
+
+def packedArray(x):
+    x = numpy.asarray(x, dtype=numpy.int64)
+    # Groups of 7 bits, least significant first, followed by the sign
+    shifts = numpy.append(numpy.arange(0, 64, 7), 63)
+    groups = x[:, None] >> shifts
+    ret = (groups[:, :-1] & 0x7f).astype(numpy.uint8)
+    # The value ends with the first group after which only the sign
+    # (repeated in bit 6 of the group) is left
+    sign_bit = (ret & 0x40) != 0
+    rest = groups[:, 1:]
+    done = ((rest == 0) & ~sign_bit) | ((rest == -1) & sign_bit)
+    lengths = numpy.argmax(done, axis=1) + 1
+    more = numpy.arange(ret.shape[1]) < (lengths - 1)[:, None]
+    ret[more] |= 0x80
+    return ret, lengths
+
+def int32Array(x):
+    x = numpy.asarray(x, dtype='<i4')
+    ret = x.view(numpy.uint8).reshape(len(x), 4)
+    return ret, numpy.full(len(x), 4)
+
+# Concatenate the used bytes of every field of every row
+def concatFields(fields):
+    matrix = numpy.concatenate([ f for f, _ in fields ], axis=1)
+    used = numpy.concatenate([ numpy.arange(f.shape[1]) < l[:, None]
+                               for f, l in fields ], axis=1)
+    return matrix[used]
 
 ############################################################
 # APC Protocol Frame Types
 ############################################################
 
+frame_codes = {
+    "Summary" : 1,
+    "Backtrace" : 2,
+    "Name" : 3,
+    "Counter" : 4,
+    "Block Counter" : 5,
+    "Annotate" : 6,
+    "Sched Trace" : 7,
+    "GPU Trace" : 8,
+    "Idle" : 9,
+}
+
 def addFrameHeader(frame_type, body, core):
     ret = []
 
-    if frame_type == "Summary":
-        code = 1
-    elif frame_type == "Backtrace":
-        code = 2
-    elif frame_type == "Name":
-        code = 3
-    elif frame_type == "Counter":
-        code = 4
-    elif frame_type == "Block Counter":
-        code = 5
-    elif frame_type == "Annotate":
-        code = 6
-    elif frame_type == "Sched Trace":
-        code = 7
-    elif frame_type == "GPU Trace":
-        code = 8
-    elif frame_type == "Idle":
-        code = 9
-    else:
+    if frame_type not in frame_codes:
         print("ERROR: Unknown frame type:", frame_type)
         sys.exit(1)
 
-    packed_code = packed32(code)
+    packed_code = packed32(frame_codes[frame_type])
 
     packed_core = packed32(core)
 
@@ -391,6 +451,17 @@ def addFrameHeader(frame_type, body, core):
     ret = length + packed_code + packed_core + body
     return ret
 
+# Vectorized addFrameHeader() for frames with bodies made only of
+# packed32/packed64 values. Returns the bytes of one frame per element
+# of cores; the elements of body are arrays with a value per frame, or
+# a value shared by all of them.
+def packedFrames(frame_type, cores, body):
+    num_frames = len(cores)
+    fields = [ packedArray(numpy.broadcast_to(x, num_frames))
+               for x in [ frame_codes[frame_type], cores ] + body ]
+    length = sum(lengths for _, lengths in fields)
+    return concatFields([ int32Array(length) ] + fields)
+
 
 # Summary frame
 #  - timestamp: packed64
@@ -466,6 +537,10 @@ def counterFrame(timestamp, core, key, value):
     ret = addFrameHeader(frame_type, body, core)
     return ret
 
+# Counter frame messages for arrays of counter values
+def counterFrames(timestamps, cores, keys, values):
+    return packedFrames("Counter", cores, [ timestamps, cores, keys, values ])
+
 # Block Counter frame message
 #  - key: packed32
 #  - value: packed64
@@ -503,6 +578,11 @@ def schedSwitchFrame(core, timestamp, pid, tid, cookie, state):
     ret = addFrameHeader(frame_type, body, core)
     return ret
 
+# Sched Switch messages for arrays of events
+def schedSwitchFrames(cores, timestamps, pids, tids, cookies, states):
+    return packedFrames("Sched Trace", cores,
+                        [ 1, timestamps, pids, tids, cookies, states ])
+
 # Sched Thread Exit
 #  - Code: 2
 #  - timestamp: timestamp
@@ -549,13 +629,17 @@ def parseProcessInfo(task_file):
 
     global start_tick, end_tick, num_cpus
     global process_dict, thread_dict, process_list
-    global event_list, unified_event_list
+    global event_ticks, event_cpus, event_threads, thread_tasks
     global idle_uid, kernel_uid
 
-    event_list = []
-    unified_event_list = []
-    for cpu in range(num_cpus):
-        event_list.append([])
+    # The tick, CPU and thread (index in thread_tasks) of every event.
+    # The task file is read a line at a time and the events are kept in
+    # arrays rather than as objects.
+    ticks = array.array('q')
+    cpus = array.array('q')
+    threads = array.array('q')
+    thread_index = {}
+    thread_tasks = []
 
     uid = 1 # uid 0 is reserved for idle
 
@@ -579,96 +663,113 @@ def parseProcessInfo(task_file):
 
     try:
         if ext == ".gz":
-            process_file = gzip.open(task_file, 'rb')
+            process_file = gzip.open(task_file, 'rt', errors='replace')
         else:
-            process_file = open(task_file, 'rb')
+            process_file = open(task_file, 'r', errors='replace')
     except:
         print("ERROR opening task file:", task_file)
         print("Make sure context switch task dumping is enabled in gem5.")
         sys.exit(1)
 
-    process_re = re.compile("tick=(\d+)\s+(\d+)\s+cpu_id=(\d+)\s+" +
-        "next_pid=([-\d]+)\s+next_tgid=([-\d]+)\s+next_task=(.*)")
-
     task_name_failure_warned = False
 
     for line in process_file:
-        match = re.match(process_re, line)
-        if match:
-            tick = int(match.group(1))
-            if (start_tick < 0):
-                start_tick = tick
-            cpu_id = int(match.group(3))
-            pid = int(match.group(4))
-            tgid = int(match.group(5))
-            task_name = match.group(6)
-
-            if not task_name_failure_warned:
-                if task_name == "FailureIn_curTaskName":
-                    print("-------------------------------------------------")
-                    print("WARNING: Task name not set correctly!")
-                    print("Process/Thread info will not be displayed correctly")
-                    print("Perhaps forgot to apply m5struct.patch to kernel?")
-                    print("-------------------------------------------------")
-                    task_name_failure_warned = True
-
-            if not tgid in process_dict:
-                if tgid == pid:
-                    # new task is parent as well
-                    if args.verbose:
-                        print("new process", uid, pid, tgid, task_name)
-                    if tgid == 0:
-                        # new process is the "idle" task
-                        process = Task(uid, pid, tgid, "idle", True, tick)
-                        idle_uid = 0
-                    else:
-                        process = Task(uid, pid, tgid, task_name, True, tick)
-                else:
-                    if tgid == 0:
-                        process = Task(uid, tgid, tgid, "idle", True, tick)
-                        idle_uid = 0
-                    else:
-                        # parent process name not known yet
-                        process = Task(uid, tgid, tgid, "_Unknown_", True, tick)
-                if tgid == -1: # kernel
-                    kernel_uid = 0
-                uid += 1
-                process_dict[tgid] = process
-                process_list.append(process)
-            else:
-                if tgid == pid:
-                    if process_dict[tgid].task_name == "_Unknown_":
-                        if args.verbose:
-                            print("new process", \
-                                process_dict[tgid].uid, pid, tgid, task_name)
-                        process_dict[tgid].task_name = task_name
-                    if process_dict[tgid].task_name != task_name and tgid != 0:
-                        process_dict[tgid].task_name = task_name
-
-            if not pid in thread_dict:
+        # Example format:
+        # tick=1000 0 cpu_id=0 next_pid=1 next_tgid=1 next_task=init
+        fields = line.split(None, 5)
+        if len(fields) != 6:
+            continue
+        tick_field, _, cpu_field, pid_field, tgid_field, task_field = fields
+        if not (tick_field.startswith("tick=") and
+                cpu_field.startswith("cpu_id=") and
+                pid_field.startswith("next_pid=") and
+                tgid_field.startswith("next_tgid=") and
+                task_field.startswith("next_task=")):
+            continue
+        try:
+            tick = int(tick_field[5:])
+            cpu_id = int(cpu_field[7:])
+            pid = int(pid_field[9:])
+            tgid = int(tgid_field[10:])
+        except ValueError:
+            continue
+        task_name = task_field[10:].rstrip("\n")
+
+        if (start_tick < 0):
+            start_tick = tick
+
+        if not task_name_failure_warned:
+            if task_name == "FailureIn_curTaskName":
+                print("-------------------------------------------------")
+                print("WARNING: Task name not set correctly!")
+                print("Process/Thread info will not be displayed correctly")
+                print("Perhaps forgot to apply m5struct.patch to kernel?")
+                print("-------------------------------------------------")
+                task_name_failure_warned = True
+
+        if not tgid in process_dict:
+            if tgid == pid:
+                # new task is parent as well
                 if args.verbose:
-                    print("new thread", \
-                       uid, process_dict[tgid].uid, pid, tgid, task_name)
-                thread = Task(uid, pid, tgid, task_name, False, tick)
-                uid += 1
-                thread_dict[pid] = thread
-                process_dict[tgid].children.append(thread)
+                    print("new process", uid, pid, tgid, task_name)
+                if tgid == 0:
+                    # new process is the "idle" task
+                    process = Task(uid, pid, tgid, "idle", True, tick)
+                    idle_uid = 0
+                else:
+                    process = Task(uid, pid, tgid, task_name, True, tick)
             else:
-                if thread_dict[pid].task_name != task_name:
-                    thread_dict[pid].task_name = task_name
+                if tgid == 0:
+                    process = Task(uid, tgid, tgid, "idle", True, tick)
+                    idle_uid = 0
+                else:
+                    # parent process name not known yet
+                    process = Task(uid, tgid, tgid, "_Unknown_", True, tick)
+            if tgid == -1: # kernel
+                kernel_uid = 0
+            uid += 1
+            process_dict[tgid] = process
+            process_list.append(process)
+        else:
+            if tgid == pid:
+                if process_dict[tgid].task_name == "_Unknown_":
+                    if args.verbose:
+                        print("new process", \
+                            process_dict[tgid].uid, pid, tgid, task_name)
+                    process_dict[tgid].task_name = task_name
+                if process_dict[tgid].task_name != task_name and tgid != 0:
+                    process_dict[tgid].task_name = task_name
 
+        if not pid in thread_dict:
             if args.verbose:
-                print(tick, uid, cpu_id, pid, tgid, task_name)
+                print("new thread", \
+                   uid, process_dict[tgid].uid, pid, tgid, task_name)
+            thread = Task(uid, pid, tgid, task_name, False, tick)
+            uid += 1
+            thread_dict[pid] = thread
+            thread_index[pid] = len(thread_tasks)
+            thread_tasks.append(thread)
+            process_dict[tgid].children.append(thread)
+        else:
+            if thread_dict[pid].task_name != task_name:
+                thread_dict[pid].task_name = task_name
 
-            task = thread_dict[pid]
-            event = Event(tick, task)
-            event_list[cpu_id].append(event)
-            unified_event_list.append(event)
+        if args.verbose:
+            print(tick, uid, cpu_id, pid, tgid, task_name)
 
-            if len(unified_event_list) == num_events:
-                print("Truncating at", num_events, "events!")
-                break
-    print("Found %d events." % len(unified_event_list))
+        ticks.append(tick)
+        cpus.append(cpu_id)
+        threads.append(thread_index[pid])
+
+        if len(ticks) == num_events:
+            print("Truncating at", num_events, "events!")
+            break
+    process_file.close()
+    print("Found %d events." % len(ticks))
+
+    event_ticks = numpy.frombuffer(ticks, dtype=numpy.int64)
+    event_cpus = numpy.frombuffer(cpus, dtype=numpy.int64)
+    event_threads = numpy.frombuffer(threads, dtype=numpy.int64)
 
     for process in process_list:
         if process.pid > 9990: # fix up framebuffer ticks
@@ -699,7 +800,7 @@ def ticksToNs(tick):
         print("ticks_in_ns not set properly!")
         sys.exit(1)
 
-    return tick / ticks_in_ns
+    return tick // ticks_in_ns
 
 def writeXmlFile(xml, filename):
     f = open(filename, "w")
@@ -726,9 +827,6 @@ class StatsEntry(object):
         self.short_name = re.sub("system\.", "", name)
         self.short_name = re.sub(":", "_", name)
 
-        # Regex for this stat (string version used to construct union regex)
-        self.regex_string = "^" + name + "\s+([\d\.]+)"
-        self.regex = re.compile("^" + name + "\s+([\d\.e\-]+)\s+# (.*)$", re.M)
         self.description = ""
 
         # Whether this stat is use per CPU or not
@@ -737,12 +835,10 @@ class StatsEntry(object):
         # Key used in .apc protocol (as described in captured.xml)
         self.key = key
 
-        # List of values of stat per timestamp
+        # Array of values of stat per timestamp (one per CPU for per-CPU
+        # stats)
         self.values = []
 
-        # Whether this stat has been found for the current timestamp
-        self.found = False
-
         # Whether this stat has been found at least once
         # (to suppress too many warnings)
         self.not_found_at_least_once = False
@@ -750,12 +846,9 @@ class StatsEntry(object):
         # Field used to hold ElementTree subelement for this stat
         self.ET_element = None
 
-        # Create per-CPU stat name and regex, etc.
+        # Create per-CPU stat names
         if self.per_cpu:
-            self.per_cpu_regex_string = []
-            self.per_cpu_regex = []
             self.per_cpu_name = []
-            self.per_cpu_found = []
             for i in range(num_cpus):
                 if num_cpus > 1:
                     per_cpu_name = re.sub("#", str(i), self.name)
@@ -765,18 +858,12 @@ class StatsEntry(object):
                 self.per_cpu_name.append(per_cpu_name)
                 print("\t", per_cpu_name)
 
-                self.per_cpu_regex_string.\
-                    append("^" + per_cpu_name + "\s+[\d\.]+")
-                self.per_cpu_regex.append(re.compile("^" + per_cpu_name + \
-                    "\s+([\d\.e\-]+)\s+# (.*)$", re.M))
-                self.values.append([])
-                self.per_cpu_found.append(False)
-
-    def append_value(self, val, per_cpu_index = None):
+    # Names of the gem5 stats this entry is made of
+    def gem5_names(self):
         if self.per_cpu:
-            self.values[per_cpu_index].append(str(val))
+            return self.per_cpu_name
         else:
-            self.values.append(str(val))
+            return [ self.name ]
 
 # Global stats object that contains the list of stats entries
 # and other utility functions
@@ -792,19 +879,6 @@ class Stats(object):
             self.next_key))
         self.next_key += 1
 
-    # Union of all stats to accelerate parsing speed
-    def createStatsRegex(self):
-        regex_strings = [];
-        print("\nnum entries in stats_list", len(self.stats_list))
-        for entry in self.stats_list:
-            if entry.per_cpu:
-                for i in range(num_cpus):
-                    regex_strings.append(entry.per_cpu_regex_string[i])
-            else:
-                regex_strings.append(entry.regex_string)
-
-        self.regex = re.compile('|'.join(regex_strings))
-
 
 def registerStats(config_file):
     print("===============================")
@@ -853,7 +927,7 @@ def registerStats(config_file):
                 stats.register(item, group, i, False)
                 i += 1
 
-    stats.createStatsRegex()
+    print("\nnum entries in stats_list", len(stats.stats_list))
 
     return stats
 
@@ -864,125 +938,69 @@ def readGem5Stats(stats, gem5_stats_file):
     print("Parsing gem5 stats file...")
     print(gem5_stats_file)
     print("===============================\n")
-    ext = os.path.splitext(gem5_stats_file)[1]
-
-    window_start_regex = \
-        re.compile("^---------- Begin Simulation Statistics ----------")
-    window_end_regex = \
-        re.compile("^---------- End Simulation Statistics   ----------")
-    final_tick_regex = re.compile("^final_tick\s+(\d+)")
 
     global ticks_in_ns
-    sim_freq_regex = re.compile("^sim_freq\s+(\d+)")
-    sim_freq = -1
 
     try:
-        if ext == ".gz":
-            f = gzip.open(gem5_stats_file, "r")
-        else:
-            f = open(gem5_stats_file, "r")
-    except:
+        stats_file = statslib.StatsFile(gem5_stats_file)
+        if len(stats_file) == 0:
+            raise IOError("no stats dumps")
+    except IOError:
         print("ERROR opening stats file", gem5_stats_file, "!")
         sys.exit(1)
 
-    stats_not_found_list = stats.stats_list[:]
-    window_num = 0
+    # Older versions of gem5 use different names for these
+    names = stats_file.names()
+    tick_name = "finalTick" if "finalTick" in names else "final_tick"
+    freq_name = "simFreq" if "simFreq" in names else "sim_freq"
 
-    while (True):
-        error = False
-        try:
-            line = f.readline()
-        except IOError:
-            print("")
-            print("WARNING: IO error in stats file")
-            print("(gzip stream not closed properly?)...continuing for now")
-            error = True
-        if not line:
-            break
+    gem5_names = [ n for stat in stats.stats_list for n in stat.gem5_names() ]
+    values = stats_file.values([ tick_name, freq_name ] + gem5_names)
 
-        # Find out how many gem5 ticks in 1ns
-        if sim_freq < 0:
-            m = sim_freq_regex.match(line)
-            if m:
-                sim_freq = int(m.group(1)) # ticks in 1 sec
-                ticks_in_ns = int(sim_freq / 1e9)
-                print("Simulation frequency found! 1 tick == %e sec\n" \
-                        % (1.0 / sim_freq))
-
-        # Final tick in gem5 stats: current absolute timestamp
-        m = final_tick_regex.match(line)
-        if m:
-            tick = int(m.group(1))
-            if tick > end_tick:
-                break
-            stats.tick_list.append(tick)
+    # Find out how many gem5 ticks in 1ns
+    sim_freq = int(values[freq_name][0]) # ticks in 1 sec
+    ticks_in_ns = int(sim_freq / 1e9)
+    print("Simulation frequency found! 1 tick == %e sec\n" \
+            % (1.0 / sim_freq))
 
+    # Final tick in gem5 stats: current absolute timestamp. Skip the
+    # windows after the end of the task trace.
+    ticks = values[tick_name]
+    late = numpy.flatnonzero(ticks > end_tick)
+    num_windows = late[0] if len(late) else len(ticks)
+    stats.tick_list = [ int(tick) for tick in ticks[:num_windows] ]
 
-        if (window_end_regex.match(line) or error):
-            if args.verbose:
-                print("new window")
-            for stat in stats.stats_list:
-                if stat.per_cpu:
-                    for i in range(num_cpus):
-                        if not stat.per_cpu_found[i]:
-                            if not stat.not_found_at_least_once:
-                                print("WARNING: stat not found in window #", \
-                                    window_num, ":", stat.per_cpu_name[i])
-                                print("suppressing further warnings for " + \
-                                    "this stat")
-                                stat.not_found_at_least_once = True
-                            stat.values[i].append(str(0))
-                        stat.per_cpu_found[i] = False
-                else:
-                    if not stat.found:
-                        if not stat.not_found_at_least_once:
-                            print("WARNING: stat not found in window #", \
-                                window_num, ":", stat.name)
-                            print("suppressing further warnings for this stat")
-                            stat.not_found_at_least_once = True
-                        stat.values.append(str(0))
-                    stat.found = False
-            stats_not_found_list = stats.stats_list[:]
-            window_num += 1
-            if error:
-                break
+    for stat in stats.stats_list:
+        stat_values = []
+        for name in stat.gem5_names():
+            window_values = values[name][:num_windows]
+            not_found = numpy.isnan(window_values)
+            if not_found.any():
+                if not stat.not_found_at_least_once:
+                    print("WARNING: stat not found in window #", \
+                        numpy.argmax(not_found), ":", name)
+                    print("suppressing further warnings for this stat")
+                    stat.not_found_at_least_once = True
+                window_values = numpy.where(not_found, 0, window_values)
+            if args.cumulative_stats:
+                # Carry the last value over the windows the stat is
+                # missing from, and take the change in each window
+                last = numpy.where(not_found, 0,
+                                   numpy.arange(len(window_values)))
+                numpy.maximum.accumulate(last, out=last)
+                window_values = numpy.diff(window_values[last], prepend=0)
+            if stat.per_cpu and stat.name == "ipc":
+                window_values = window_values * 1000
+            stat_values.append(window_values.astype(numpy.int64))
+            if stat.description == "":
+                stat.description = stats_file.description(name)
+        if stat.per_cpu:
+            stat.values = stat_values
+        else:
+            stat.values = stat_values[0]
 
-        # Do a single regex of the union of all stats first for speed
-        if stats.regex.match(line):
-            # Then loop through only the stats we haven't seen in this window
-            for stat in stats_not_found_list[:]:
-                if stat.per_cpu:
-                    for i in range(num_cpus):
-                        m = stat.per_cpu_regex[i].match(line)
-                        if m:
-                            if stat.name == "ipc":
-                                value = str(int(float(m.group(1)) * 1000))
-                            else:
-                                value = str(int(float(m.group(1))))
-                            if args.verbose:
-                                print(stat.per_cpu_name[i], value)
-                            stat.values[i].append(value)
-                            stat.per_cpu_found[i] = True
-                            all_found = True
-                            for j in range(num_cpus):
-                                if not stat.per_cpu_found[j]:
-                                    all_found = False
-                            if all_found:
-                                stats_not_found_list.remove(stat)
-                            if stat.description == "":
-                                stat.description = m.group(2)
-                else:
-                    m = stat.regex.match(line)
-                    if m:
-                        value = str(int(float(m.group(1))))
-                        if args.verbose:
-                            print(stat.name, value)
-                        stat.values.append(value)
-                        stat.found = True
-                        stats_not_found_list.remove(stat)
-                        if stat.description == "":
-                            stat.description = m.group(2)
-    f.close()
+        if args.verbose:
+            print(stat.name, stat.values)
 
 
 # Create session.xml file in .apc folder
@@ -1063,55 +1081,78 @@ def writeCookiesThreads(blob):
         writeBinary(blob, threadNameFrame(ticksToNs(thread.tick),\
                 thread.pid, thread.task_name))
 
+# Number of frames packed at a time by the vectorized writers
+frames_per_block = 1 << 16
+
 # Writes context switch info as Streamline scheduling events
 def writeSchedEvents(blob):
-    for cpu in range(num_cpus):
-        for event in event_list[cpu]:
-            timestamp = ticksToNs(event.tick)
-            pid = event.task.tgid
-            tid = event.task.pid
-            if event.task.tgid in process_dict:
-                cookie = process_dict[event.task.tgid].uid
-            else:
-                cookie = 0
-
-            # State:
-            #   0: waiting on other event besides I/O
-            #   1: Contention/pre-emption
-            #   2: Waiting on I/O
-            #   3: Waiting on mutex
-            # Hardcoding to 0 for now. Other states not implemented yet.
-            state = 0
-
-            if args.verbose:
-                print(cpu, timestamp, pid, tid, cookie)
-
-            writeBinary(blob,\
-                schedSwitchFrame(cpu, timestamp, pid, tid, cookie, state))
+    # The events are written per CPU, in the order they happened on each
+    order = numpy.argsort(event_cpus, kind="stable")
+    order = order[event_cpus[order] < num_cpus]
+
+    pids = numpy.array([ t.tgid for t in thread_tasks ], dtype=numpy.int64)
+    tids = numpy.array([ t.pid for t in thread_tasks ], dtype=numpy.int64)
+    cookies = numpy.array([ process_dict[t.tgid].uid
+                            if t.tgid in process_dict else 0
+                            for t in thread_tasks ], dtype=numpy.int64)
+
+    # State:
+    #   0: waiting on other event besides I/O
+    #   1: Contention/pre-emption
+    #   2: Waiting on I/O
+    #   3: Waiting on mutex
+    # Hardcoding to 0 for now. Other states not implemented yet.
+    state = 0
+
+    for start in range(0, len(order), frames_per_block):
+        events = order[start:start + frames_per_block]
+        cpus = event_cpus[events]
+        timestamps = ticksToNs(event_ticks[events])
+        threads = event_threads[events]
+
+        if args.verbose:
+            for event in zip(cpus, timestamps, pids[threads], tids[threads],
+                             cookies[threads]):
+                print(*event)
+
+        blob.write(schedSwitchFrames(cpus, timestamps, pids[threads],
+                                     tids[threads], cookies[threads], state))
 
 # Writes selected gem5 statistics as Streamline counters
 def writeCounters(blob, stats):
-    timestamp_list = []
-    for tick in stats.tick_list:
-        if tick > end_tick:
-            break
-        timestamp_list.append(ticksToNs(tick))
-
+    # The ticks after end_tick have already been left out
+    timestamps = ticksToNs(numpy.array(stats.tick_list, dtype=numpy.int64))
+
+    # One counter per stat and CPU, in the order they are written for
+    # each timestamp
+    values = []
+    cores = []
+    keys = []
     for stat in stats.stats_list:
         if stat.per_cpu:
-            stat_length = len(stat.values[0])
+            for i in range(num_cpus):
+                values.append(stat.values[i])
+                cores.append(i)
+                keys.append(stat.key)
         else:
-            stat_length = len(stat.values)
-
-    for n in range(len(timestamp_list)):
-        for stat in stats.stats_list:
-            if stat.per_cpu:
-                for i in range(num_cpus):
-                    writeBinary(blob, counterFrame(timestamp_list[n], i, \
-                                    stat.key, int(float(stat.values[i][n]))))
-            else:
-                writeBinary(blob, counterFrame(timestamp_list[n], 0, \
-                                    stat.key, int(float(stat.values[n]))))
+            values.append(stat.values)
+            cores.append(0)
+            keys.append(stat.key)
+    if not values:
+        return
+    values = numpy.column_stack(values)[:len(timestamps)]
+    cores = numpy.array(cores, dtype=numpy.int64)
+    keys = numpy.array(keys, dtype=numpy.int64)
+
+    num_counters = len(cores)
+    rows_per_block = max(1, frames_per_block // num_counters)
+    for start in range(0, len(timestamps), rows_per_block):
+        rows = values[start:start + rows_per_block]
+        num_rows = len(rows)
+        blob.write(counterFrames(
+            numpy.repeat(timestamps[start:start + num_rows], num_counters),
+            numpy.tile(cores, num_rows), numpy.tile(keys, num_rows),
+            rows.ravel()))
 
 # Streamline can display LCD frame buffer dumps (gzipped bmp)
 # This function converts the frame buffer dumps to the Streamline format
@@ -1127,8 +1168,8 @@ def writeVisualAnnotations(blob, input_path, output_path):
 
     # Use first non-negative pid to tag visual annotations
     annotate_pid = -1
-    for e in unified_event_list:
-        pid = e.task.pid
+    for thread in event_threads:
+        pid = thread_tasks[thread].pid
         if pid >= 0:
             annotate_pid = pid
             break
@@ -1169,7 +1210,7 @@ def writeVisualAnnotations(blob, input_path, output_path):
 def createApcProject(input_path, output_path, stats):
     initOutput(output_path)
 
-    blob = open(output_path + "/0000000000", "wb")
+    blob = FrameWriter(open(output_path + "/0000000000", "wb"))
 
     # Summary frame takes current system time and system uptime.
     # Filling in with random values for now.